@@ -1,3 +1,5 @@
 import audio.tools
 import audio.stft
 import audio.audio_processing
+import audio.pitch
+import audio.cache
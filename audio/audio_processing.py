@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 import torch
 import numpy as np
 import librosa.util as librosa_util
@@ -48,32 +50,39 @@ def window_sumsquare(
     if win_length is None:
         win_length = n_fft
 
+    # Cached by the parameters, every inverse STFT of the same length reuses it
+    return _window_sumsquare(
+        window, n_frames, hop_length, win_length, n_fft, np.dtype(dtype), norm
+    ).copy()
+
+
+@lru_cache(maxsize=64)
+def _window_sumsquare(window, n_frames, hop_length, win_length, n_fft, dtype, norm):
     n = n_fft + hop_length * (n_frames - 1)
-    x = np.zeros(n, dtype=dtype)
 
     # Compute the squared window at the desired length
     win_sq = get_window(window, win_length, fftbins=True)
     win_sq = librosa_util.normalize(win_sq, norm=norm) ** 2
-    win_sq = librosa_util.pad_center(win_sq, n_fft)
+    win_sq = librosa_util.pad_center(win_sq, size=n_fft)
 
-    # Fill the envelope
-    for i in range(n_frames):
-        sample = i * hop_length
-        x[sample : min(n, sample + n_fft)] += win_sq[: max(0, min(n_fft, n - sample))]
-    return x
+    # Overlap-add the squared window of every frame in one pass
+    indices = (
+        np.arange(n_frames)[:, None] * hop_length + np.arange(n_fft)[None, :]
+    ).ravel()
+    x = np.bincount(indices, weights=np.tile(win_sq, n_frames), minlength=n)
+    return x.astype(dtype)
 
 
 def griffin_lim(magnitudes, stft_fn, n_iters=30):
     """
     PARAMS
     ------
-    magnitudes: spectrogram magnitudes
+    magnitudes: (B, n_fft // 2 + 1, T) spectrogram magnitudes, the whole batch is
+        inverted at once on the device of magnitudes
     stft_fn: STFT class with transform (STFT) and inverse (ISTFT) methods
     """
 
-    angles = np.angle(np.exp(2j * np.pi * np.random.rand(*magnitudes.size())))
-    angles = angles.astype(np.float32)
-    angles = torch.autograd.Variable(torch.from_numpy(angles))
+    angles = 2 * np.pi * torch.rand(magnitudes.size(), device=magnitudes.device) - np.pi
     signal = stft_fn.inverse(magnitudes, angles).squeeze(1)
 
     for i in range(n_iters):
@@ -0,0 +1,117 @@
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+
+import librosa
+import numpy as np
+
+
+class AudioCache:
+    """
+    Decoded, resampled audio shared by the preprocessing scripts.
+    Waves are stored as float32 PCM at sampling_rate, packed one after another in
+    audio_<sampling_rate>.pcm and read back through a memory map. The index
+    audio_<sampling_rate>.jsonl maps each source file to its offset and length,
+    and records the size and mtime of the source so that modified files are
+    decoded again. Appends are serialized with a file lock, so several
+    preprocessing workers can share one cache.
+    """
+
+    def __init__(self, cache_dir, sampling_rate):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.sampling_rate = sampling_rate
+        self.data_path = os.path.join(cache_dir, "audio_{}.pcm".format(sampling_rate))
+        self.index_path = os.path.join(cache_dir, "audio_{}.jsonl".format(sampling_rate))
+        self.lock_path = os.path.join(cache_dir, "audio_{}.lock".format(sampling_rate))
+        self.index = dict()
+        self.index_offset = 0
+        self.data = None
+        self.refresh()
+
+    @contextmanager
+    def lock(self):
+        with open(self.lock_path, "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def refresh(self):
+        """ Read index entries appended since the last call, also by other processes """
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self.index_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Entry still being written
+                    break
+                entry = json.loads(line.decode("utf-8"))
+                self.index[entry["path"]] = entry
+                self.index_offset += len(line)
+
+    @staticmethod
+    def source_stat(path):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def lookup(self, path):
+        path = os.path.abspath(path)
+        entry = self.index.get(path)
+        if entry is None or (entry["size"], entry["mtime_ns"]) != self.source_stat(path):
+            self.refresh()
+            entry = self.index.get(path)
+        if entry is None or (entry["size"], entry["mtime_ns"]) != self.source_stat(path):
+            return None
+        return entry
+
+    def read(self, entry):
+        end = entry["offset"] + entry["length"]
+        if self.data is None or len(self.data) < end:
+            self.data = np.memmap(self.data_path, dtype=np.float32, mode="r")
+        return self.data[entry["offset"] : end]
+
+    def load(self, path):
+        """ Same as librosa.load(path, sr=sampling_rate)[0], decoded only once """
+        entry = self.lookup(path)
+        if entry is not None:
+            return self.read(entry)
+
+        wav, _ = librosa.load(path, sr=self.sampling_rate)
+        wav = wav.astype(np.float32)
+        size, mtime_ns = self.source_stat(path)
+        with self.lock():
+            with open(self.data_path, "ab") as f:
+                offset = f.tell() // 4
+                f.write(wav.tobytes())
+            entry = {
+                "path": os.path.abspath(path),
+                "offset": offset,
+                "length": len(wav),
+                "size": size,
+                "mtime_ns": mtime_ns,
+            }
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.index[entry["path"]] = entry
+        return wav
+
+    def duration(self, path):
+        return len(self.load(path)) / self.sampling_rate
+
+
+def get_audio_cache(config):
+    """ AudioCache of preprocess.yaml path.audio_cache_path, None if it is not set """
+    cache_dir = config["path"].get("audio_cache_path")
+    if cache_dir is None:
+        return None
+    return AudioCache(cache_dir, config["preprocessing"]["audio"]["sampling_rate"])
+
+
+def load_wav(path, sampling_rate, cache=None):
+    if cache is not None:
+        return cache.load(path)
+    wav, _ = librosa.load(path, sr=sampling_rate)
+    return wav
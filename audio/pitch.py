@@ -0,0 +1,147 @@
+import numpy as np
+import pyworld as pw
+
+
+PITCH_EXTRACTORS = ["dio", "harvest", "yin"]
+
+# Frames processed per FFT call by the batched YIN, bounds the memory use
+YIN_CHUNK_FRAMES = 4096
+
+
+def dio(wav, sampling_rate, hop_length, f0_min=71.0, f0_max=800.0):
+    """ pyworld DIO refined by StoneMask, the original extractor """
+    wav = wav.astype(np.float64)
+    pitch, t = pw.dio(
+        wav,
+        sampling_rate,
+        f0_floor=f0_min,
+        f0_ceil=f0_max,
+        frame_period=hop_length / sampling_rate * 1000,
+    )
+    return pw.stonemask(wav, pitch, t, sampling_rate)
+
+
+def harvest(wav, sampling_rate, hop_length, f0_min=71.0, f0_max=800.0):
+    """ pyworld Harvest, slower than DIO but with fewer voicing errors """
+    pitch, _ = pw.harvest(
+        wav.astype(np.float64),
+        sampling_rate,
+        f0_floor=f0_min,
+        f0_ceil=f0_max,
+        frame_period=hop_length / sampling_rate * 1000,
+    )
+    return pitch
+
+
+def _yin_frames(wav, frame_length, hop_length):
+    """ (len(wav) // hop_length + 1, frame_length) frames centered on multiples of hop_length """
+    pad = frame_length // 2
+    wav = np.pad(wav.astype(np.float64), (pad, frame_length - pad))
+    return np.lib.stride_tricks.sliding_window_view(wav, frame_length)[::hop_length]
+
+
+def _yin_pitch(frames, sampling_rate, tau_min, tau_max, threshold):
+    """ YIN on a (n_frames, win_length + tau_max + 1) matrix, 0 for unvoiced frames """
+    n_frames, frame_length = frames.shape
+    win_length = frame_length - tau_max - 1
+    n_fft = 2 ** int(np.ceil(np.log2(frame_length + win_length)))
+
+    # Difference function d(tau) = e(0) + e(tau) - 2 r(tau) for tau in [0, tau_max + 1)
+    spectrum = np.fft.rfft(frames, n_fft, axis=1)
+    window_spectrum = np.fft.rfft(frames[:, :win_length], n_fft, axis=1)
+    acf = np.fft.irfft(spectrum * np.conj(window_spectrum), n_fft, axis=1)[
+        :, : tau_max + 1
+    ]
+    energy = np.concatenate(
+        [np.zeros((n_frames, 1)), np.cumsum(frames ** 2, axis=1)], axis=1
+    )
+    energy = energy[:, win_length : win_length + tau_max + 1] - energy[:, : tau_max + 1]
+    diff = np.maximum(energy[:, :1] + energy - 2 * acf, 0)
+
+    # Cumulative mean normalized difference, 1 at tau = 0 and on silent frames
+    cumulative_mean = np.cumsum(diff[:, 1:], axis=1) / np.arange(1, tau_max + 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cmnd = diff[:, 1:] / cumulative_mean
+    cmnd = np.concatenate([np.ones((n_frames, 1)), np.nan_to_num(cmnd, nan=1.0)], axis=1)
+
+    # First local minimum below the threshold in [tau_min, tau_max)
+    taus = np.arange(tau_min, tau_max)
+    local_min = (cmnd[:, taus] <= cmnd[:, taus - 1]) & (cmnd[:, taus] <= cmnd[:, taus + 1])
+    candidates = local_min & (cmnd[:, taus] < threshold)
+    voiced = candidates.any(axis=1)
+    tau = taus[np.argmax(candidates, axis=1)]
+
+    # Parabolic interpolation of the period
+    rows = np.arange(n_frames)
+    left, center, right = cmnd[rows, tau - 1], cmnd[rows, tau], cmnd[rows, tau + 1]
+    denominator = left - 2 * center + right
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shift = np.where(
+            np.abs(denominator) > 1e-12, 0.5 * (left - right) / denominator, 0.0
+        )
+    period = tau + np.clip(shift, -1, 1)
+
+    return np.where(voiced, sampling_rate / period, 0.0)
+
+
+def yin_batch(wavs, sampling_rate, hop_length, f0_min=71.0, f0_max=800.0, threshold=0.15):
+    """ Vectorized YIN over all frames of several waves at once, one array per wave """
+    tau_min = max(int(np.floor(sampling_rate / f0_max)), 2)
+    tau_max = int(np.ceil(sampling_rate / f0_min))
+    win_length = tau_max
+    frame_length = win_length + tau_max + 1
+
+    frames = [_yin_frames(wav, frame_length, hop_length) for wav in wavs]
+    lengths = [len(f) for f in frames]
+    frames = np.concatenate(frames, axis=0)
+
+    pitch = np.concatenate(
+        [
+            _yin_pitch(
+                frames[i : i + YIN_CHUNK_FRAMES], sampling_rate, tau_min, tau_max, threshold
+            )
+            for i in range(0, len(frames), YIN_CHUNK_FRAMES)
+        ]
+    )
+    return np.split(pitch, np.cumsum(lengths)[:-1])
+
+
+def yin(wav, sampling_rate, hop_length, f0_min=71.0, f0_max=800.0, threshold=0.15):
+    return yin_batch([wav], sampling_rate, hop_length, f0_min, f0_max, threshold)[0]
+
+
+class PitchExtractor:
+    """
+    F0 extractor selected by preprocess.yaml pitch.extractor (dio, harvest or yin),
+    with optional pitch.f0_min, pitch.f0_max and pitch.yin_threshold.
+    All extractors return one value per hop_length samples, 0 for unvoiced frames.
+    """
+
+    def __init__(self, config):
+        pitch_config = config["preprocessing"]["pitch"]
+        self.method = pitch_config.get("extractor", "dio")
+        assert self.method in PITCH_EXTRACTORS
+        self.sampling_rate = config["preprocessing"]["audio"]["sampling_rate"]
+        self.hop_length = config["preprocessing"]["stft"]["hop_length"]
+        self.f0_min = pitch_config.get("f0_min", 71.0)
+        self.f0_max = pitch_config.get("f0_max", 800.0)
+        self.threshold = pitch_config.get("yin_threshold", 0.15)
+
+    def __call__(self, wav):
+        return self.batch([wav])[0]
+
+    def batch(self, wavs):
+        if self.method == "yin":
+            return yin_batch(
+                wavs,
+                self.sampling_rate,
+                self.hop_length,
+                self.f0_min,
+                self.f0_max,
+                self.threshold,
+            )
+        extract = dio if self.method == "dio" else harvest
+        return [
+            extract(wav, self.sampling_rate, self.hop_length, self.f0_min, self.f0_max)
+            for wav in wavs
+        ]
@@ -15,12 +15,16 @@ from audio.audio_processing import (
 class STFT(torch.nn.Module):
     """adapted from Prem Seetharaman's https://github.com/pseeth/pytorch-stft"""
 
-    def __init__(self, filter_length, hop_length, win_length, window="hann"):
+    def __init__(
+        self, filter_length, hop_length, win_length, window="hann", backend="conv"
+    ):
         super(STFT, self).__init__()
+        assert backend in ["conv", "torch"]
         self.filter_length = filter_length
         self.hop_length = hop_length
         self.win_length = win_length
         self.window = window
+        self.backend = backend
         self.forward_transform = None
         scale = self.filter_length / self.hop_length
         fourier_basis = np.fft.fft(np.eye(self.filter_length))
@@ -45,35 +49,58 @@ class STFT(torch.nn.Module):
             # window the bases
             forward_basis *= fft_window
             inverse_basis *= fft_window
+        else:
+            fft_window = torch.ones(filter_length)
 
         self.register_buffer("forward_basis", forward_basis.float())
         self.register_buffer("inverse_basis", inverse_basis.float())
+        self.register_buffer("fft_window", fft_window)
 
-    def transform(self, input_data):
+    def transform(self, input_data, center=True):
+        """
+        (B, T) waveforms -> (B, filter_length // 2 + 1, frames) magnitude and phase,
+        computed on the device of input_data.
+        With center=False the input is expected to be padded already.
+        """
         num_batches = input_data.size(0)
         num_samples = input_data.size(1)
 
         self.num_samples = num_samples
 
-        # similar to librosa, reflect-pad the input
-        input_data = input_data.view(num_batches, 1, num_samples)
-        input_data = F.pad(
-            input_data.unsqueeze(1),
-            (int(self.filter_length / 2), int(self.filter_length / 2), 0, 0),
-            mode="reflect",
-        )
-        input_data = input_data.squeeze(1)
-
-        forward_transform = F.conv1d(
-            input_data.cuda(),
-            torch.autograd.Variable(self.forward_basis, requires_grad=False).cuda(),
-            stride=self.hop_length,
-            padding=0,
-        ).cpu()
+        if center:
+            # similar to librosa, reflect-pad the input
+            input_data = input_data.view(num_batches, 1, num_samples)
+            input_data = F.pad(
+                input_data.unsqueeze(1),
+                (int(self.filter_length / 2), int(self.filter_length / 2), 0, 0),
+                mode="reflect",
+            )
+            input_data = input_data.squeeze(1)
+        else:
+            input_data = input_data.view(num_batches, 1, num_samples)
 
         cutoff = int((self.filter_length / 2) + 1)
-        real_part = forward_transform[:, :cutoff, :]
-        imag_part = forward_transform[:, cutoff:, :]
+        if self.backend == "torch":
+            # Same framing and window as the conv basis, computed with an FFT
+            forward_transform = torch.stft(
+                input_data.squeeze(1),
+                self.filter_length,
+                hop_length=self.hop_length,
+                window=self.fft_window.to(input_data.device),
+                center=False,
+                return_complex=True,
+            )
+            real_part = forward_transform.real
+            imag_part = forward_transform.imag
+        else:
+            forward_transform = F.conv1d(
+                input_data,
+                self.forward_basis.to(input_data.device),
+                stride=self.hop_length,
+                padding=0,
+            )
+            real_part = forward_transform[:, :cutoff, :]
+            imag_part = forward_transform[:, cutoff:, :]
 
         magnitude = torch.sqrt(real_part ** 2 + imag_part ** 2)
         phase = torch.autograd.Variable(torch.atan2(imag_part.data, real_part.data))
@@ -108,7 +135,7 @@ class STFT(torch.nn.Module):
             window_sum = torch.autograd.Variable(
                 torch.from_numpy(window_sum), requires_grad=False
             )
-            window_sum = window_sum.cuda() if magnitude.is_cuda else window_sum
+            window_sum = window_sum.to(magnitude.device)
             inverse_transform[:, :, approx_nonzero_indices] /= window_sum[
                 approx_nonzero_indices
             ]
@@ -137,11 +164,14 @@ class TacotronSTFT(torch.nn.Module):
         sampling_rate,
         mel_fmin,
         mel_fmax,
+        backend="conv",
     ):
         super(TacotronSTFT, self).__init__()
         self.n_mel_channels = n_mel_channels
         self.sampling_rate = sampling_rate
-        self.stft_fn = STFT(filter_length, hop_length, win_length)
+        self.filter_length = filter_length
+        self.hop_length = hop_length
+        self.stft_fn = STFT(filter_length, hop_length, win_length, backend=backend)
         mel_basis = librosa_mel_fn(
             sr=sampling_rate, n_fft=filter_length, n_mels=n_mel_channels, fmin=mel_fmin, fmax=mel_fmax
         )
@@ -171,8 +201,42 @@ class TacotronSTFT(torch.nn.Module):
 
         magnitudes, phases = self.stft_fn.transform(y)
         magnitudes = magnitudes.data
-        mel_output = torch.matmul(self.mel_basis, magnitudes)
+        mel_output = torch.matmul(self.mel_basis.to(magnitudes.device), magnitudes)
         mel_output = self.spectral_normalize(mel_output)
         energy = torch.norm(magnitudes, dim=1)
 
         return mel_output, energy
+
+    def mel_spectrogram_batch(self, y, lengths):
+        """Computes mel-spectrograms of a zero-padded batch of waves of different lengths
+        PARAMS
+        ------
+        y: torch.FloatTensor with shape (B, T) in range [-1, 1]
+        lengths: number of valid samples of each wave
+
+        RETURNS
+        -------
+        mels: list of B torch.FloatTensor of shape (n_mel_channels, T_i)
+        energies: list of B torch.FloatTensor of shape (T_i,)
+        """
+        assert torch.min(y.data) >= -1
+        assert torch.max(y.data) <= 1
+
+        # Reflect-pad every wave on its own before batching, so each utterance
+        # gets exactly the frames mel_spectrogram would compute for it alone
+        pad = int(self.filter_length / 2)
+        padded = y.new_zeros((y.size(0), y.size(1) + 2 * pad))
+        for i, length in enumerate(lengths):
+            wav = y[i : i + 1, :length].unsqueeze(1)
+            padded[i, : length + 2 * pad] = F.pad(wav, (pad, pad), mode="reflect")[0, 0]
+
+        magnitudes, phases = self.stft_fn.transform(padded, center=False)
+        magnitudes = magnitudes.data
+        mel_output = torch.matmul(self.mel_basis.to(magnitudes.device), magnitudes)
+        mel_output = self.spectral_normalize(mel_output)
+        energy = torch.norm(magnitudes, dim=1)
+
+        n_frames = [int(length) // self.hop_length + 1 for length in lengths]
+        mels = [mel_output[i, :, :n] for i, n in enumerate(n_frames)]
+        energies = [energy[i, :n] for i, n in enumerate(n_frames)]
+        return mels, energies
@@ -3,6 +3,7 @@ import numpy as np
 from scipy.io.wavfile import write
 
 from audio.audio_processing import griffin_lim
+from audio.stft import TacotronSTFT
 
 
 def get_mel_from_wav(audio, _stft):
@@ -15,20 +16,80 @@ def get_mel_from_wav(audio, _stft):
     return melspec, energy
 
 
+def get_mel_from_wavs(audios, _stft, device=None):
+    """ Batched get_mel_from_wav, returns a list of (melspec, energy) """
+    device = device or _stft.mel_basis.device
+    lengths = [len(audio) for audio in audios]
+    batch = torch.zeros((len(audios), max(lengths)))
+    for i, audio in enumerate(audios):
+        batch[i, : lengths[i]] = torch.clip(torch.FloatTensor(audio), -1, 1)
+    with torch.no_grad():
+        melspecs, energies = _stft.mel_spectrogram_batch(batch.to(device), lengths)
+
+    return [
+        (
+            melspec.cpu().numpy().astype(np.float32),
+            energy.cpu().numpy().astype(np.float32),
+        )
+        for melspec, energy in zip(melspecs, energies)
+    ]
+
+
+def mel_to_wav_griffin_lim(mels, _stft, griffin_iters=60):
+    """
+    (B, n_mel_channels, T) log-mel batch -> (B, T * hop_length) waveforms in [-1, 1],
+    the magnitudes are recovered with the pseudo-inverse of the mel basis
+    """
+    mel_decompress = _stft.spectral_de_normalize(mels)
+    mel_basis = _stft.mel_basis.to(mels.device)
+    spec_from_mel = torch.matmul(torch.linalg.pinv(mel_basis), mel_decompress)
+    spec_from_mel = torch.clamp(spec_from_mel, min=1e-5)
+
+    audio = griffin_lim(spec_from_mel, _stft.stft_fn, griffin_iters)
+    return torch.clamp(audio, -1, 1)
+
+
 def inv_mel_spec(mel, out_filename, _stft, griffin_iters=60):
-    mel = torch.stack([mel])
-    mel_decompress = _stft.spectral_de_normalize(mel)
-    mel_decompress = mel_decompress.transpose(1, 2).data.cpu()
-    spec_from_mel_scaling = 1000
-    spec_from_mel = torch.mm(mel_decompress[0], _stft.mel_basis)
-    spec_from_mel = spec_from_mel.transpose(0, 1).unsqueeze(0)
-    spec_from_mel = spec_from_mel * spec_from_mel_scaling
-
-    audio = griffin_lim(
-        torch.autograd.Variable(spec_from_mel[:, :, :-1]), _stft._stft_fn, griffin_iters
-    )
+    with torch.no_grad():
+        audio = mel_to_wav_griffin_lim(torch.stack([mel]), _stft, griffin_iters)
 
     audio = audio.squeeze()
     audio = audio.cpu().numpy()
     audio_path = out_filename
     write(audio_path, _stft.sampling_rate, audio)
+
+
+class GriffinLimVocoder:
+    """
+    Griffin-Lim inversion of FastSpeech2 mels, used by vocoder_infer when no neural
+    vocoder is configured or its checkpoint is missing. The STFT is built from
+    preprocess.yaml on first use, griffin_iters defaults to audio.griffin_lim_iters.
+    """
+
+    def __init__(self, device, griffin_iters=None):
+        self.device = device
+        self.griffin_iters = griffin_iters
+        self.stft = None
+        self.stft_config = None
+
+    def get_stft(self, preprocess_config):
+        stft_config = (
+            preprocess_config["preprocessing"]["stft"]["filter_length"],
+            preprocess_config["preprocessing"]["stft"]["hop_length"],
+            preprocess_config["preprocessing"]["stft"]["win_length"],
+            preprocess_config["preprocessing"]["mel"]["n_mel_channels"],
+            preprocess_config["preprocessing"]["audio"]["sampling_rate"],
+            preprocess_config["preprocessing"]["mel"]["mel_fmin"],
+            preprocess_config["preprocessing"]["mel"]["mel_fmax"],
+        )
+        if self.stft is None or self.stft_config != stft_config:
+            self.stft = TacotronSTFT(*stft_config).to(self.device)
+            self.stft_config = stft_config
+        return self.stft
+
+    def __call__(self, mels, preprocess_config):
+        griffin_iters = self.griffin_iters or preprocess_config["preprocessing"][
+            "audio"
+        ].get("griffin_lim_iters", 60)
+        _stft = self.get_stft(preprocess_config)
+        return mel_to_wav_griffin_lim(mels.to(self.device), _stft, griffin_iters)
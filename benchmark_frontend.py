@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Latency of the Mandarin front end (text.pinyin_frontend.PinyinFrontend) per sentence:
+cold (pypinyin and the decomposition rules on every call), with the shipped syllable
+table, and on sentence cache hits. With --cache_path the on-disk cache is also
+written, reloaded in a new front end and timed. Every cached result is checked
+against the uncached conversion.
+"""
+
+import argparse
+import json
+import os
+import time
+
+from text.pinyin_frontend import PinyinFrontend
+
+
+def load_corpus(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def mean_us(convert, sentences, n_repeat, before_each=None):
+    """ Best-of-n mean time per sentence, in microseconds """
+    times = list()
+    outputs = None
+    for _ in range(n_repeat):
+        if before_each is not None:
+            before_each()
+        start = time.perf_counter()
+        outputs = [convert(text) for text in sentences]
+        times.append(time.perf_counter() - start)
+    return min(times) / len(sentences) * 1e6, outputs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--corpus",
+        type=str,
+        default="normalizer/golden_corpus.txt",
+        help="one sentence per line, normalized with TextNormalizer unless --raw",
+    )
+    parser.add_argument("--raw", action="store_true", help="skip text normalization")
+    parser.add_argument("--n_repeat", type=int, default=5)
+    parser.add_argument("--cache_path", type=str, default=None)
+    parser.add_argument("--output", type=str, default="benchmark_frontend.json")
+    args = parser.parse_args()
+
+    sentences = load_corpus(args.corpus)
+    if not args.raw:
+        from m_text_normalizer import TextNormalizer
+
+        normalizer = TextNormalizer()
+        sentences = [normalizer.normalize(text) for text in sentences]
+
+    rules = PinyinFrontend(cache_size=0, syllable_table=None)
+    cold_us, reference = mean_us(rules, sentences, args.n_repeat, rules.cache_clear)
+    uncached = PinyinFrontend(cache_size=0)
+    syllable_us, from_table = mean_us(uncached, sentences, args.n_repeat)
+
+    frontend = PinyinFrontend()
+    for text in sentences:
+        frontend(text)
+    hit_us, cached = mean_us(frontend, sentences, args.n_repeat)
+
+    report = {
+        "corpus": args.corpus,
+        "n_sentences": len(sentences),
+        "cold_us": cold_us,
+        "syllable_table_us": syllable_us,
+        "sentence_cache_hit_us": hit_us,
+        "matches_uncached": cached == reference and from_table == reference,
+    }
+
+    if args.cache_path is not None:
+        if os.path.exists(args.cache_path):
+            os.remove(args.cache_path)
+        writer = PinyinFrontend(cache_path=args.cache_path)
+        for text in sentences:
+            writer(text)
+        writer.save()
+        start = time.perf_counter()
+        reader = PinyinFrontend(cache_path=args.cache_path)
+        report["disk_cache_load_ms"] = (time.perf_counter() - start) * 1000
+        report["disk_cache_hit_us"], from_disk = mean_us(
+            reader, sentences, args.n_repeat, reader.cache_clear
+        )
+        report["disk_cache_bytes"] = os.path.getsize(args.cache_path)
+        report["matches_uncached"] = report["matches_uncached"] and from_disk == reference
+
+    print(
+        "cold {cold_us:.1f} us, syllable table {syllable_table_us:.1f} us, "
+        "sentence cache hit {sentence_cache_hit_us:.2f} us per sentence".format(**report)
+    )
+    if "disk_cache_hit_us" in report:
+        print(
+            "disk cache: load {disk_cache_load_ms:.1f} ms, hit {disk_cache_hit_us:.2f} us".format(
+                **report
+            )
+        )
+    if not report["matches_uncached"]:
+        print("OUTPUT MISMATCH between cached and uncached conversion")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print("Benchmark report written to {}".format(args.output))
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Start-up, per-call latency and batch throughput of TextNormalizer.
+Start-up is measured in fresh interpreters: importing m_text_normalizer,
+constructing the normalizer, a first call on plain text and a first call that
+needs jieba POS tags. Per-call latency is measured for plain text and for
+numbers read from their context, with the POS cache cold and warm.
+For throughput, a corpus (one sentence per line, the golden normalizer corpus
+by default) is repeated up to --n_sentences and normalized with each number of
+workers. Timings include the process pool start-up and the per-worker
+normalizer initialization, and every run is checked against the
+single-process output.
+"""
+
+import argparse
+import itertools
+import json
+import subprocess
+import sys
+import time
+
+from m_text_normalizer import TextNormalizer, BATCH_CHUNK_SIZE
+from normalizer.number import pos_flags
+
+PLAIN_TEXT = "今天天气真好，我们去公园散步吧。"
+# 3-4 digit integers are read by value or digit by digit from the POS tags of their context
+CONTEXT_TEXT = "他买了1234本书，我住在306房间。"
+
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import m_text_normalizer
+imported = time.perf_counter()
+normalizer = m_text_normalizer.TextNormalizer()
+constructed = time.perf_counter()
+normalizer.normalize({plain!r})
+plain = time.perf_counter()
+normalizer.normalize({context!r})
+context = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "construct_ms": (constructed - imported) * 1000,
+    "first_plain_call_ms": (plain - constructed) * 1000,
+    "first_pos_call_ms": (context - plain) * 1000,
+}}))
+""".format(plain=PLAIN_TEXT, context=CONTEXT_TEXT)
+
+
+def load_corpus(path, n_sentences):
+    with open(path, "r", encoding="utf-8") as f:
+        sentences = [line.rstrip("\n") for line in f if line.strip()]
+    return list(itertools.islice(itertools.cycle(sentences), n_sentences))
+
+
+def startup(n_repeat):
+    """ Best-of-n start-up timings, each run in a new interpreter """
+    runs = list()
+    for _ in range(n_repeat):
+        output = subprocess.check_output([sys.executable, "-c", STARTUP_SCRIPT])
+        runs.append(json.loads(output.decode("utf-8").strip().splitlines()[-1]))
+    return {key: min(run[key] for run in runs) for key in runs[0]}
+
+
+def per_call(normalizer, n_calls):
+    """ Mean latency in microseconds of single normalize calls """
+
+    def mean_us(text, clear_cache):
+        total = 0.0
+        for _ in range(n_calls):
+            if clear_cache:
+                pos_flags.cache_clear()
+            start = time.perf_counter()
+            normalizer.normalize(text)
+            total += time.perf_counter() - start
+        return total / n_calls * 1e6
+
+    normalizer.normalize(CONTEXT_TEXT)
+    return {
+        "plain_us": mean_us(PLAIN_TEXT, False),
+        "pos_cache_miss_us": mean_us(CONTEXT_TEXT, True),
+        "pos_cache_hit_us": mean_us(CONTEXT_TEXT, False),
+    }
+
+
+def throughput(normalizer, sentences, workers, chunk_size):
+    start = time.perf_counter()
+    results = list(normalizer.normalize_batch(sentences, workers=workers, chunk_size=chunk_size))
+    seconds = time.perf_counter() - start
+    return results, {
+        "seconds": seconds,
+        "sentences_per_sec": len(sentences) / seconds,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=str, default="normalizer/golden_corpus.txt")
+    parser.add_argument("--n_sentences", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--chunk_size", type=int, default=BATCH_CHUNK_SIZE)
+    parser.add_argument("--n_startup", type=int, default=5)
+    parser.add_argument("--n_calls", type=int, default=200)
+    parser.add_argument("--output", type=str, default="benchmark_normalizer.json")
+    args = parser.parse_args()
+
+    startup_times = startup(args.n_startup)
+    print(
+        "start-up: import {import_ms:.0f} ms, construct {construct_ms:.1f} ms, "
+        "first call {first_plain_call_ms:.1f} ms, first POS call {first_pos_call_ms:.0f} ms".format(
+            **startup_times
+        )
+    )
+
+    normalizer = TextNormalizer()
+    call_times = per_call(normalizer, args.n_calls)
+    print(
+        "per call: plain {plain_us:.0f} us, POS cache miss {pos_cache_miss_us:.0f} us, "
+        "hit {pos_cache_hit_us:.0f} us".format(**call_times)
+    )
+
+    sentences = load_corpus(args.corpus, args.n_sentences)
+    reference = None
+    results = dict()
+    for workers in sorted(set([1] + args.workers)):
+        outputs, results[workers] = throughput(normalizer, sentences, workers, args.chunk_size)
+        if reference is None:
+            reference = outputs
+        results[workers]["matches_single_process"] = outputs == reference
+        print(
+            "{:>3} workers: {:.2f} s, {:.0f} sentences/s{}".format(
+                workers,
+                results[workers]["seconds"],
+                results[workers]["sentences_per_sec"],
+                "" if outputs == reference else " (OUTPUT MISMATCH)",
+            )
+        )
+
+    report = {
+        "corpus": args.corpus,
+        "n_sentences": len(sentences),
+        "chunk_size": args.chunk_size,
+        "startup": startup_times,
+        "per_call": call_times,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print("Benchmark report written to {}".format(args.output))
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Speed and agreement of the F0 extractors in audio/pitch.py on raw corpus wavs.
+Every extractor is timed on the same utterances, and compared with a reference
+extractor (the original pyworld DIO + StoneMask by default) on voicing decisions
+and cents error over the frames both consider voiced.
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import yaml
+
+from audio.cache import get_audio_cache, load_wav
+from audio.pitch import PITCH_EXTRACTORS, PitchExtractor
+
+
+def load_wavs(config, n_utterances):
+    in_dir = os.path.join(config["path"]["raw_path"], config["path"]["sub_dir_name"])
+    sampling_rate = config["preprocessing"]["audio"]["sampling_rate"]
+    wav_paths = list()
+    for speaker in sorted(os.listdir(in_dir)):
+        if not os.path.isdir(os.path.join(in_dir, speaker)):
+            continue
+        for wav_name in sorted(os.listdir(os.path.join(in_dir, speaker))):
+            if wav_name.endswith(".wav"):
+                wav_paths.append(os.path.join(in_dir, speaker, wav_name))
+    wav_paths = wav_paths[:n_utterances]
+    audio_cache = get_audio_cache(config)
+    return [
+        np.asarray(load_wav(wav_path, sampling_rate, audio_cache), dtype=np.float32)
+        for wav_path in wav_paths
+    ]
+
+
+def extractor_config(config, method):
+    config = dict(config)
+    config["preprocessing"] = dict(config["preprocessing"])
+    config["preprocessing"]["pitch"] = dict(config["preprocessing"]["pitch"], extractor=method)
+    return config
+
+
+def agreement(reference, estimate):
+    """ Voicing agreement and cents error of estimate against reference, frame by frame """
+    reference = np.concatenate(reference)
+    estimate = np.concatenate(estimate)
+    ref_voiced = reference > 0
+    est_voiced = estimate > 0
+    both = ref_voiced & est_voiced
+    cents = np.abs(1200 * np.log2(estimate[both] / reference[both]))
+    report = {
+        "frames": int(len(reference)),
+        "voicing_accuracy": float(np.mean(ref_voiced == est_voiced)),
+        "voicing_recall": float(np.sum(both) / max(np.sum(ref_voiced), 1)),
+        "voicing_false_alarm": float(
+            np.sum(est_voiced & ~ref_voiced) / max(np.sum(~ref_voiced), 1)
+        ),
+    }
+    if len(cents) > 0:
+        report.update(
+            {
+                "cents_mean": float(np.mean(cents)),
+                "cents_p50": float(np.percentile(cents, 50)),
+                "cents_p90": float(np.percentile(cents, 90)),
+                # Octave and other gross errors, more than half a semitone off
+                "gross_error_rate": float(np.mean(cents > 50)),
+            }
+        )
+    return report
+
+
+def benchmark(config, wavs, methods, reference, n_repeat):
+    sampling_rate = config["preprocessing"]["audio"]["sampling_rate"]
+    audio_seconds = sum(len(wav) for wav in wavs) / sampling_rate
+    pitches = dict()
+    results = dict()
+    for method in methods:
+        extractor = PitchExtractor(extractor_config(config, method))
+        times = list()
+        for _ in range(n_repeat):
+            start = time.perf_counter()
+            pitches[method] = extractor.batch(wavs)
+            times.append(time.perf_counter() - start)
+        results[method] = {
+            "seconds": float(np.min(times)),
+            "rtf": float(np.min(times) / audio_seconds),
+        }
+        print(
+            "{:>8}: {:.2f} s for {:.1f} s of audio (RTF {:.4f})".format(
+                method, results[method]["seconds"], audio_seconds, results[method]["rtf"]
+            )
+        )
+
+    for method in methods:
+        if method == reference:
+            continue
+        # Extractors may disagree on the last frame, compare the common part
+        lengths = [
+            min(len(r), len(e)) for r, e in zip(pitches[reference], pitches[method])
+        ]
+        results[method]["agreement"] = agreement(
+            [r[:n] for r, n in zip(pitches[reference], lengths)],
+            [e[:n] for e, n in zip(pitches[method], lengths)],
+        )
+        print(
+            "{:>8} vs {}: voicing accuracy {:.3f}, median error {:.1f} cents".format(
+                method,
+                reference,
+                results[method]["agreement"]["voicing_accuracy"],
+                results[method]["agreement"].get("cents_p50", float("nan")),
+            )
+        )
+
+    return results, audio_seconds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("config", type=str, help="path to preprocess.yaml")
+    parser.add_argument(
+        "--methods",
+        type=str,
+        nargs="+",
+        choices=PITCH_EXTRACTORS,
+        default=PITCH_EXTRACTORS,
+    )
+    parser.add_argument("--reference", type=str, choices=PITCH_EXTRACTORS, default="dio")
+    parser.add_argument("--n_utterances", type=int, default=50)
+    parser.add_argument("--n_repeat", type=int, default=3)
+    parser.add_argument("--output", type=str, default="benchmark_pitch.json")
+    args = parser.parse_args()
+
+    config = yaml.load(open(args.config, "r"), Loader=yaml.FullLoader)
+    methods = list(args.methods)
+    if args.reference not in methods:
+        methods.insert(0, args.reference)
+
+    wavs = load_wavs(config, args.n_utterances)
+    results, audio_seconds = benchmark(config, wavs, methods, args.reference, args.n_repeat)
+
+    report = {
+        "config": args.config,
+        "reference": args.reference,
+        "n_utterances": len(wavs),
+        "audio_seconds": audio_seconds,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print("Benchmark report written to {}".format(args.output))
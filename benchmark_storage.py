@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Footprint, loading bandwidth and loss impact of preprocessing.storage_dtype: float16.
+A sample of a float32 preprocessed dataset is converted the way the preprocessor
+stores it (float16 mel/pitch/energy, uint16 durations) into a temporary directory,
+both copies are loaded back, and with --restore_step the FastSpeech2 loss on
+float32 and float16-rounded targets is compared.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import torch
+import yaml
+from torch.utils.data import DataLoader
+
+from utils.model import get_model
+from utils.tools import to_device, load_feature_stats
+from model import FastSpeech2Loss
+from dataset_chinese import Dataset
+
+FEATURES = ["mel", "pitch", "energy", "duration"]
+HALF_DTYPES = {
+    "mel": np.float16,
+    "pitch": np.float16,
+    "energy": np.float16,
+    "duration": np.uint16,
+}
+
+
+def feature_paths(preprocessed_path, filename, n_utterances):
+    with open(os.path.join(preprocessed_path, filename), "r", encoding="utf-8") as f:
+        lines = f.readlines()[:n_utterances]
+    paths = list()
+    for line in lines:
+        basename, speaker = line.strip("\n").split("|")[:2]
+        paths.append(
+            {
+                feature: os.path.join(
+                    preprocessed_path,
+                    feature,
+                    "{}-{}-{}.npy".format(speaker, feature, basename),
+                )
+                for feature in FEATURES
+            }
+        )
+    return paths
+
+
+def convert(paths, out_dir):
+    """ float16 copies of the sample, and the largest conversion error per feature """
+    half_paths = list()
+    errors = {feature: 0.0 for feature in FEATURES}
+    for utterance in paths:
+        half_utterance = dict()
+        for feature, path in utterance.items():
+            values = np.load(path)
+            half = values.astype(HALF_DTYPES[feature])
+            errors[feature] = max(
+                errors[feature],
+                float(np.max(np.abs(half.astype(np.float64) - values), initial=0.0)),
+            )
+            half_path = os.path.join(out_dir, os.path.basename(path))
+            np.save(half_path, half)
+            half_utterance[feature] = half_path
+        half_paths.append(half_utterance)
+    return half_paths, errors
+
+
+def footprint(paths):
+    return {
+        feature: sum(os.path.getsize(utterance[feature]) for utterance in paths)
+        for feature in FEATURES
+    }
+
+
+def load_bandwidth(paths, n_repeat):
+    """ Best-of-n time to load the sample and upcast it as the loader does """
+    total_bytes = sum(footprint(paths).values())
+    times = list()
+    for _ in range(n_repeat):
+        start = time.perf_counter()
+        for utterance in paths:
+            for feature in ["mel", "pitch", "energy"]:
+                np.load(utterance[feature]).astype(np.float32)
+            np.load(utterance["duration"]).astype(np.int64)
+        times.append(time.perf_counter() - start)
+    seconds = min(times)
+    return {
+        "seconds": seconds,
+        "mb_per_sec": total_bytes / seconds / 1024 ** 2,
+        "utterances_per_sec": len(paths) / seconds,
+    }
+
+
+def round_to_half(batch, feature_stats):
+    """ Targets of the batch as they would be read back from float16 storage """
+    batch = list(batch)
+    batch[9] = batch[9].half().float()
+    for index, feature in [(12, "pitch"), (13, "energy")]:
+        if feature_stats is None:
+            batch[index] = batch[index].half().float()
+        else:
+            mean, std = feature_stats[feature]
+            raw = (batch[index] * std + mean).half().float()
+            batch[index] = (raw - mean) / std
+    return tuple(batch)
+
+
+def loss_regression(args, configs, device, n_batches):
+    preprocess_config, model_config, train_config = configs
+    dataset = Dataset(args.split, preprocess_config, model_config, train_config, sort=False)
+    batch_size = train_config["optimizer"]["batch_size"]
+    loader = DataLoader(
+        dataset, batch_size=batch_size, shuffle=False, collate_fn=dataset.collate_fn
+    )
+    model = get_model(args, configs, device, train=False)
+    Loss = FastSpeech2Loss(preprocess_config, model_config).to(device)
+    feature_stats = load_feature_stats(preprocess_config["path"]["preprocessed_path"])
+
+    full_losses, half_losses = list(), list()
+    with torch.no_grad():
+        for batchs in loader:
+            for batch in batchs:
+                batch = to_device(batch, device)
+                half_batch = round_to_half(batch, feature_stats)
+                full_losses.append(Loss(batch, model(*(batch[2:])))[0].item())
+                half_losses.append(Loss(half_batch, model(*(half_batch[2:])))[0].item())
+            if len(full_losses) >= n_batches:
+                break
+
+    full_loss, half_loss = float(np.mean(full_losses)), float(np.mean(half_losses))
+    return {
+        "float32_total_loss": full_loss,
+        "float16_total_loss": half_loss,
+        "relative_difference": (half_loss - full_loss) / full_loss,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--split", type=str, default="val.txt")
+    parser.add_argument("--n_utterances", type=int, default=500)
+    parser.add_argument("--n_repeat", type=int, default=3)
+    parser.add_argument("--n_batches", type=int, default=20)
+    parser.add_argument(
+        "--restore_step",
+        type=int,
+        default=None,
+        help="checkpoint used to compare the loss on float32 and float16 targets",
+    )
+    parser.add_argument("--output", type=str, default="benchmark_storage.json")
+    parser.add_argument(
+        "-p",
+        "--preprocess_config",
+        type=str,
+        required=True,
+        help="path to preprocess.yaml",
+    )
+    parser.add_argument("-m", "--model_config", type=str, help="path to model.yaml")
+    parser.add_argument("-t", "--train_config", type=str, help="path to train.yaml")
+    args = parser.parse_args()
+
+    preprocess_config = yaml.load(
+        open(args.preprocess_config, "r"), Loader=yaml.FullLoader
+    )
+    preprocessed_path = preprocess_config["path"]["preprocessed_path"]
+    paths = feature_paths(preprocessed_path, args.split, args.n_utterances)
+
+    report = {"n_utterances": len(paths)}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        half_paths, errors = convert(paths, tmp_dir)
+        for name, sample in [("float32", paths), ("float16", half_paths)]:
+            report[name] = {
+                "footprint_bytes": footprint(sample),
+                "load": load_bandwidth(sample, args.n_repeat),
+            }
+    report["max_abs_error"] = errors
+    full_bytes = sum(report["float32"]["footprint_bytes"].values())
+    half_bytes = sum(report["float16"]["footprint_bytes"].values())
+    report["footprint_ratio"] = half_bytes / full_bytes
+    report["load_speedup"] = (
+        report["float32"]["load"]["seconds"] / report["float16"]["load"]["seconds"]
+    )
+    print(
+        "footprint {:.1f} MB -> {:.1f} MB, load {:.1f} -> {:.1f} utterances/s".format(
+            full_bytes / 1024 ** 2,
+            half_bytes / 1024 ** 2,
+            report["float32"]["load"]["utterances_per_sec"],
+            report["float16"]["load"]["utterances_per_sec"],
+        )
+    )
+
+    if args.restore_step is not None:
+        model_config = yaml.load(open(args.model_config, "r"), Loader=yaml.FullLoader)
+        train_config = yaml.load(open(args.train_config, "r"), Loader=yaml.FullLoader)
+        configs = (preprocess_config, model_config, train_config)
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        report["loss"] = loss_regression(args, configs, device, args.n_batches)
+        print(
+            "total loss {:.4f} (float32) vs {:.4f} (float16)".format(
+                report["loss"]["float32_total_loss"], report["loss"]["float16_total_loss"]
+            )
+        )
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print("Benchmark report written to {}".format(args.output))
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Real-time-factor benchmark of the full Mandarin synthesis pipeline:
+text normalization -> phoneme conversion -> FastSpeech2 -> HiFi-GAN.
+Per-stage latency percentiles, RTF, throughput and peak RSS are written as JSON
+so that optimizations can be tracked across commits. Phoneme conversion runs through
+the PinyinFrontend used by synthesize_chinese_pinyin.py: the phonemize stage is timed
+with its caches cleared, phonemize_cached repeats the same sentences from the cache
+and is not part of the total.
+"""
+
+import argparse
+import json
+import platform
+import resource
+import time
+
+import numpy as np
+import torch
+import yaml
+
+from m_text_normalizer import TextNormalizer
+from text.pinyin_frontend import PinyinFrontend
+from utils.model import get_model, get_vocoder, vocoder_infer
+from utils.tools import to_device, pad_1D
+
+STAGES = ["normalize", "phonemize", "acoustic", "vocoder"]
+CACHED_STAGE = "phonemize_cached"
+
+# Fixed corpus so that results are comparable between runs
+BENCHMARK_CORPUS = {
+    "short": [
+        "你好。",
+        "欢迎光临。",
+        "请稍等。",
+        "谢谢您的来电。",
+        "今天天气很好。",
+        "我们明天见。",
+    ],
+    "medium": [
+        "您的订单已于2023年5月12日发出，请注意查收。",
+        "本次通话可能会被录音，以便提高我们的服务质量。",
+        "今天的最高气温是28度，最低气温是19度。",
+        "请拨打客服电话4008123123咨询更多信息。",
+        "您的账户余额为1234.56元，感谢您的使用。",
+        "下一站是人民广场，请要下车的乘客做好准备。",
+    ],
+    "long": [
+        "尊敬的用户您好，您本月共使用流量12.5GB，通话时长356分钟，"
+        "账单金额为128元，请于本月25日前完成缴费，以免影响您的正常使用。",
+        "春天来了，公园里的花都开了，红的像火，粉的像霞，白的像雪，"
+        "孩子们在草地上奔跑嬉戏，老人们坐在长椅上聊天，一切都显得那么美好。",
+        "根据气象台发布的预报，受冷空气影响，未来三天我市将出现明显降温，"
+        "最低气温将降至零下5度，请广大市民注意防寒保暖，出行注意安全。",
+        "会议将于下午3点30分在三楼会议室召开，请各部门负责人准时参加，"
+        "并提前准备好本季度的工作总结和下一季度的工作计划。",
+    ],
+}
+
+
+def synchronize(device):
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+
+
+def phonemize(frontend, sentences):
+    return [np.array(frontend.text_to_ids(text), dtype=np.int64) for text in sentences]
+
+
+def run_once(sentences, normalizer, frontend, model, vocoder, configs, device):
+    preprocess_config, model_config, train_config = configs
+    timings = {}
+
+    start = time.perf_counter()
+    normalized = [normalizer.normalize(text) for text in sentences]
+    timings["normalize"] = time.perf_counter() - start
+
+    # Cold: sentence and syllable caches emptied, as for text never seen before
+    frontend.cache_clear()
+    start = time.perf_counter()
+    sequences = phonemize(frontend, normalized)
+    timings["phonemize"] = time.perf_counter() - start
+
+    # Cached: the same sentences again, as for repeated prompts
+    start = time.perf_counter()
+    phonemize(frontend, normalized)
+    timings[CACHED_STAGE] = time.perf_counter() - start
+
+    n = len(sentences)
+    text_lens = np.array([len(sequence) for sequence in sequences])
+    zeros = np.zeros(n, dtype=np.int64)
+    batch = (
+        [str(i) for i in range(n)],
+        normalized,
+        zeros,
+        zeros,
+        zeros,
+        zeros,
+        pad_1D(sequences),
+        text_lens,
+        max(text_lens),
+    )
+
+    synchronize(device)
+    start = time.perf_counter()
+    batch = to_device(batch, device)
+    with torch.no_grad():
+        output = model(*(batch[2:]))
+    synchronize(device)
+    timings["acoustic"] = time.perf_counter() - start
+
+    hop_length = preprocess_config["preprocessing"]["stft"]["hop_length"]
+    start = time.perf_counter()
+    vocoder_infer(
+        output[1].transpose(1, 2),
+        vocoder,
+        model_config,
+        preprocess_config,
+        lengths=output[9] * hop_length,
+    )
+    synchronize(device)
+    timings["vocoder"] = time.perf_counter() - start
+
+    sampling_rate = preprocess_config["preprocessing"]["audio"]["sampling_rate"]
+    audio_seconds = output[9].sum().item() * hop_length / sampling_rate
+
+    return timings, audio_seconds
+
+
+def summarize(values):
+    values = np.array(values) * 1000
+    return {
+        "mean_ms": float(np.mean(values)),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p90_ms": float(np.percentile(values, 90)),
+        "p99_ms": float(np.percentile(values, 99)),
+    }
+
+
+def benchmark(normalizer, frontend, model, vocoder, configs, device, batch_sizes, n_iter, n_warmup):
+    results = []
+    for bucket, corpus in BENCHMARK_CORPUS.items():
+        for batch_size in batch_sizes:
+            stage_times = {stage: [] for stage in STAGES + [CACHED_STAGE]}
+            total_times = []
+            total_audio = 0.0
+            for i in range(n_warmup + n_iter):
+                sentences = [
+                    corpus[(i * batch_size + j) % len(corpus)] for j in range(batch_size)
+                ]
+                timings, audio_seconds = run_once(
+                    sentences, normalizer, frontend, model, vocoder, configs, device
+                )
+                if i < n_warmup:
+                    continue
+                for stage in stage_times:
+                    stage_times[stage].append(timings[stage])
+                total_times.append(sum(timings[stage] for stage in STAGES))
+                total_audio += audio_seconds
+
+            total_seconds = sum(total_times)
+            results.append(
+                {
+                    "bucket": bucket,
+                    "batch_size": batch_size,
+                    "stages": {stage: summarize(times) for stage, times in stage_times.items()},
+                    "total": summarize(total_times),
+                    "rtf": total_seconds / max(total_audio, 1e-8),
+                    "sentences_per_sec": n_iter * batch_size / total_seconds,
+                    "audio_seconds_per_sec": total_audio / total_seconds,
+                }
+            )
+            print(
+                "{:>6} x{:<3} RTF {:.4f}, {:.1f} sentences/s, p50 {:.1f} ms".format(
+                    bucket,
+                    batch_size,
+                    results[-1]["rtf"],
+                    results[-1]["sentences_per_sec"],
+                    results[-1]["total"]["p50_ms"],
+                )
+            )
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--restore_step", type=int, required=True)
+    parser.add_argument("--batch_sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--n_iter", type=int, default=20)
+    parser.add_argument("--n_warmup", type=int, default=3)
+    parser.add_argument(
+        "--device",
+        type=str,
+        default="cuda" if torch.cuda.is_available() else "cpu",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="number of CPU threads used by torch",
+    )
+    parser.add_argument(
+        "--postnet_mode",
+        type=str,
+        choices=["full", "light", "none"],
+        default=None,
+    )
+    parser.add_argument("--output", type=str, default="benchmark_synthesis.json")
+    parser.add_argument(
+        "-p",
+        "--preprocess_config",
+        type=str,
+        required=True,
+        help="path to preprocess.yaml",
+    )
+    parser.add_argument(
+        "-m", "--model_config", type=str, required=True, help="path to model.yaml"
+    )
+    parser.add_argument(
+        "-t", "--train_config", type=str, required=True, help="path to train.yaml"
+    )
+    args = parser.parse_args()
+
+    if args.threads is not None:
+        torch.set_num_threads(args.threads)
+    device = torch.device(args.device)
+
+    # Read Config
+    preprocess_config = yaml.load(
+        open(args.preprocess_config, "r"), Loader=yaml.FullLoader
+    )
+    model_config = yaml.load(open(args.model_config, "r"), Loader=yaml.FullLoader)
+    train_config = yaml.load(open(args.train_config, "r"), Loader=yaml.FullLoader)
+    configs = (preprocess_config, model_config, train_config)
+
+    normalizer = TextNormalizer()
+    frontend = PinyinFrontend()
+    model = get_model(args, configs, device, train=False)
+    vocoder = get_vocoder(model_config, device)
+
+    results = benchmark(
+        normalizer,
+        frontend,
+        model,
+        vocoder,
+        configs,
+        device,
+        args.batch_sizes,
+        args.n_iter,
+        args.n_warmup,
+    )
+
+    report = {
+        "device": str(device),
+        "threads": torch.get_num_threads(),
+        "torch": torch.__version__,
+        "platform": platform.platform(),
+        "model_config": args.model_config,
+        "restore_step": args.restore_step,
+        "postnet_mode": model.postnet_mode,
+        "vocoder": model_config["vocoder"],
+        "results": results,
+        # ru_maxrss is reported in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    if device.type == "cuda":
+        report["peak_cuda_mb"] = torch.cuda.max_memory_allocated() / 1024 ** 2
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print("Benchmark report written to {}".format(args.output))
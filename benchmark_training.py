@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Training throughput benchmark on synthetic batches.
+Batches follow the 15-tuple layout of Dataset.reprocess, so no preprocessed corpus
+is needed; forward, loss, backward and optimizer step of FastSpeech2 are timed separately.
+"""
+
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+import yaml
+
+from model import FastSpeech2, FastSpeech2Loss, ScheduledOptim
+from utils.tools import to_device, pad_1D, pad_2D
+
+PHASES = ["forward", "loss", "backward", "optimizer"]
+
+
+def write_synthetic_metadata(preprocessed_path, n_speaker, n_emotion):
+    """ speakers.json, emotions.json and stats.json needed to build FastSpeech2 """
+    with open(os.path.join(preprocessed_path, "speakers.json"), "w") as f:
+        json.dump({"spk{}".format(i): i for i in range(n_speaker)}, f)
+    with open(os.path.join(preprocessed_path, "emotions.json"), "w") as f:
+        emotion_dict = {"emo{}".format(i): i for i in range(n_emotion)}
+        json.dump(
+            {
+                "emotion_dict": emotion_dict,
+                "arousal_dict": emotion_dict,
+                "valence_dict": emotion_dict,
+            },
+            f,
+        )
+    with open(os.path.join(preprocessed_path, "stats.json"), "w") as f:
+        json.dump({"pitch": [-3.0, 3.0, 0.0, 1.0], "energy": [-3.0, 3.0, 0.0, 1.0]}, f)
+
+
+def sample_text_len(rng, args):
+    if args.len_dist == "normal":
+        mean = (args.min_text_len + args.max_text_len) / 2
+        std = (args.max_text_len - args.min_text_len) / 4
+        length = int(round(rng.normal(mean, std)))
+    else:
+        length = int(rng.integers(args.min_text_len, args.max_text_len + 1))
+    return int(np.clip(length, args.min_text_len, args.max_text_len))
+
+
+def synthetic_sample(rng, args, preprocess_config, n_symbols):
+    text_len = sample_text_len(rng, args)
+    duration = rng.integers(args.min_duration, args.max_duration + 1, size=text_len)
+    mel_len = int(duration.sum())
+    n_mel_channels = preprocess_config["preprocessing"]["mel"]["n_mel_channels"]
+    pitch_len = (
+        text_len
+        if preprocess_config["preprocessing"]["pitch"]["feature"] == "phoneme_level"
+        else mel_len
+    )
+    energy_len = (
+        text_len
+        if preprocess_config["preprocessing"]["energy"]["feature"] == "phoneme_level"
+        else mel_len
+    )
+    return {
+        "text": rng.integers(1, n_symbols, size=text_len),
+        "mel": rng.standard_normal((mel_len, n_mel_channels)).astype(np.float32),
+        "pitch": rng.standard_normal(pitch_len),
+        "energy": rng.standard_normal(energy_len).astype(np.float32),
+        "duration": duration,
+    }
+
+
+def synthetic_batch(samples, rng, n_speaker, n_emotion):
+    """ Same layout and dtypes as Dataset.reprocess """
+    n = len(samples)
+    texts = [s["text"] for s in samples]
+    mels = [s["mel"] for s in samples]
+    text_lens = np.array([text.shape[0] for text in texts])
+    mel_lens = np.array([mel.shape[0] for mel in mels])
+    return (
+        ["synthetic{}".format(i) for i in range(n)],
+        ["" for _ in range(n)],
+        rng.integers(0, n_speaker, size=n),
+        rng.integers(0, n_emotion, size=n),
+        rng.integers(0, n_emotion, size=n),
+        rng.integers(0, n_emotion, size=n),
+        pad_1D(texts),
+        text_lens,
+        max(text_lens),
+        pad_2D(mels),
+        mel_lens,
+        max(mel_lens),
+        pad_1D([s["pitch"] for s in samples]),
+        pad_1D([s["energy"] for s in samples]),
+        pad_1D([s["duration"] for s in samples]),
+    )
+
+
+def generate_batches(args, preprocess_config, n_symbols):
+    rng = np.random.default_rng(args.seed)
+    batches = []
+    while len(batches) < args.n_warmup + args.n_iter:
+        samples = [
+            synthetic_sample(rng, args, preprocess_config, n_symbols)
+            for _ in range(args.batch_size * args.group_size)
+        ]
+        if args.bucketing:
+            # Sort a group by length as Dataset.collate_fn does with sort=True
+            samples.sort(key=lambda s: -s["text"].shape[0])
+        for i in range(0, len(samples), args.batch_size):
+            batches.append(
+                synthetic_batch(
+                    samples[i : i + args.batch_size],
+                    rng,
+                    args.n_speaker,
+                    args.n_emotion,
+                )
+            )
+    return batches[: args.n_warmup + args.n_iter]
+
+
+def synchronize(device):
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+
+
+def benchmark(model, Loss, optimizer, batches, args, train_config, device):
+    grad_clip_thresh = train_config["optimizer"]["grad_clip_thresh"]
+    amp_dtype = torch.float16 if device.type == "cuda" else torch.bfloat16
+    scaler = torch.cuda.amp.GradScaler(enabled=args.amp and device.type == "cuda")
+
+    phase_times = {phase: [] for phase in PHASES}
+    n_samples = 0
+    n_frames = 0
+    for i, batch in enumerate(batches):
+        batch = to_device(batch, device)
+        timings = {}
+
+        synchronize(device)
+        start = time.perf_counter()
+        with torch.autocast(device.type, dtype=amp_dtype, enabled=args.amp):
+            output = model(*(batch[2:]))
+        synchronize(device)
+        timings["forward"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with torch.autocast(device.type, dtype=amp_dtype, enabled=args.amp):
+            losses = Loss(batch, output)
+        synchronize(device)
+        timings["loss"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scaler.scale(losses[0]).backward()
+        synchronize(device)
+        timings["backward"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scaler.unscale_(optimizer._optimizer)
+        nn.utils.clip_grad_norm_(model.parameters(), grad_clip_thresh)
+        optimizer._update_learning_rate()
+        scaler.step(optimizer._optimizer)
+        scaler.update()
+        optimizer.zero_grad()
+        synchronize(device)
+        timings["optimizer"] = time.perf_counter() - start
+
+        if i < args.n_warmup:
+            continue
+        for phase in PHASES:
+            phase_times[phase].append(timings[phase])
+        n_samples += len(batch[0])
+        n_frames += int(batch[10].sum().item())
+
+    step_seconds = sum(sum(times) for times in phase_times.values())
+    report = {
+        "phases": {
+            phase: {
+                "mean_ms": float(np.mean(times) * 1000),
+                "p50_ms": float(np.percentile(times, 50) * 1000),
+                "p90_ms": float(np.percentile(times, 90) * 1000),
+            }
+            for phase, times in phase_times.items()
+        },
+        "step_mean_ms": step_seconds / args.n_iter * 1000,
+        "samples_per_sec": n_samples / step_seconds,
+        "frames_per_sec": n_frames / step_seconds,
+    }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch_size", type=int, default=16)
+    parser.add_argument(
+        "--group_size",
+        type=int,
+        default=4,
+        help="number of batches sorted together when --bucketing is set",
+    )
+    parser.add_argument("--bucketing", action="store_true")
+    parser.add_argument("--amp", action="store_true")
+    parser.add_argument("--len_dist", type=str, choices=["uniform", "normal"], default="uniform")
+    parser.add_argument("--min_text_len", type=int, default=10)
+    parser.add_argument("--max_text_len", type=int, default=120)
+    parser.add_argument("--min_duration", type=int, default=1)
+    parser.add_argument("--max_duration", type=int, default=12)
+    parser.add_argument("--n_speaker", type=int, default=10)
+    parser.add_argument("--n_emotion", type=int, default=5)
+    parser.add_argument("--n_iter", type=int, default=50)
+    parser.add_argument("--n_warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument(
+        "--device",
+        type=str,
+        default="cuda" if torch.cuda.is_available() else "cpu",
+    )
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--output", type=str, default="benchmark_training.json")
+    parser.add_argument(
+        "-p",
+        "--preprocess_config",
+        type=str,
+        required=True,
+        help="path to preprocess.yaml",
+    )
+    parser.add_argument(
+        "-m", "--model_config", type=str, required=True, help="path to model.yaml"
+    )
+    parser.add_argument(
+        "-t", "--train_config", type=str, required=True, help="path to train.yaml"
+    )
+    args = parser.parse_args()
+
+    if args.threads is not None:
+        torch.set_num_threads(args.threads)
+    device = torch.device(args.device)
+    torch.manual_seed(args.seed)
+
+    # Read Config
+    preprocess_config = yaml.load(
+        open(args.preprocess_config, "r"), Loader=yaml.FullLoader
+    )
+    model_config = yaml.load(open(args.model_config, "r"), Loader=yaml.FullLoader)
+    train_config = yaml.load(open(args.train_config, "r"), Loader=yaml.FullLoader)
+
+    with tempfile.TemporaryDirectory() as preprocessed_path:
+        write_synthetic_metadata(preprocessed_path, args.n_speaker, args.n_emotion)
+        preprocess_config["path"]["preprocessed_path"] = preprocessed_path
+
+        model = FastSpeech2(preprocess_config, model_config).to(device)
+        model.train()
+        Loss = FastSpeech2Loss(preprocess_config, model_config).to(device)
+        optimizer = ScheduledOptim(model, train_config, model_config, 0)
+
+    n_symbols = model.encoder.src_word_emb.num_embeddings
+    batches = generate_batches(args, preprocess_config, n_symbols)
+    report = benchmark(model, Loss, optimizer, batches, args, train_config, device)
+    report.update(
+        {
+            "device": str(device),
+            "threads": torch.get_num_threads(),
+            "torch": torch.__version__,
+            "batch_size": args.batch_size,
+            "bucketing": args.bucketing,
+            "amp": args.amp,
+            "len_dist": args.len_dist,
+            "text_len_range": [args.min_text_len, args.max_text_len],
+            "duration_range": [args.min_duration, args.max_duration],
+            # ru_maxrss is reported in kilobytes on Linux
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+    )
+    if device.type == "cuda":
+        report["peak_cuda_mb"] = torch.cuda.max_memory_allocated() / 1024 ** 2
+
+    for phase in PHASES:
+        print("{:>9}: {:.2f} ms".format(phase, report["phases"][phase]["mean_ms"]))
+    print(
+        "{:.1f} samples/s, {:.0f} frames/s, peak RSS {:.0f} MB".format(
+            report["samples_per_sec"], report["frames_per_sec"], report["peak_rss_mb"]
+        )
+    )
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Build text/pinyin_syllables.json, the syllable -> phoneme ID table loaded by
+text.pinyin_frontend, from the initials and finals of text/pinyin.py and the
+decomposition rules of text.pinyin_frontend.pinyin_to_phonemes.
+With --check the shipped table is validated against the rules and the syllables
+of the pinyin lexicon instead, exiting with status 1 on any difference.
+Rebuild after changing text/symbols_pinyin.py or the decomposition rules.
+"""
+
+import argparse
+import sys
+
+from text.pinyin_frontend import pinyin_to_phonemes
+from text.pinyin_table import (
+    TABLE_PATH,
+    build_syllable_table,
+    load_syllable_table,
+    save_syllable_table,
+    validate_syllable_table,
+)
+
+
+def lexicon_syllables(path):
+    """ Toneless syllables of an MFA pinyin dictionary such as lexicon/mandarin_pinyin.dict """
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.split()[0].rstrip("12345") for line in f if line.strip()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", type=str, default=TABLE_PATH)
+    parser.add_argument("--lexicon", type=str, default="lexicon/mandarin_pinyin.dict")
+    parser.add_argument("--check", action="store_true", help="validate the table instead of writing it")
+    args = parser.parse_args()
+
+    if args.check:
+        table = load_syllable_table(args.output)
+        if table is None:
+            print("{} is missing or was built for another symbol set".format(args.output))
+            sys.exit(1)
+    else:
+        table = build_syllable_table(pinyin_to_phonemes)
+
+    errors = validate_syllable_table(table, pinyin_to_phonemes, lexicon_syllables(args.lexicon))
+    for error in errors:
+        print(error)
+    if errors:
+        sys.exit(1)
+
+    if not args.check:
+        save_syllable_table(table, args.output)
+        print("{} syllables written to {}".format(len(table), args.output))
+    else:
+        print("{} syllables match the decomposition rules".format(len(table)))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Check the startup cost of the synthesis and training entry points with
+python -X importtime: each entry point is imported in a fresh interpreter, its
+cumulative import time must stay within --budget_ms, and none of the modules
+that are only loaded when selected by config (language front ends of other
+languages, plotting, vocoder backends) may be imported.
+Exits with status 1 if an entry point fails to import, is over budget, or
+imports a deferred module.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ENTRY_POINTS = ["synthesize", "synthesize_chinese_pinyin", "train"]
+
+# Imported on first use only: English and Korean G2P, English number expansion,
+# matplotlib (plots of synth_samples/synth_one_sample) and the vocoder backends (get_vocoder)
+DEFERRED_MODULES = ["g2p_en", "g2pk", "quickspacer", "inflect", "matplotlib", "hifigan", "audio.tools"]
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_time(module):
+    """Imports module in a fresh interpreter.
+
+    Returns the cumulative import time of module in milliseconds and the
+    {name: cumulative ms} of every module it imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import {}".format(module)],
+        cwd=ROOT,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError("import {} failed:\n{}".format(module, result.stderr.strip().splitlines()[-1]))
+
+    # Lines look like "import time:       412 |       1203 |   text.korean", nested imports
+    # indented by two more spaces and listed before their parent. Top-level imports before
+    # module belong to interpreter startup (site, encodings) and are dropped.
+    modules = dict()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].strip()
+        modules[name] = int(fields[1]) / 1000
+        top_level = len(fields[2]) - len(fields[2].lstrip()) == 1
+        if top_level and name != module:
+            modules = dict()
+    return modules[module], modules
+
+
+def deferred_imports(modules):
+    return sorted(
+        name for name in modules
+        if any(name == deferred or name.startswith(deferred + ".") for deferred in DEFERRED_MODULES)
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entry_points", type=str, nargs="+", default=ENTRY_POINTS)
+    parser.add_argument("--budget_ms", type=float, default=5000.0)
+    parser.add_argument("--n_repeat", type=int, default=3, help="best of n, the first run also warms the disk cache")
+    parser.add_argument("--n_slowest", type=int, default=5, help="slowest imports listed per entry point")
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    failures = list()
+    report = {"budget_ms": args.budget_ms, "entry_points": dict()}
+    for entry_point in args.entry_points:
+        try:
+            runs = [import_time(entry_point) for _ in range(args.n_repeat)]
+        except RuntimeError as e:
+            print("FAIL {}".format(e))
+            failures.append(entry_point)
+            continue
+        total_ms, modules = min(runs, key=lambda run: run[0])
+        deferred = deferred_imports(modules)
+        slowest = sorted(
+            ((name, ms) for name, ms in modules.items() if name != entry_point),
+            key=lambda item: item[1],
+            reverse=True,
+        )[:args.n_slowest]
+
+        ok = total_ms <= args.budget_ms and not deferred
+        print("{} {}: {:.1f} ms (budget {:.1f} ms)".format("OK" if ok else "FAIL", entry_point, total_ms, args.budget_ms))
+        for name in deferred:
+            print("  imports deferred module {}".format(name))
+        for name, ms in slowest:
+            print("  {:>10.1f} ms  {}".format(ms, name))
+        if not ok:
+            failures.append(entry_point)
+
+        report["entry_points"][entry_point] = {
+            "import_ms": total_ms,
+            "deferred_imports": deferred,
+            "slowest": slowest,
+        }
+
+    report["failures"] = failures
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+        print("Report written to {}".format(args.output))
+
+    sys.exit(1 if failures else 0)
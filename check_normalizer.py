@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Check the compiled RuleEngine of TextNormalizer against the original stage-by-stage
+pipeline (normalize_legacy) on a golden corpus, and compare their latency.
+Exits with status 1 if any sentence is normalized differently.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from m_text_normalizer import TextNormalizer
+
+
+def load_corpus(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def compare(normalizer, sentences):
+    mismatches = list()
+    for text in sentences:
+        expected = normalizer.normalize_legacy(text)
+        actual = normalizer.normalize_(text)
+        if actual != expected:
+            mismatches.append({"text": text, "legacy": expected, "engine": actual})
+    return mismatches
+
+
+def latency(normalize, sentences, n_repeat):
+    """ Best-of-n mean time per sentence, in milliseconds """
+    times = list()
+    for _ in range(n_repeat):
+        start = time.perf_counter()
+        for text in sentences:
+            normalize(text)
+        times.append(time.perf_counter() - start)
+    return min(times) / len(sentences) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=str, default="normalizer/golden_corpus.txt")
+    parser.add_argument("--n_repeat", type=int, default=20)
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    sentences = load_corpus(args.corpus)
+    normalizer = TextNormalizer()
+
+    mismatches = compare(normalizer, sentences)
+    for mismatch in mismatches:
+        print("MISMATCH {}".format(mismatch["text"]))
+        print("  legacy: {}".format(mismatch["legacy"]))
+        print("  engine: {}".format(mismatch["engine"]))
+    print("{}/{} sentences match the legacy pipeline".format(
+        len(sentences) - len(mismatches), len(sentences)))
+
+    report = {
+        "corpus": args.corpus,
+        "n_sentences": len(sentences),
+        "mismatches": mismatches,
+        "legacy_ms_per_sentence": latency(normalizer.normalize_legacy, sentences, args.n_repeat),
+        "engine_ms_per_sentence": latency(normalizer.normalize_, sentences, args.n_repeat),
+    }
+    print("legacy {:.3f} ms/sentence, engine {:.3f} ms/sentence".format(
+        report["legacy_ms_per_sentence"], report["engine_ms_per_sentence"]))
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+        print("Report written to {}".format(args.output))
+
+    sys.exit(1 if mismatches else 0)
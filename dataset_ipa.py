@@ -3,25 +3,40 @@ import math
 import os
 
 import numpy as np
+import torch
 from torch.utils.data import Dataset
 
+from text import symbols_ipa
 from text.ipa_processor import text_to_sequence_ipa
-from utils.tools import pad_1D, pad_2D
+from text.phoneme_store import PhonemeStore
+from utils.tools import pad_1D, collate_1D, collate_2D, load_feature_stats
 from tqdm import tqdm
 
 
+def encode_ipa_phones(texts):
+    return [np.array(text_to_sequence_ipa(text), dtype=np.int64) for text in texts]
+
+
 class Dataset(Dataset):
     def __init__(
-        self, filename, preprocess_config, model_config, train_config, sort=False, drop_last=False
+        self, filename, preprocess_config, model_config, train_config, sort=False, drop_last=False,
+        pin_memory=False
     ):
         self.dataset_name = preprocess_config["dataset"]
         self.preprocessed_path = preprocess_config["path"]["preprocessed_path"]
         self.max_seq_len = model_config["max_seq_len"]
         self.batch_size = train_config["optimizer"]["batch_size"]
 
-        self.basename, self.speaker, self.text, self.raw_text, self.aux_data = self.process_meta(
+        self.basename, self.speaker, self.text, self.raw_text, self.aux_data, self.rows = self.process_meta(
             filename
         )
+        # 音素ID序列只在元数据变化时编码一次，保存在元数据旁并通过内存映射读取
+        self.phones = PhonemeStore.load(
+            os.path.join(self.preprocessed_path, filename),
+            encode_ipa_phones,
+            "ipa",
+            symbols_ipa.symbols,
+        )
         with open(os.path.join(self.preprocessed_path, "speakers.json")) as f:
             self.speaker_map = json.load(f)
         with open(os.path.join(self.preprocessed_path, "emotions.json")) as f:
@@ -31,6 +46,8 @@ class Dataset(Dataset):
             self.valence_map = json_raw["valence_dict"]
         self.sort = sort
         self.drop_last = drop_last
+        self.pin_memory = pin_memory
+        self.feature_stats = load_feature_stats(self.preprocessed_path)
 
     def __len__(self):
         return len(self.text)
@@ -45,15 +62,16 @@ class Dataset(Dataset):
         valence = self.valence_map[aux_data[-1]]
         raw_text = self.raw_text[idx]
         
-        # 使用IPA文本处理器
-        phone = np.array(text_to_sequence_ipa(self.text[idx]))
+        # IPA音素序列在建库时已经过IPA文本处理器编码
+        phone = self.phones[self.rows[idx]]
         
         mel_path = os.path.join(
             self.preprocessed_path,
             "mel",
             "{}-mel-{}.npy".format(speaker, basename),
         )
-        mel = np.load(mel_path).astype(np.float32)
+        # float16 mels are kept as stored and upcast on device by to_device
+        mel = np.load(mel_path)
         pitch_path = os.path.join(
             self.preprocessed_path,
             "pitch",
@@ -66,6 +84,11 @@ class Dataset(Dataset):
             "{}-energy-{}.npy".format(speaker, basename),
         )
         energy = np.load(energy_path).astype(np.float32)
+        if self.feature_stats is not None:
+            pitch_mean, pitch_std = self.feature_stats["pitch"]
+            energy_mean, energy_std = self.feature_stats["energy"]
+            pitch = (pitch - pitch_mean) / pitch_std
+            energy = (energy - energy_mean) / energy_std
         duration_path = os.path.join(
             self.preprocessed_path,
             "duration",
@@ -98,7 +121,8 @@ class Dataset(Dataset):
             text = []
             raw_text = []
             aux_data = []
-            for line in tqdm(f.readlines()):
+            rows = []
+            for row, line in enumerate(tqdm(f.readlines())):
                 line_split = line.strip("\n").split("|")
                 n, s, t, r = line_split[:4]
                 mel_path = os.path.join(
@@ -115,7 +139,8 @@ class Dataset(Dataset):
                 text.append(t)
                 raw_text.append(r)
                 aux_data.append(a)
-            return name, speaker, text, raw_text, aux_data
+                rows.append(row)
+            return name, speaker, text, raw_text, aux_data, rows
 
     def reprocess(self, data, idxs):
         ids = [data[idx]["id"] for idx in idxs]
@@ -130,18 +155,20 @@ class Dataset(Dataset):
         energies = [data[idx]["energy"] for idx in idxs]
         durations = [data[idx]["duration"] for idx in idxs]
 
-        text_lens = np.array([text.shape[0] for text in texts])
-        mel_lens = np.array([mel.shape[0] for mel in mels])
+        text_lens = torch.tensor([text.shape[0] for text in texts])
+        mel_lens = torch.tensor([mel.shape[0] for mel in mels])
 
-        speakers = np.array(speakers)
-        emotions = np.array(emotions)
-        arousals = np.array(arousals)
-        valences = np.array(valences)
-        texts = pad_1D(texts)
-        mels = pad_2D(mels)
-        pitches = pad_1D(pitches)
-        energies = pad_1D(energies)
-        durations = pad_1D(durations)
+        speakers = torch.tensor(speakers)
+        emotions = torch.tensor(emotions)
+        arousals = torch.tensor(arousals)
+        valences = torch.tensor(valences)
+        # One preallocated tensor per field, each item is copied into place once
+        # int16 phoneme IDs are widened to int64 while copied into the batch
+        texts = collate_1D(texts, dtype=np.int64, pin_memory=self.pin_memory)
+        mels = collate_2D(mels, pin_memory=self.pin_memory)
+        pitches = collate_1D(pitches, pin_memory=self.pin_memory)
+        energies = collate_1D(energies, pin_memory=self.pin_memory)
+        durations = collate_1D(durations, pin_memory=self.pin_memory)
 
         return (
             ids,
@@ -152,10 +179,10 @@ class Dataset(Dataset):
             valences,
             texts,
             text_lens,
-            max(text_lens),
+            int(text_lens.max()),
             mels,
             mel_lens,
-            max(mel_lens),
+            int(mel_lens.max()),
             pitches,
             energies,
             durations,
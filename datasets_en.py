@@ -4,15 +4,17 @@ import os
 from tqdm import tqdm
 
 import numpy as np
+import torch
 from torch.utils.data import Dataset
 
 from text import text_to_sequence
-from utils.tools import pad_1D, pad_2D
+from utils.tools import pad_1D, collate_1D, collate_2D
 
 
 class Dataset(Dataset):
     def __init__(
-        self, filename, preprocess_config, model_config, train_config, sort=False, drop_last=False
+        self, filename, preprocess_config, model_config, train_config, sort=False, drop_last=False,
+        pin_memory=False
     ):
         self.dataset_name = preprocess_config["dataset"]
         self.preprocessed_path = preprocess_config["path"]["preprocessed_path"]
@@ -32,6 +34,7 @@ class Dataset(Dataset):
             self.valence_map = json_raw["valence_dict"]
         self.sort = sort
         self.drop_last = drop_last
+        self.pin_memory = pin_memory
 
     def __len__(self):
         return len(self.text)
@@ -128,18 +131,19 @@ class Dataset(Dataset):
         energies = [data[idx]["energy"] for idx in idxs]
         durations = [data[idx]["duration"] for idx in idxs]
 
-        text_lens = np.array([text.shape[0] for text in texts])
-        mel_lens = np.array([mel.shape[0] for mel in mels])
+        text_lens = torch.tensor([text.shape[0] for text in texts])
+        mel_lens = torch.tensor([mel.shape[0] for mel in mels])
 
-        speakers = np.array(speakers)
-        emotions = np.array(emotions)
-        arousals = np.array(arousals)
-        valences = np.array(valences)
-        texts = pad_1D(texts)
-        mels = pad_2D(mels)
-        pitches = pad_1D(pitches)
-        energies = pad_1D(energies)
-        durations = pad_1D(durations)
+        speakers = torch.tensor(speakers)
+        emotions = torch.tensor(emotions)
+        arousals = torch.tensor(arousals)
+        valences = torch.tensor(valences)
+        # One preallocated tensor per field, each item is copied into place once
+        texts = collate_1D(texts, pin_memory=self.pin_memory)
+        mels = collate_2D(mels, pin_memory=self.pin_memory)
+        pitches = collate_1D(pitches, pin_memory=self.pin_memory)
+        energies = collate_1D(energies, pin_memory=self.pin_memory)
+        durations = collate_1D(durations, pin_memory=self.pin_memory)
 
         return (
             ids,
@@ -150,10 +154,10 @@ class Dataset(Dataset):
             valences,
             texts,
             text_lens,
-            max(text_lens),
+            int(text_lens.max()),
             mels,
             mel_lens,
-            max(mel_lens),
+            int(mel_lens.max()),
             pitches,
             energies,
             durations,
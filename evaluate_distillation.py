@@ -0,0 +1,152 @@
+import argparse
+import json
+import time
+
+import torch
+import yaml
+from torch.utils.data import DataLoader
+
+from utils.model import get_model, get_teacher_model, get_param_num
+from utils.tools import to_device
+from dataset_chinese import Dataset
+
+device = torch.device("cpu")
+
+
+def measure(model, inputs):
+    start = time.perf_counter()
+    with torch.no_grad():
+        output = model(*inputs)
+    return output, time.perf_counter() - start
+
+
+def evaluate_distillation(student, teacher, configs, max_utterances=None):
+    preprocess_config, model_config, train_config = configs
+    hop_length = preprocess_config["preprocessing"]["stft"]["hop_length"]
+    sampling_rate = preprocess_config["preprocessing"]["audio"]["sampling_rate"]
+
+    # One utterance per forward, as in online synthesis
+    dataset = Dataset(
+        "val.txt", preprocess_config, model_config, train_config, sort=False, drop_last=False
+    )
+    loader = DataLoader(
+        dataset,
+        batch_size=1,
+        shuffle=False,
+        collate_fn=dataset.collate_fn,
+    )
+
+    times = {"teacher": 0.0, "student": 0.0}
+    audio_seconds = {"teacher": 0.0, "student": 0.0}
+    l1_sum = 0.0
+    n_elements = 0
+    n_utterances = 0
+    for batchs in loader:
+        for batch in batchs:
+            batch = to_device(batch, device)
+
+            # Inference path, the student predicts its own durations
+            for name, model in [("teacher", teacher), ("student", student)]:
+                output, elapsed = measure(model, batch[2:9])
+                times[name] += elapsed
+                audio_seconds[name] += output[9].sum().item() * hop_length / sampling_rate
+
+            # Duration-forced path, so both mels are frame-aligned
+            with torch.no_grad():
+                teacher_output = teacher(*(batch[2:]))
+                student_output = student(*(batch[2:]))
+            mel_masks = ~teacher_output[7]
+            teacher_mel = teacher_output[1].masked_select(mel_masks.unsqueeze(-1))
+            student_mel = student_output[1].masked_select(mel_masks.unsqueeze(-1))
+            l1_sum += torch.abs(student_mel - teacher_mel).sum().item()
+            n_elements += teacher_mel.numel()
+
+            n_utterances += 1
+        if max_utterances is not None and n_utterances >= max_utterances:
+            break
+
+    report = {
+        "n_utterances": n_utterances,
+        "threads": torch.get_num_threads(),
+        "mel_l1_vs_teacher": l1_sum / max(n_elements, 1),
+    }
+    for name, model in [("teacher", teacher), ("student", student)]:
+        report[name] = {
+            "parameters": get_param_num(model),
+            "seconds": times[name],
+            "audio_seconds": audio_seconds[name],
+            "rtf": times[name] / max(audio_seconds[name], 1e-8),
+        }
+    report["speedup"] = report["teacher"]["rtf"] / max(report["student"]["rtf"], 1e-8)
+
+    return report
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--restore_step", type=int, required=True)
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=1,
+        help="number of CPU threads used by torch",
+    )
+    parser.add_argument("--max_utterances", type=int, default=100)
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="path to write the report as JSON",
+    )
+    parser.add_argument(
+        "-p",
+        "--preprocess_config",
+        type=str,
+        required=True,
+        help="path to preprocess.yaml",
+    )
+    parser.add_argument(
+        "-m", "--model_config", type=str, required=True, help="path to the student model.yaml"
+    )
+    parser.add_argument(
+        "-t",
+        "--train_config",
+        type=str,
+        required=True,
+        help="path to the student train.yaml with a distillation section",
+    )
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+
+    # Read Config
+    preprocess_config = yaml.load(
+        open(args.preprocess_config, "r"), Loader=yaml.FullLoader
+    )
+    model_config = yaml.load(open(args.model_config, "r"), Loader=yaml.FullLoader)
+    train_config = yaml.load(open(args.train_config, "r"), Loader=yaml.FullLoader)
+    configs = (preprocess_config, model_config, train_config)
+
+    # Get models
+    student = get_model(args, configs, device, train=False)
+    teacher = get_teacher_model(configs, device)
+
+    report = evaluate_distillation(student, teacher, configs, args.max_utterances)
+    for name in ["teacher", "student"]:
+        print(
+            "{}: {} parameters, RTF {:.4f} ({:.1f}x faster than real time)".format(
+                name.capitalize(),
+                report[name]["parameters"],
+                report[name]["rtf"],
+                1.0 / max(report[name]["rtf"], 1e-8),
+            )
+        )
+    print(
+        "Student speedup: {:.2f}x, Mel L1 vs teacher: {:.4f} (CPU, {} thread(s))".format(
+            report["speedup"], report["mel_l1_vs_teacher"], report["threads"]
+        )
+    )
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import torch
+import yaml
+from torch.utils.data import DataLoader
+
+from utils.model import get_model, get_light_postnet
+from utils.tools import to_device
+from dataset_chinese import Dataset
+
+device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+def timed_forward(model, inputs):
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    with torch.no_grad():
+        output = model(*inputs)
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    return output, time.perf_counter() - start
+
+
+def evaluate_postnet(model, configs, modes, n_repeat=3):
+    preprocess_config, model_config, train_config = configs
+
+    # Get dataset
+    dataset = Dataset(
+        "val.txt", preprocess_config, model_config, train_config, sort=False, drop_last=False
+    )
+    batch_size = train_config["optimizer"]["batch_size"]
+    loader = DataLoader(
+        dataset,
+        batch_size=batch_size,
+        shuffle=False,
+        collate_fn=dataset.collate_fn,
+    )
+
+    latencies = {mode: [] for mode in modes}
+    l1_sums = {mode: 0.0 for mode in modes}
+    n_elements = 0
+    for batchs in loader:
+        for batch in batchs:
+            batch = to_device(batch, device)
+            # Inference path: durations, pitch and energy are predicted
+            inputs = batch[2:9]
+
+            model.set_postnet_mode("full")
+            reference = timed_forward(model, inputs)[0]
+            mel_masks = ~reference[7]
+            reference_mel = reference[1].masked_select(mel_masks.unsqueeze(-1))
+            n_elements += reference_mel.numel()
+
+            for mode in modes:
+                model.set_postnet_mode(mode)
+                for _ in range(n_repeat):
+                    output, elapsed = timed_forward(model, inputs)
+                    latencies[mode].append(elapsed)
+                mel = output[1].masked_select(mel_masks.unsqueeze(-1))
+                l1_sums[mode] += torch.abs(mel - reference_mel).sum().item()
+
+    full_latency = np.mean(latencies["full"])
+    report = {}
+    for mode in modes:
+        latency = np.mean(latencies[mode])
+        report[mode] = {
+            "mel_l1_vs_full": l1_sums[mode] / max(n_elements, 1),
+            "mean_latency_ms": latency * 1000,
+            "latency_saving": 1.0 - latency / full_latency,
+        }
+    model.set_postnet_mode("full")
+
+    return report
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--restore_step", type=int, required=True)
+    parser.add_argument(
+        "--n_repeat",
+        type=int,
+        default=3,
+        help="number of timed forward passes per batch and mode",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="path to write the report as JSON",
+    )
+    parser.add_argument(
+        "-p",
+        "--preprocess_config",
+        type=str,
+        required=True,
+        help="path to preprocess.yaml",
+    )
+    parser.add_argument(
+        "-m", "--model_config", type=str, required=True, help="path to model.yaml"
+    )
+    parser.add_argument(
+        "-t", "--train_config", type=str, required=True, help="path to train.yaml"
+    )
+    args = parser.parse_args()
+
+    # Read Config
+    preprocess_config = yaml.load(
+        open(args.preprocess_config, "r"), Loader=yaml.FullLoader
+    )
+    model_config = yaml.load(open(args.model_config, "r"), Loader=yaml.FullLoader)
+    train_config = yaml.load(open(args.train_config, "r"), Loader=yaml.FullLoader)
+    configs = (preprocess_config, model_config, train_config)
+
+    # Get model
+    args.postnet_mode = "full"
+    model = get_model(args, configs, device, train=False)
+
+    modes = ["full", "none"]
+    light_ckpt_path = os.path.join(
+        train_config["path"]["ckpt_path"], model_config["postnet"]["light"]["ckpt"]
+    )
+    if os.path.isfile(light_ckpt_path):
+        model.set_postnet_mode(
+            "full", get_light_postnet(configs, device, restore=True)
+        )
+        modes.insert(1, "light")
+    else:
+        print("Light PostNet checkpoint not found, skipping 'light' mode")
+
+    report = evaluate_postnet(model, configs, modes, args.n_repeat)
+    for mode in modes:
+        print(
+            "PostNet {}: Mel L1 vs full: {:.4f}, Latency: {:.2f} ms, Saving: {:.1%}".format(
+                mode,
+                report[mode]["mel_l1_vs_full"],
+                report[mode]["mean_latency_ms"],
+                report[mode]["latency_saving"],
+            )
+        )
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
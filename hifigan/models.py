@@ -4,6 +4,8 @@ import torch.nn.functional as F
 from torch.nn import Conv1d, ConvTranspose1d
 from torch.nn.utils import weight_norm, remove_weight_norm
 
+from .pqmf import PQMF
+
 LRELU_SLOPE = 0.1
 
 
@@ -109,6 +111,48 @@ class ResBlock(torch.nn.Module):
             remove_weight_norm(l)
 
 
+class ResBlock2(torch.nn.Module):
+    def __init__(self, h, channels, kernel_size=3, dilation=(1, 3)):
+        super(ResBlock2, self).__init__()
+        self.h = h
+        self.convs = nn.ModuleList(
+            [
+                weight_norm(
+                    Conv1d(
+                        channels,
+                        channels,
+                        kernel_size,
+                        1,
+                        dilation=dilation[0],
+                        padding=get_padding(kernel_size, dilation[0]),
+                    )
+                ),
+                weight_norm(
+                    Conv1d(
+                        channels,
+                        channels,
+                        kernel_size,
+                        1,
+                        dilation=dilation[1],
+                        padding=get_padding(kernel_size, dilation[1]),
+                    )
+                ),
+            ]
+        )
+        self.convs.apply(init_weights)
+
+    def forward(self, x):
+        for c in self.convs:
+            xt = F.leaky_relu(x, LRELU_SLOPE)
+            xt = c(xt)
+            x = xt + x
+        return x
+
+    def remove_weight_norm(self):
+        for l in self.convs:
+            remove_weight_norm(l)
+
+
 class Generator(torch.nn.Module):
     def __init__(self, h):
         super(Generator, self).__init__()
@@ -118,7 +162,7 @@ class Generator(torch.nn.Module):
         self.conv_pre = weight_norm(
             Conv1d(80, h.upsample_initial_channel, 7, 1, padding=3)
         )
-        resblock = ResBlock
+        resblock = ResBlock if h.resblock == "1" else ResBlock2
 
         self.ups = nn.ModuleList()
         for i, (u, k) in enumerate(zip(h.upsample_rates, h.upsample_kernel_sizes)):
@@ -142,7 +186,10 @@ class Generator(torch.nn.Module):
             ):
                 self.resblocks.append(resblock(h, ch, k, d))
 
-        self.conv_post = weight_norm(Conv1d(ch, 1, 7, 1, padding=3))
+        # Multi-band variant: predict sub-bands and merge them with PQMF synthesis
+        self.num_bands = h.get("num_bands", 1)
+        self.conv_post = weight_norm(Conv1d(ch, self.num_bands, 7, 1, padding=3))
+        self.pqmf = PQMF(self.num_bands) if self.num_bands > 1 else None
         self.ups.apply(init_weights)
         self.conv_post.apply(init_weights)
 
@@ -161,6 +208,8 @@ class Generator(torch.nn.Module):
         x = F.leaky_relu(x)
         x = self.conv_post(x)
         x = torch.tanh(x)
+        if self.pqmf is not None:
+            x = self.pqmf.synthesis(x)
 
         return x
 
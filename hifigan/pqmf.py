@@ -0,0 +1,59 @@
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+
+def design_prototype_filter(taps=62, cutoff_ratio=0.142, beta=9.0):
+    """ Kaiser-windowed low-pass prototype filter for PQMF """
+    assert taps % 2 == 0, "The number of taps must be even."
+    assert 0.0 < cutoff_ratio < 1.0, "Cutoff ratio must be > 0.0 and < 1.0."
+
+    omega_c = np.pi * cutoff_ratio
+    n = np.arange(taps + 1) - 0.5 * taps
+    with np.errstate(invalid="ignore"):
+        h_i = np.sin(omega_c * n) / (np.pi * n)
+    h_i[taps // 2] = np.cos(0) * cutoff_ratio
+
+    return h_i * np.kaiser(taps + 1, beta)
+
+
+class PQMF(nn.Module):
+    """ Pseudo-QMF filter bank for multi-band waveform generation """
+
+    def __init__(self, subbands=4, taps=62, cutoff_ratio=0.142, beta=9.0):
+        super(PQMF, self).__init__()
+        h_proto = design_prototype_filter(taps, cutoff_ratio, beta)
+        h_analysis = np.zeros((subbands, len(h_proto)))
+        h_synthesis = np.zeros((subbands, len(h_proto)))
+        n = np.arange(taps + 1) - (taps / 2)
+        for k in range(subbands):
+            phase = (2 * k + 1) * (np.pi / (2 * subbands)) * n
+            h_analysis[k] = 2 * h_proto * np.cos(phase + (-1) ** k * np.pi / 4)
+            h_synthesis[k] = 2 * h_proto * np.cos(phase - (-1) ** k * np.pi / 4)
+
+        self.register_buffer(
+            "analysis_filter", torch.from_numpy(h_analysis).float().unsqueeze(1)
+        )
+        self.register_buffer(
+            "synthesis_filter", torch.from_numpy(h_synthesis).float().unsqueeze(0)
+        )
+
+        updown_filter = torch.zeros((subbands, subbands, subbands)).float()
+        for k in range(subbands):
+            updown_filter[k, k, 0] = 1.0
+        self.register_buffer("updown_filter", updown_filter)
+        self.subbands = subbands
+        self.pad_fn = nn.ConstantPad1d(taps // 2, 0.0)
+
+    def analysis(self, x):
+        """ (B, 1, T) full-band -> (B, subbands, T // subbands) """
+        x = F.conv1d(self.pad_fn(x), self.analysis_filter)
+        return F.conv1d(x, self.updown_filter, stride=self.subbands)
+
+    def synthesis(self, x):
+        """ (B, subbands, T // subbands) -> (B, 1, T) full-band """
+        x = F.conv_transpose1d(
+            x, self.updown_filter * self.subbands, stride=self.subbands
+        )
+        return F.conv1d(self.pad_fn(x), self.synthesis_filter)
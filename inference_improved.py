@@ -115,24 +115,9 @@ def improved_chinese_to_ipa(text):
             phones = char_to_ipa[char]
             ipa_phones.extend(phones)
         elif '\u4e00' <= char <= '\u9fff':  # 中文字符
-            # 未知中文字符，使用统计上最常见的音素模式
-            # 根据中文音韵学，大多数字符是声母+韵母结构
-            import random
-            fallback_options = [
-                ['ʂ', 'ʐ̩˥˩'],   # 类似"是"
-                ['t', 'i˥˩'],    # 类似"的"
-                ['x', 'aw˨˩˦'],  # 类似"好"
-                ['l', 'i˥˩'],    # 类似"李"
-                ['m', 'ej˧˥'],   # 类似"没"
-                ['n', 'i˨˩˦'],   # 类似"你"
-                ['k', 'ə˥˩'],    # 类似"个"
-                ['tɕ', 'i˥˩'],   # 类似"及"
-                ['w', 'o˨˩˦'],   # 类似"我"
-                ['j', 'ow˥˩'],   # 类似"有"
-            ]
-            chosen_phones = random.choice(fallback_options)
-            ipa_phones.extend(chosen_phones)
-            print(f"⚠️  未知字符 '{char}' -> {chosen_phones}")
+            # 未知中文字符没有可靠的IPA读音，按静音处理，保证同一文本的输出确定
+            ipa_phones.append('spn')
+            print(f"⚠️  未知字符 '{char}' -> spn（拼音模型请使用 synthesize_chinese_pinyin.py，多音字由词典消歧）")
         elif char in '，。？！；：、':
             # 标点符号
             ipa_phones.append('spn')
@@ -3,6 +3,9 @@
 import traceback
 import os
 import logging
+import itertools
+from collections import deque
+from multiprocessing import Pool
 from normalizer.car_number import CarNumber
 from normalizer.date import Date
 # from cardinal import cardinal2chntext, cardinal_normalize
@@ -12,12 +15,16 @@ from normalizer.money import Money
 from normalizer.special import Special
 from normalizer.symbol import Symbol
 from normalizer.telephone import TelePhone
-from normalizer.number import Number
+from normalizer.number import Number, get_posseg
+from normalizer.rule_engine import RuleEngine
 
 # 设置logging
 _log = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# normalize_batch 每次交给子进程的句子数
+BATCH_CHUNK_SIZE = 256
+
 class TextNormalizer:
     def __init__(self):
         self.load()
@@ -31,6 +38,9 @@ class TextNormalizer:
         self._special = Special()
         self._symbol = Symbol()
         self._number = Number()
+        self._engine = RuleEngine(self._date, self._money, self._car_number,
+                                  self._measure, self._telephone,
+                                  self._special, self._number, self._symbol)
 
     @staticmethod
     def _preprocess(text):
@@ -45,8 +55,35 @@ class TextNormalizer:
     def infer(self, text):
         return self.normalize(text)
 
+    def normalize_batch(self, texts, workers=1, chunk_size=BATCH_CHUNK_SIZE):
+        """ 按输入顺序逐条产出 normalize 的结果
+
+        texts 可以是任意可迭代对象(例如打开的文件)，按 chunk_size 分块读取，
+        同时在处理中的块不超过 2 * workers 个，大文件也不会整个读入内存。
+        workers > 1 时使用进程池，每个子进程只初始化一次 TextNormalizer, jieba 词典也只加载一次。
+        """
+        if workers <= 1:
+            for text in texts:
+                yield self.normalize(text)
+            return
+        pending = deque()
+        with Pool(workers, initializer=_init_worker) as pool:
+            for chunk in _chunks(texts, chunk_size):
+                pending.append(pool.apply_async(_normalize_chunk, (chunk,)))
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().get()
+            while pending:
+                yield from pending.popleft().get()
+
     def normalize_(self, text):
         text = self._preprocess(text)
+        text = self._engine.normalize(text)
+        text = self._postprocess(text)
+        return text
+
+    def normalize_legacy(self, text):
+        """ 逐个调用各正则化器的原始流水线，用于核对 RuleEngine 的输出 """
+        text = self._preprocess(text)
 
         # 非抢占性正则
         text = self._date.normalize(text)  # 规范化日期
@@ -68,25 +105,37 @@ class TextNormalizer:
     def normalize(self, text):
         try:
             text = self._preprocess(text)
-            # 非抢占性正则
-            text = self._date.normalize(text)  # 规范化日期
-            text = self._money.normalize(text)
-            text = self._car_number.normalize(text)  # 规范车牌
-            text = self._measure.normalize(text)
-            # 抢占性正则
-            text = self._telephone.normalize(text)  # 规范化固话/手机号码
-            # text = self._english.normalize(text)  # 规范英文
-            text = self._special.normalize(text)  # 规范分数以及百分比
-            text = self._number.normalize(text) # 规范化其他可能的数字
-            # 通用正则
-            text = digit_normalize(text)  # 规范化数字编号
-            text = self._symbol.normalize(text)  # 规范化符号
+            # 规则顺序同 normalize_legacy: 日期, 金额, 车牌, 量词, 电话, 分数/百分比, 数字, 符号
+            text = self._engine.normalize(text)
         except Exception:
             _log.warning(traceback.format_exc())
 
         text = self._postprocess(text)
         return text
 
+_worker_normalizer = None
+
+
+def _init_worker():
+    global _worker_normalizer
+    _worker_normalizer = TextNormalizer()
+    # 导入 normalizer.number 不会加载 jieba 词典，在子进程初始化时预热一次，
+    # 避免第一个需要词性的块临时加载词典
+    get_posseg().lcut("hehe")
+
+
+def _normalize_chunk(texts):
+    return [_worker_normalizer.normalize(text) for text in texts]
+
+
+def _chunks(texts, chunk_size):
+    texts = iter(texts)
+    chunk = list(itertools.islice(texts, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(texts, chunk_size))
+
+
 if __name__ == '__main__':
     tn = TextNormalizer()
     print(tn.normalize('固话：059523865596或23880880。'))
@@ -1,3 +1,3 @@
 from .fastspeech2 import FastSpeech2
-from .loss import FastSpeech2Loss
+from .loss import FastSpeech2Loss, FastSpeech2DistillationLoss
 from .optimizer import ScheduledOptim
\ No newline at end of file
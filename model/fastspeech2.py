@@ -25,6 +25,8 @@ class FastSpeech2(nn.Module):
             preprocess_config["preprocessing"]["mel"]["n_mel_channels"],
         )
         self.postnet = PostNet()
+        self.postnet_mode = "full"
+        self.light_postnet = None
 
         self.speaker_emb = None
         if model_config["multi_speaker"]:
@@ -70,6 +72,19 @@ class FastSpeech2(nn.Module):
                 nn.ReLU()
             )
 
+    def set_postnet_mode(self, mode, light_postnet=None):
+        """
+        Select the mel refinement path used after mel_linear:
+        'full' runs the 5-layer PostNet, 'light' runs a distilled smaller PostNet
+        and 'none' skips refinement entirely for the lowest latency.
+        """
+        assert mode in ["full", "light", "none"]
+        if light_postnet is not None:
+            self.light_postnet = light_postnet
+        if mode == "light":
+            assert self.light_postnet is not None, "light PostNet is not loaded"
+        self.postnet_mode = mode
+
     def forward(
         self,
         speakers,
@@ -133,7 +148,12 @@ class FastSpeech2(nn.Module):
         output, mel_masks = self.decoder(output, mel_masks)
         output = self.mel_linear(output)
 
-        postnet_output = self.postnet(output) + output
+        if self.postnet_mode == "full":
+            postnet_output = self.postnet(output) + output
+        elif self.postnet_mode == "light":
+            postnet_output = self.light_postnet(output) + output
+        else:
+            postnet_output = output
 
         return (
             output,
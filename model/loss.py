@@ -90,3 +90,48 @@ class FastSpeech2Loss(nn.Module):
             energy_loss,
             duration_loss,
         )
+
+
+class FastSpeech2DistillationLoss(FastSpeech2Loss):
+    """ FastSpeech2 Loss against both ground truth and a frozen teacher """
+
+    def __init__(self, preprocess_config, model_config, train_config):
+        super(FastSpeech2DistillationLoss, self).__init__(
+            preprocess_config, model_config
+        )
+        self.alpha = train_config["distillation"]["alpha"]
+
+    def forward(self, inputs, predictions, teacher_predictions):
+        (
+            _,
+            teacher_postnet_mel_predictions,
+            teacher_pitch_predictions,
+            teacher_energy_predictions,
+            teacher_log_duration_predictions,
+        ) = teacher_predictions[:5]
+
+        # Replace the ground-truth targets with the teacher outputs
+        teacher_inputs = (
+            inputs[:9]
+            + (teacher_postnet_mel_predictions,)
+            + inputs[10:12]
+            + (
+                teacher_pitch_predictions,
+                teacher_energy_predictions,
+                torch.exp(teacher_log_duration_predictions) - 1,
+            )
+        )
+
+        ground_truth_losses = super(FastSpeech2DistillationLoss, self).forward(
+            inputs, predictions
+        )
+        teacher_losses = super(FastSpeech2DistillationLoss, self).forward(
+            teacher_inputs, predictions
+        )
+
+        return tuple(
+            (1 - self.alpha) * ground_truth_loss + self.alpha * teacher_loss
+            for ground_truth_loss, teacher_loss in zip(
+                ground_truth_losses, teacher_losses
+            )
+        )
@@ -119,7 +119,9 @@ def val_num_to_chn(number_string, system=None):
     return result
 
 
-import re
+_mandarin_digit_table = str.maketrans('0123456789', '零一二三四五六七八九')
+
+
 def num_to_mandarin(num):
     """
     Convert int number to mandarin in simplified Chinese.
@@ -139,17 +141,7 @@ def num_to_mandarin(num):
     Out[4]: '十五'
     """
     def to_mandarin(string):
-        string = re.sub('0', '零', string)
-        string = re.sub('1', '一', string)
-        string = re.sub('2', '二', string)
-        string = re.sub('3', '三', string)
-        string = re.sub('4', '四', string)
-        string = re.sub('5', '五', string)
-        string = re.sub('6', '六', string)
-        string = re.sub('7', '七', string)
-        string = re.sub('8', '八', string)
-        string = re.sub('9', '九', string)
-        return string
+        return string.translate(_mandarin_digit_table)
 
     def integrity(num):
         k_unit = ['千', '百', '十', '']
@@ -24,14 +24,16 @@ class CarNumber(Normalizer):
         matchers = self.car_number_re.findall(text)
         if matchers:
             for matcher in matchers:
-                target = matcher[0]
-                target = target.replace(" ", "")  # 移除"粤A D74821"中的空格
-                prefix = target[:2]
-                remain = digit_normalize(target[2:])
-                target = prefix + SHORT_PAUSE_SYMBOL + remain
+                target = self._car_number_normalize(matcher[0])
                 text = text.replace(matcher[0], target)
         return text
 
+    def _car_number_normalize(self, text):
+        text = text.replace(" ", "")  # 移除"粤A D74821"中的空格
+        prefix = text[:2]
+        remain = digit_normalize(text[2:])
+        return prefix + SHORT_PAUSE_SYMBOL + remain
+
 
 if __name__ == '__main__':
     # 测试
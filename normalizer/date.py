@@ -44,11 +44,7 @@ class Date(Normalizer):
             for matcher in matchers:
                 target = matcher[0]
                 # print(target)
-                target, flag = self._date_num_normalize(target)
-                if flag:
-                    target = digit_normalize(target)
-                else:
-                    target = numeric_normalize(target)
+                target = self._date_normalize(target)
                 text = text.replace(matcher[0], target)
         matchers = self.time_re.findall(text)
         if matchers:
@@ -58,6 +54,13 @@ class Date(Normalizer):
                 text = text.replace(matcher[0], target)
         return text
 
+    def _date_normalize(self, text):
+        # 年份按数字序列读，月日按数值读
+        text, flag = self._date_num_normalize(text)
+        if flag:
+            return digit_normalize(text)
+        return numeric_normalize(text)
+
     def _time_num_normalize(self, text):
         nums = text.split(':')
         text = ""
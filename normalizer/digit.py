@@ -6,7 +6,8 @@
 import re
 from normalizer.basic_util import (
     seq_num_to_chn,
-    NumberSystem
+    NumberSystem,
+    default_sys
 )
 
 from normalizer.normalizer import Normalizer
@@ -49,8 +50,7 @@ def long_to_short(text, split=" "):
 
 
 def digit2chntext(text, alt_one=False, split_long=True):
-    num_sys = NumberSystem()
-    text = seq_num_to_chn(text, num_sys)
+    text = seq_num_to_chn(text, default_sys)
     if split_long:
         text = long_to_short(text)
     if alt_one == True:
@@ -40,6 +40,9 @@ measure_suffix_pattern = r"({0}|{1}|{2})".format(
 
 MEASURE_PATTERN = r"({0}{1})".format(MEASURE_NUMBER_PATTERN,
                                      measure_suffix_pattern)
+# 量词里出现的所有汉字，不含其中任何一个字的文本无需匹配 MEASURE_PATTERN
+MEASURE_TRIGGER_PATTERN = "[{}]".format("".join(
+    sorted(set(re.findall(r"[\u4e00-\u9fa5]", measure_suffix_pattern)))))
 
 
 class Measure(Normalizer):
@@ -18,6 +18,8 @@ currency_pattern = r"({0}|{0}?({1}|{2}))".format(jinzhi_pattern,
                                                  money_currecy_pattern)
 money_pattern = r"(({0}[多余几]|{0}[多余几]?{1})+)".format(num_pattern,
                                                      currency_pattern)
+# 金额必然包含的字: 多余几, 进制, 单位或币种名的首字; 不含这些字的文本无需匹配 money_pattern
+money_trigger_pattern = r"[多余几亿千万百元块角毛分人美日英欧马法加澳港先芬爱里荷埃比印林新卢韩泰]"
 
 
 class Money(Normalizer):
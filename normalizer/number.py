@@ -9,13 +9,13 @@ LastEditTime: 2021-08-05 22:28:26
 """
 
 import re
+from functools import lru_cache
 
 from normalizer.basic_util import (
     val_num_to_chn,
     NumberSystem
 )
 
-from jieba import posseg as psg
 from normalizer.normalizer import Normalizer
 
 float_number_pattern = r"\d+\.\d+"
@@ -26,6 +26,26 @@ key_word_set = {
     '量'
 }
 
+# 缓存的上文窗口数，每个窗口最多5个字符
+POS_CACHE_SIZE = 8192
+
+_psg = None
+
+
+def get_posseg():
+    """ jieba.posseg，第一次用到时才导入，词典在第一次 lcut 时加载 """
+    global _psg
+    if _psg is None:
+        from jieba import posseg
+        _psg = posseg
+    return _psg
+
+
+@lru_cache(maxsize=POS_CACHE_SIZE)
+def pos_flags(context):
+    """ context 的 jieba 词性序列，按上文窗口缓存 """
+    return tuple(item.flag for item in get_posseg().lcut(context))
+
 class Cardinal(Normalizer):
     def __init__(self) -> None:
         self.system = NumberSystem()
@@ -40,10 +60,12 @@ class Number(Normalizer):
         self.system = NumberSystem()
         self.float_number_re = re.compile(float_number_pattern)
         self.decimal_re = re.compile(decimal_pattern)
-        self.psg = psg
-        self.psg.lcut("hehe")
         self.direct = direct
 
+    @property
+    def psg(self):
+        return get_posseg()
+
     def normalize(self, text):
         if self.direct:
             return val_num_to_chn(text, self.system)
@@ -59,49 +81,48 @@ class Number(Normalizer):
         matcher = self.decimal_re.search(text)
         while matcher:
             index = matcher.span()
-            target = matcher.group()
             start, end = index
-            if len(target) == 2:
-                # 两位孤立数字(长度等于2且相邻字符非英文) 默认用数值读法
-                start = start - 1
-                flag = True
-                if start >= 0 and text[start].encode('utf-8').isalpha():
-                    flag = False
-                if end < len(text) and text[end].encode('utf-8').isalpha():
-                    flag = False
-                if flag:
-                    target = val_num_to_chn(target, self.system)
-                    text = text[:index[0]] + target + text[index[1]:]
-                    # text = text.replace(matcher[0], target)
-            elif len(target) == 1 or len(target) >= 5:
-                pass
-            else:
-                # 上文推断
-                begin = max(start - 5, 0)
-                context = text[begin:start]
-                flag = False
-                for word in key_word_set:
-                    if word in context:
-                        flag = True
-                        break
-                if not flag:
-                    result = self.psg.lcut(context)
-                    # print(result)
-                    for item in result[:-1]:
-                        if item.flag == 'v':
-                            flag = True
-                            break
-                    if result[-1].flag == 'r':
-                        flag = True
-                if flag:
-                    target = val_num_to_chn(target, self.system)
-                    if len(target) == 2 and target[0] == '二' and target[1] != '十':
-                        target = '两' + target[1:]
-                    # text = text.replace(matcher[0], target)
-                    text = text[:index[0]] + target + text[index[1]:]
+            target = self._integer_normalize(matcher.group(),
+                                             text[max(start - 5, 0):start],
+                                             text[end:end + 1])
+            if target is not None:
+                text = text[:index[0]] + target + text[index[1]:]
+                # text = text.replace(matcher[0], target)
             matcher = self.decimal_re.search(text, pos=index[1])
         return text
 
+    def _integer_normalize(self, target, context, next_char):
+        """ 整数读法, context 为数字前的(最多)5个字符, 按数字序列读时返回 None """
+        if len(target) == 2:
+            # 两位孤立数字(长度等于2且相邻字符非英文) 默认用数值读法
+            if context[-1:].encode('utf-8').isalpha():
+                return None
+            if next_char.encode('utf-8').isalpha():
+                return None
+            return val_num_to_chn(target, self.system)
+        elif len(target) == 1 or len(target) >= 5:
+            return None
+        # 上文推断
+        flag = False
+        for word in key_word_set:
+            if word in context:
+                flag = True
+                break
+        if not flag:
+            flags = pos_flags(context)
+            for item in flags[:-1]:
+                if item == 'v':
+                    flag = True
+                    break
+            if flags[-1] == 'r':
+                flag = True
+        if not flag:
+            return None
+        target = val_num_to_chn(target, self.system)
+        if len(target) == 2 and target[0] == '二' and target[1] != '十':
+            target = '两' + target[1:]
+        return target
+
 
 def numeric_normalize(text):
     pattern = re.compile(r"((\d+))")
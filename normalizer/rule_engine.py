@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""规则引擎
+把 TextNormalizer 各个正则化器的规则预先编译成一张按优先级排列的规则表，
+每条规则对文本做一次 re.sub，输出用 list/join 拼接，不再对每个匹配做 str.replace。
+"""
+
+import re
+from collections import namedtuple
+
+from normalizer.basic_util import val_num_to_chn
+from normalizer.digit import digit2chntext
+from normalizer.measure import MEASURE_TRIGGER_PATTERN
+from normalizer.money import money_trigger_pattern
+from normalizer.telephone import (
+    telephone_landline_number_pattern,
+    telephone_mobile_number_pattern
+)
+
+# handler 接收匹配到的字符串，返回替换后的文本;
+# 规则的每个匹配都必然包含每个 trigger 的一个匹配，当前文本里有 trigger 搜不到时跳过该规则
+Rule = namedtuple("Rule", ["name", "regex", "handler", "triggers"])
+
+
+class RuleEngine:
+    """
+    规则按原流水线的顺序排列(日期, 时间, 金额, 车牌, 量词, 手机, 固话, 分数, 百分数, 比例)，
+    后面的规则只会看到前面规则处理过的文本，因此与逐个调用 normalize 的结果一致。
+    不合并成一个大的正则: re 在每个位置依次尝试每个分支，合并后的扫描反而慢得多;
+    而是先用很便宜的 trigger (数字, 单位字, 冒号等) 判断规则有没有可能匹配，
+    大部分规则因此不必扫描。
+    """
+
+    def __init__(self, date, money, car_number, measure, telephone, special,
+                 number, symbol):
+        self._number = number
+        self._symbol = symbol
+        self._digit_re = re.compile(r"\d+")
+        digit = self._digit_re
+        self.rules = [
+            Rule("date", date.date_re, date._date_normalize,
+                 (digit, re.compile(r"[年月日号]"))),
+            Rule("time", date.time_re, date._time_num_normalize,
+                 (digit, re.compile(":"))),
+            Rule("money", money.money_pattern, money._money_num_normalize,
+                 (digit, re.compile(money_trigger_pattern))),
+            Rule("car_number", car_number.car_number_re,
+                 car_number._car_number_normalize, ()),
+            Rule("measure", measure._measure_re,
+                 measure._measure_number_normalize,
+                 (digit, re.compile(MEASURE_TRIGGER_PATTERN))),
+            Rule("mobile", re.compile(telephone_mobile_number_pattern),
+                 lambda text: telephone._telephone_number_normalize(
+                     text, is_mobile=True), (digit, )),
+            Rule("landline", re.compile(telephone_landline_number_pattern),
+                 lambda text: telephone._telephone_number_normalize(
+                     text, is_mobile=False), (digit, )),
+            Rule("fraction", special._fraction_re,
+                 special._fraction_num_normalize, (digit, re.compile("/"))),
+            Rule("percentage", special._percentage_re,
+                 special._percentage_num_normalize,
+                 (digit, re.compile("%"))),
+            Rule("ratio", special._ratio_re, special._ratio_num_normalize,
+                 (digit, re.compile(":"))),
+        ]
+        self._symbol_steps = self._compile_symbol(symbol)
+
+    @staticmethod
+    def _compile_symbol(symbol):
+        """ 单字符替换合并成 str.translate 的表，多字符替换保持原来的先后顺序 """
+        steps = []
+        table = {}
+        for key, value in symbol._symbol_to_symbol_dict.items():
+            if len(key) == 1:
+                table[ord(key)] = value
+                continue
+            if table:
+                steps.append(table)
+                table = {}
+            steps.append((key, value))
+        if table:
+            steps.append(table)
+        steps.append({
+            ord(key): value
+            for key, value in symbol._symbol_to_pronunciation_dict.items()
+        })
+        return steps
+
+    def normalize(self, text):
+        """ text 需已经过 TextNormalizer._preprocess """
+        text = text.replace('：', ':')
+        for rule in self.rules:
+            if not all(trigger.search(text) for trigger in rule.triggers):
+                continue
+            text = rule.regex.sub(
+                lambda matcher, rule=rule: rule.handler(matcher.group(0)),
+                text)
+        if self._digit_re.search(text):
+            text = self._number_normalize(text)
+            text = self._digit_re.sub(
+                lambda matcher: digit2chntext(matcher.group(0),
+                                              alt_one=False,
+                                              split_long=True), text)
+        return self._symbol_normalize(text)
+
+    def _number_normalize(self, text):
+        """ 与 Number.normalize 相同，整数部分一次遍历，用 list/join 拼接 """
+        number = self._number
+        text = number.float_number_re.sub(
+            lambda matcher: val_num_to_chn(matcher.group(0), number.system),
+            text)
+
+        pieces = []
+        recent = ""  # 已输出文本的最后5个字符，即 Number 判断读法用的上文
+        pos = 0
+        matcher = number.decimal_re.search(text)
+        while matcher:
+            start, end = matcher.span()
+            target = matcher.group(0)
+            context = (recent + text[pos:start])[-5:]
+            reading = number._integer_normalize(target, context,
+                                                text[end:end + 1])
+            resume = end
+            if reading is not None:
+                # Number.normalize 替换后仍从原来的结束位置继续搜索，
+                # 读法比数字短时会跳过其后的几个字符
+                resume += max(len(target) - len(reading), 0)
+                target = reading
+            pieces.append(text[pos:start])
+            pieces.append(target)
+            recent = (context + target)[-5:]
+            pos = end
+            matcher = number.decimal_re.search(text, resume)
+        pieces.append(text[pos:])
+        return "".join(pieces)
+
+    def _symbol_normalize(self, text):
+        for step in self._symbol_steps:
+            if isinstance(step, dict):
+                text = text.translate(step)
+            else:
+                key, value = step
+                while key in text:
+                    text = text.replace(key, value)
+        return self._symbol._symbol_post_normalize(text)
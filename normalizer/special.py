@@ -32,34 +32,39 @@ class Special(Normalizer):
         matchers = self._fraction_re.findall(text)
         if matchers:
             for matcher in matchers:
-                target = matcher[0]
-                numerator, denominator = target.split('/')
-                target = val_num_to_chn(denominator, self.system) + '分之' + \
-                         val_num_to_chn(numerator, self.system)
+                target = self._fraction_num_normalize(matcher[0])
                 text = text.replace(matcher[0], target)
         return text
 
+    def _fraction_num_normalize(self, text):
+        numerator, denominator = text.split('/')
+        return val_num_to_chn(denominator, self.system) + '分之' + \
+               val_num_to_chn(numerator, self.system)
+
     def _ratio_normalize(self, text):
         matchers = self._ratio_re.findall(text)
         if matchers:
             for matcher in matchers:
-                target = matcher[0]
-                numerator, denomiator = target.split(':')
-                target = val_num_to_chn(numerator, self.system) + '比' + \
-                         val_num_to_chn(denomiator, self.system)
+                target = self._ratio_num_normalize(matcher[0])
                 text = text.replace(matcher[0], target)
         return text
 
+    def _ratio_num_normalize(self, text):
+        numerator, denomiator = text.split(':')
+        return val_num_to_chn(numerator, self.system) + '比' + \
+               val_num_to_chn(denomiator, self.system)
+
     def _percentage_normalize(self, text):
         matchers = self._percentage_re.findall(text)
         if matchers:
             for matcher in matchers:
-                target = matcher[0]
-                target = '百分之' + val_num_to_chn(target.strip().strip('%'),
-                                                self.system)
+                target = self._percentage_num_normalize(matcher[0])
                 text = text.replace(matcher[0], target)
         return text
 
+    def _percentage_num_normalize(self, text):
+        return '百分之' + val_num_to_chn(text.strip().strip('%'), self.system)
+
 
 if __name__ == '__main__':
     print(Special().normalize('65.3%'))
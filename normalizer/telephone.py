@@ -19,11 +19,16 @@ telephone_landline_branch_pattern = r"(\d{7,8})"  #7或8位座机号
 telephone_landline_pattern = r"({0}{1}?{2}{3})".format(
     begin_pattern, telephone_area_num_pattern,
     telephone_landline_branch_pattern, end_pattern)  # 区号+座机号
+# 只匹配号码本身，前后不是数字即可，不吞掉上下文
+telephone_landline_number_pattern = r"(?<!\d)({0}?{1})(?!\d)".format(
+    telephone_area_num_pattern, telephone_landline_branch_pattern)
 telephone_area_num_pattern = r"(139|138|137|136|135|134|159|158|157|150|151|"\
     "152|188|187|182|183|184|178|198|130|131|132|156|155|186|185|176|"\
     "133|153|189|180|181|177)"
 telephone_mobile_pattern = r"({0}{1}\d{{8}}{2})".format(
     begin_pattern, telephone_area_num_pattern, end_pattern)
+telephone_mobile_number_pattern = r"(?<!\d)({0}\d{{8}})(?!\d)".format(
+    telephone_area_num_pattern)
 
 
 class TelePhone(Normalizer):
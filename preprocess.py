@@ -8,8 +8,22 @@ from preprocessor.preprocessor import Preprocessor
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("config", type=str, help="path to preprocess.yaml")
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=None,
+        help="number of worker processes, defaults to preprocessing.num_workers or 1",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="ignore the manifest of a previous run and process every utterance",
+    )
     args = parser.parse_args()
 
     config = yaml.load(open(args.config, "r"), Loader=yaml.FullLoader)
+    num_workers = args.num_workers
+    if num_workers is None:
+        num_workers = config["preprocessing"].get("num_workers", 1)
     preprocessor = Preprocessor(config)
-    preprocessor.build_from_path()
+    preprocessor.build_from_path(num_workers, rebuild=args.rebuild)
@@ -28,7 +28,7 @@ def preprocess(text, g2p):
                     pinyin += py + ' '
     return pinyin
 
-def process_data():
+def process_data(num_workers=4):
     # 初始化G2P转换器
     g2p = G2pC()
     normalizer = TextNormalizer()
@@ -43,7 +43,8 @@ def process_data():
     with open(os.path.join(input_dir, "filelist.txt"), "r", encoding="utf-8") as f:
         lines = f.readlines()
 
-    # 处理每一行
+    # 处理每一行: 先复制音频，文本之后统一批量正则化
+    entries = []
     for line in tqdm(lines):
         parts = line.strip().split("|")
         if len(parts) < 2:  # 至少需要wav路径和文本
@@ -69,9 +70,13 @@ def process_data():
         else:
             print(f"警告: 找不到音频文件 {src_wav}")
             continue
+        entries.append((text, lab_file))
 
-        # 文本预处理
-        normalized_text = normalizer.normalize(text)
+    # 文本预处理，多进程正则化，结果与输入顺序一致
+    normalized_texts = normalizer.normalize_batch(
+        (text for text, _ in entries), workers=num_workers)
+    for (_, lab_file), normalized_text in tqdm(
+            zip(entries, normalized_texts), total=len(entries)):
         pinyin = preprocess(normalized_text, g2p)
 
         # 保存拼音文本
@@ -1,5 +1,4 @@
 import os
-import librosa
 import numpy as np
 from scipy.io import wavfile
 from tqdm import tqdm
@@ -8,6 +7,7 @@ import json
 import random
 from pypinyin import lazy_pinyin, Style
 
+from audio.cache import get_audio_cache, load_wav
 from text import _clean_text
 
 
@@ -50,6 +50,7 @@ def prepare_align(config):
     cleaners = config["preprocessing"]["text"]["text_cleaners"]
     val_ratio = config["preprocessing"].get("val_ratio", 0.15)
     test_ratio = config["preprocessing"].get("test_ratio", 0.05)
+    audio_cache = get_audio_cache(config)
     
     print("🎯 开始准备ESD中文数据集（拼音格式，匹配preprocessor_en.py格式）...")
     
@@ -142,7 +143,7 @@ def prepare_align(config):
                     target_wav = os.path.join(speaker_out_dir, f"{file_id}.wav")
                     
                     # 重采样音频
-                    wav, _ = librosa.load(source_wav, sr=sampling_rate)
+                    wav = load_wav(source_wav, sampling_rate, audio_cache)
                     wav = wav / max(abs(wav)) * max_wav_value
                     wavfile.write(target_wav, sampling_rate, wav.astype(np.int16))
                     
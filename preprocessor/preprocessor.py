@@ -1,19 +1,65 @@
 import os
 import random
 import json
+import hashlib
+from multiprocessing import Pool
 
 import tgt
-import librosa
 import numpy as np
-import pyworld as pw
 from scipy.interpolate import interp1d
-from sklearn.preprocessing import StandardScaler
 from tqdm import tqdm
 
 import audio as Audio
 
 random.seed(1234)
 
+# Utterances per work unit, fixed so the merged statistics do not depend on the worker count
+SHARD_SIZE = 32
+
+# Per-utterance fingerprints and summaries, appended after every shard so that an
+# interrupted run resumes where it stopped
+MANIFEST_NAME = "manifest.jsonl"
+
+FEATURES = ["mel", "pitch", "energy", "duration"]
+
+
+def compute_moments(values):
+    """ (count, mean, sum of squared deviations) of a 1-D array """
+    if len(values) == 0:
+        return (0, 0.0, 0.0)
+    values = np.asarray(values, dtype=np.float64)
+    mean = values.mean()
+    return (len(values), mean, np.sum((values - mean) ** 2))
+
+
+def merge_moments(a, b):
+    """ Combine two (count, mean, M2) triples (Chan et al. parallel variance) """
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    n = n_a + n_b
+    if n == 0:
+        return (0, 0.0, 0.0)
+    delta = mean_b - mean_a
+    mean = mean_a + delta * n_b / n
+    m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / n
+    return (n, mean, m2)
+
+
+def merge_range(a, b):
+    return (min(a[0], b[0]), max(a[1], b[1]))
+
+
+_worker_preprocessor = None
+
+
+def _init_worker(config):
+    global _worker_preprocessor
+    _worker_preprocessor = Preprocessor(config)
+
+
+def _process_shard(shard):
+    return _worker_preprocessor.process_shard(shard)
+
 class Preprocessor:
     def __init__(self, config):
         self.config = config
@@ -56,7 +102,15 @@ class Preprocessor:
             config["preprocessing"]["audio"]["sampling_rate"],
             config["preprocessing"]["mel"]["mel_fmin"],
             config["preprocessing"]["mel"]["mel_fmax"],
+            backend=config["preprocessing"]["stft"].get("backend", "conv"),
         )
+        self.mel_batch_size = config["preprocessing"].get("mel_batch_size", 16)
+        self.device = config["preprocessing"].get("device", "cpu")
+        self.storage_dtype = config["preprocessing"].get("storage_dtype", "float32")
+        assert self.storage_dtype in ["float32", "float16"]
+        self.STFT.to(self.device)
+        self.pitch_extractor = Audio.pitch.PitchExtractor(config)
+        self.audio_cache = Audio.cache.get_audio_cache(config)
 
     def load_speaker_dict(self):
         spk_dir = os.path.join(self.config["path"]["raw_path"], 'speaker_info.txt')
@@ -113,27 +167,17 @@ class Preprocessor:
         }
         return filelist_dict, emotion_dict
 
-    def build_from_path(self):
-        os.makedirs((os.path.join(self.out_dir, "mel")), exist_ok=True)
-        os.makedirs((os.path.join(self.out_dir, "pitch")), exist_ok=True)
-        os.makedirs((os.path.join(self.out_dir, "energy")), exist_ok=True)
-        os.makedirs((os.path.join(self.out_dir, "duration")), exist_ok=True)
-
-        print("Processing Data ...")
-        out = list()
-        n_frames = 0
-        pitch_scaler = StandardScaler()
-        energy_scaler = StandardScaler()
-
-        # Compute pitch, energy, duration, and mel-spectrogram
+    def collect_utterances(self):
+        # Sorted so that ordering and speaker ids do not depend on the file system
         speakers = self.speakers.copy()
-        for i, speaker in enumerate(tqdm(os.listdir(self.in_dir))):
+        utterances = list()
+        for i, speaker in enumerate(sorted(os.listdir(self.in_dir))):
             # 跳过非目录文件
             if not os.path.isdir(os.path.join(self.in_dir, speaker)):
                 continue
             if len(self.speakers) == 0:
                 speakers[speaker] = i
-            for wav_name in os.listdir(os.path.join(self.in_dir, speaker)):
+            for wav_name in sorted(os.listdir(os.path.join(self.in_dir, speaker))):
                 if ".wav" not in wav_name:
                     continue
 
@@ -142,42 +186,225 @@ class Preprocessor:
                     self.out_dir, "TextGrid", speaker, "{}.TextGrid".format(basename)
                 )
                 if os.path.exists(tg_path):
-                    ret = self.process_utterance(speaker, basename)
-                    if ret is None:
-                        continue
-                    else:
-                        info, pitch, energy, n = ret
-                        out.append(info)
+                    utterances.append((speaker, basename))
+
+        return utterances, speakers
+
+    def config_fingerprint(self):
+        # Only the settings that change the extracted features, normalization
+        # is applied from stats.json and does not invalidate the cache
+        preprocessing = self.config["preprocessing"]
+        subset = {
+            "audio": preprocessing["audio"],
+            "stft": preprocessing["stft"],
+            "mel": preprocessing["mel"],
+            "pitch": preprocessing["pitch"]["feature"],
+            "pitch_extractor": {
+                k: v
+                for k, v in preprocessing["pitch"].items()
+                if k in ["extractor", "f0_min", "f0_max", "yin_threshold"]
+            },
+            "energy": preprocessing["energy"]["feature"],
+            "storage_dtype": preprocessing.get("storage_dtype", "float32"),
+        }
+        return hashlib.sha1(json.dumps(subset, sort_keys=True).encode()).hexdigest()
+
+    def utterance_fingerprint(self, speaker, basename, config_fingerprint):
+        wav_path = os.path.join(self.in_dir, speaker, "{}.wav".format(basename))
+        text_path = os.path.join(self.in_dir, speaker, "{}.lab".format(basename))
+        tg_path = os.path.join(
+            self.out_dir, "TextGrid", speaker, "{}.TextGrid".format(basename)
+        )
+        # Wavs are identified by size and mtime to avoid reading them, TextGrids are small enough to hash
+        wav_stat = os.stat(wav_path)
+        with open(tg_path, "rb") as f:
+            tg_hash = hashlib.sha1(f.read()).hexdigest()
+        text_mtime = os.stat(text_path).st_mtime_ns if os.path.exists(text_path) else 0
+        key = "|".join(
+            [
+                str(wav_stat.st_size),
+                str(wav_stat.st_mtime_ns),
+                tg_hash,
+                str(text_mtime),
+                self.filelist.get(basename, ""),
+                config_fingerprint,
+            ]
+        )
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def load_manifest(self):
+        manifest = dict()
+        manifest_path = os.path.join(self.out_dir, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            return manifest
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Partially written line of an interrupted run
+                    continue
+                manifest[entry["key"]] = entry
+        return manifest
+
+    def write_manifest(self, entries):
+        # Compact the append log to the current utterances, replaced atomically
+        manifest_path = os.path.join(self.out_dir, MANIFEST_NAME)
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def is_cached(self, entry, fingerprint):
+        if entry is None or entry["fingerprint"] != fingerprint:
+            return False
+        summary = entry["summary"]
+        if summary is None:
+            return True
+        basename, speaker = summary["info"].split("|")[:2]
+        return all(
+            os.path.exists(
+                os.path.join(
+                    self.out_dir, feature, "{}-{}-{}.npy".format(speaker, feature, basename)
+                )
+            )
+            for feature in FEATURES
+        )
+
+    def process_shard(self, shard):
+        # Load every utterance first so that the pitch and mel-spectrograms of the
+        # shard are computed in batches instead of one call each
+        utterances = [self.load_utterance(speaker, basename) for speaker, basename in shard]
+        loaded = [utterance for utterance in utterances if utterance is not None]
+        pitches = iter(self.pitch_extractor.batch([utterance["wav"] for utterance in loaded]))
+        features = list()
+        for i in range(0, len(loaded), self.mel_batch_size):
+            features += Audio.tools.get_mel_from_wavs(
+                [utterance["wav"] for utterance in loaded[i : i + self.mel_batch_size]],
+                self.STFT,
+                self.device,
+            )
+        features = iter(features)
+
+        summaries = list()
+        for utterance in utterances:
+            if utterance is None:
+                summaries.append(None)
+                continue
+            ret = self.finish_utterance(utterance, next(pitches), *next(features))
+            if ret is None:
+                summaries.append(None)
+                continue
+            info, pitch, energy, n, pitch_range, energy_range = ret
+            # Plain floats so that cached summaries round-trip through JSON exactly
+            pitch_moments = compute_moments(pitch)
+            energy_moments = compute_moments(energy)
+            summaries.append(
+                {
+                    "info": info,
+                    "pitch": [int(pitch_moments[0])] + [float(v) for v in pitch_moments[1:]],
+                    "energy": [int(energy_moments[0])]
+                    + [float(v) for v in energy_moments[1:]],
+                    "pitch_range": [float(v) for v in pitch_range],
+                    "energy_range": [float(v) for v in energy_range],
+                    "n_frames": int(n),
+                }
+            )
+
+        return summaries
+
+    def build_from_path(self, num_workers=1, rebuild=False):
+        os.makedirs((os.path.join(self.out_dir, "mel")), exist_ok=True)
+        os.makedirs((os.path.join(self.out_dir, "pitch")), exist_ok=True)
+        os.makedirs((os.path.join(self.out_dir, "energy")), exist_ok=True)
+        os.makedirs((os.path.join(self.out_dir, "duration")), exist_ok=True)
+
+        print("Processing Data ...")
+        utterances, speakers = self.collect_utterances()
+
+        # Only new or changed utterances are processed again
+        manifest = dict() if rebuild else self.load_manifest()
+        config_fingerprint = self.config_fingerprint()
+        entries = dict()
+        pending = list()
+        for speaker, basename in utterances:
+            key = "{}/{}".format(speaker, basename)
+            fingerprint = self.utterance_fingerprint(speaker, basename, config_fingerprint)
+            if self.is_cached(manifest.get(key), fingerprint):
+                entries[key] = manifest[key]
+            else:
+                entries[key] = {"key": key, "fingerprint": fingerprint, "summary": None}
+                pending.append((speaker, basename))
+        print(
+            "{} utterances cached, {} to process".format(
+                len(utterances) - len(pending), len(pending)
+            )
+        )
+        shards = [
+            pending[i : i + SHARD_SIZE] for i in range(0, len(pending), SHARD_SIZE)
+        ]
 
-                        if len(pitch) > 0:
-                            pitch_scaler.partial_fit(pitch.reshape((-1, 1)))
-                        if len(energy) > 0:
-                            energy_scaler.partial_fit(energy.reshape((-1, 1)))
+        # Compute pitch, energy, duration, and mel-spectrogram
+        pool = None
+        if num_workers > 1 and len(shards) > 1:
+            pool = Pool(num_workers, initializer=_init_worker, initargs=(self.config,))
+            shard_results = pool.imap(_process_shard, shards)
+        else:
+            shard_results = map(self.process_shard, shards)
+        manifest_path = os.path.join(self.out_dir, MANIFEST_NAME)
+        with open(manifest_path, "w" if rebuild else "a", encoding="utf-8") as f:
+            for shard, summaries in zip(shards, tqdm(shard_results, total=len(shards))):
+                for (speaker, basename), summary in zip(shard, summaries):
+                    entry = entries["{}/{}".format(speaker, basename)]
+                    entry["summary"] = summary
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+        if pool is not None:
+            pool.close()
+            pool.join()
+        self.write_manifest(
+            [entries["{}/{}".format(speaker, basename)] for speaker, basename in utterances]
+        )
 
-                        n_frames += n
+        # Statistics are merged from the per-utterance summaries in utterance
+        # order, so they do not depend on what was cached
+        out = list()
+        n_frames = 0
+        pitch_moments = (0, 0.0, 0.0)
+        energy_moments = (0, 0.0, 0.0)
+        pitch_range = (np.inf, -np.inf)
+        energy_range = (np.inf, -np.inf)
+        for speaker, basename in utterances:
+            summary = entries["{}/{}".format(speaker, basename)]["summary"]
+            if summary is None:
+                continue
+            out.append(summary["info"])
+            pitch_moments = merge_moments(pitch_moments, summary["pitch"])
+            energy_moments = merge_moments(energy_moments, summary["energy"])
+            pitch_range = merge_range(pitch_range, summary["pitch_range"])
+            energy_range = merge_range(energy_range, summary["energy_range"])
+            n_frames += summary["n_frames"]
 
         print("Computing statistic quantities ...")
         # Perform normalization if necessary
         if self.pitch_normalization:
-            pitch_mean = pitch_scaler.mean_[0]
-            pitch_std = pitch_scaler.scale_[0]
+            pitch_mean = pitch_moments[1]
+            pitch_std = np.sqrt(pitch_moments[2] / pitch_moments[0])
         else:
             # A numerical trick to avoid normalization...
             pitch_mean = 0
             pitch_std = 1
         if self.energy_normalization:
-            energy_mean = energy_scaler.mean_[0]
-            energy_std = energy_scaler.scale_[0]
+            energy_mean = energy_moments[1]
+            energy_std = np.sqrt(energy_moments[2] / energy_moments[0])
         else:
             energy_mean = 0
             energy_std = 1
 
-        pitch_min, pitch_max = self.normalize(
-            os.path.join(self.out_dir, "pitch"), pitch_mean, pitch_std
-        )
-        energy_min, energy_max = self.normalize(
-            os.path.join(self.out_dir, "energy"), energy_mean, energy_std
-        )
+        # Features are stored raw and normalized on load, the normalized range
+        # follows from the raw range tracked during extraction
+        pitch_min, pitch_max = [(v - pitch_mean) / pitch_std for v in pitch_range]
+        energy_min, energy_max = [(v - energy_mean) / energy_std for v in energy_range]
 
         # Save files
         with open(os.path.join(self.out_dir, "speakers.json"), "w") as f:
@@ -201,6 +428,8 @@ class Preprocessor:
                     float(energy_mean),
                     float(energy_std),
                 ],
+                "normalize_on_load": True,
+                "storage_dtype": self.storage_dtype,
             }
             f.write(json.dumps(stats))
 
@@ -224,6 +453,15 @@ class Preprocessor:
         return out
 
     def process_utterance(self, speaker, basename):
+        utterance = self.load_utterance(speaker, basename)
+        if utterance is None:
+            return None
+        pitch = self.pitch_extractor(utterance["wav"])
+        mel_spectrogram, energy = Audio.tools.get_mel_from_wav(utterance["wav"], self.STFT)
+        return self.finish_utterance(utterance, pitch, mel_spectrogram, energy)
+
+    def load_utterance(self, speaker, basename):
+        """ Alignment, trimmed wav and transcript of one utterance, before any feature is computed """
         aux_data = ""
         wav_path = os.path.join(self.in_dir, speaker, "{}.wav".format(basename))
         text_path = os.path.join(self.in_dir, speaker, "{}.lab".format(basename))
@@ -243,7 +481,7 @@ class Preprocessor:
             return None
 
         # Read and trim wav files
-        wav, _ = librosa.load(wav_path)
+        wav = Audio.cache.load_wav(wav_path, self.sampling_rate, self.audio_cache)
         wav = wav[
             int(self.sampling_rate * start) : int(self.sampling_rate * end)
         ].astype(np.float32)
@@ -252,20 +490,26 @@ class Preprocessor:
         with open(text_path, "r") as f:
             raw_text = f.readline().strip("\n")
 
-        # Compute fundamental frequency
-        pitch, t = pw.dio(
-            wav.astype(np.float64),
-            self.sampling_rate,
-            frame_period=self.hop_length / self.sampling_rate * 1000,
-        )
-        pitch = pw.stonemask(wav.astype(np.float64), pitch, t, self.sampling_rate)
+        return {
+            "basename": basename,
+            "speaker": speaker,
+            "text": text,
+            "raw_text": raw_text,
+            "aux_data": aux_data,
+            "wav": wav,
+            "duration": duration,
+        }
+
+    def finish_utterance(self, utterance, pitch, mel_spectrogram, energy):
+        """ Feature-level averaging and saving once pitch, mel-spectrogram and energy are computed """
+        basename = utterance["basename"]
+        speaker = utterance["speaker"]
+        duration = utterance["duration"]
 
         pitch = pitch[: sum(duration)]
         if np.sum(pitch != 0) <= 1:
             return None
 
-        # Compute mel-scale spectrogram and energy
-        mel_spectrogram, energy = Audio.tools.get_mel_from_wav(wav, self.STFT)
         mel_spectrogram = mel_spectrogram[:, : sum(duration)]
         energy = energy[: sum(duration)]
 
@@ -301,6 +545,14 @@ class Preprocessor:
                 pos += d
             energy = energy[: len(duration)]
 
+        if self.storage_dtype == "float16":
+            # Half-precision features and 16-bit durations, upcast by the loader;
+            # the statistics below are computed from the stored values
+            mel_spectrogram = mel_spectrogram.astype(np.float16)
+            pitch = pitch.astype(np.float16)
+            energy = energy.astype(np.float16)
+            duration = np.asarray(duration, dtype=np.uint16)
+
         # Save files
         dur_filename = "{}-duration-{}.npy".format(speaker, basename)
         np.save(os.path.join(self.out_dir, "duration", dur_filename), duration)
@@ -318,10 +570,20 @@ class Preprocessor:
         )
 
         return (
-            "|".join([basename, speaker, text, raw_text, aux_data]),
+            "|".join(
+                [
+                    basename,
+                    speaker,
+                    utterance["text"],
+                    utterance["raw_text"],
+                    utterance["aux_data"],
+                ]
+            ),
             self.remove_outlier(pitch),
             self.remove_outlier(energy),
             mel_spectrogram.shape[1],
+            (np.min(pitch), np.max(pitch)),
+            (np.min(energy), np.max(energy)),
         )
 
     def get_alignment(self, tier):
@@ -374,15 +636,3 @@ class Preprocessor:
 
         return values[normal_indices]
 
-    def normalize(self, in_dir, mean, std):
-        max_value = np.finfo(np.float64).min
-        min_value = np.finfo(np.float64).max
-        for filename in os.listdir(in_dir):
-            filename = os.path.join(in_dir, filename)
-            values = (np.load(filename) - mean) / std
-            np.save(filename, values)
-
-            max_value = max(max_value, max(values))
-            min_value = min(min_value, min(values))
-
-        return min_value, max_value
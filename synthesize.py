@@ -8,13 +8,12 @@ import torch
 import yaml
 import numpy as np
 from torch.utils.data import DataLoader
-from g2p_en import G2p
 
 from utils.model import get_model, get_vocoder
 from utils.tools import to_device, synth_samples
+from utils.profiler import profile_span
 from dataset import TextDataset
 from text import text_to_sequence
-from text.korean import tokenize, normalize_nonchar
 
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
@@ -32,6 +31,9 @@ def read_lexicon(lex_path):
 
 
 def preprocess_korean(text, preprocess_config):
+    # Language front ends are imported only for the language of preprocess.yaml
+    from text.korean import tokenize, normalize_nonchar
+
     lexicon = read_lexicon(preprocess_config["path"]["lexicon_path"])
 
     phones = []
@@ -57,6 +59,8 @@ def preprocess_korean(text, preprocess_config):
 
 
 def preprocess_english(text, preprocess_config):
+    from g2p_en import G2p
+
     text = text.rstrip(punctuation)
     lexicon = read_lexicon(preprocess_config["path"]["lexicon_path"])
 
@@ -88,24 +92,26 @@ def synthesize(model, step, configs, vocoder, batchs, control_values, tag):
     pitch_control, energy_control, duration_control = control_values
 
     for batch in batchs:
-        batch = to_device(batch, device)
-        with torch.no_grad():
-            # Forward
-            output = model(
-                *(batch[2:]),
-                p_control=pitch_control,
-                e_control=energy_control,
-                d_control=duration_control
-            )
-            synth_samples(
-                batch,
-                output,
-                vocoder,
-                model_config,
-                preprocess_config,
-                train_config["path"]["result_path"],
-                tag,
-            )
+        # One span per request, next to the per-module hooks when profiling is enabled
+        with profile_span("synthesize", model_config):
+            batch = to_device(batch, device)
+            with torch.no_grad():
+                # Forward
+                output = model(
+                    *(batch[2:]),
+                    p_control=pitch_control,
+                    e_control=energy_control,
+                    d_control=duration_control
+                )
+                synth_samples(
+                    batch,
+                    output,
+                    vocoder,
+                    model_config,
+                    preprocess_config,
+                    train_config["path"]["result_path"],
+                    tag,
+                )
 
 
 if __name__ == "__main__":
@@ -186,6 +192,13 @@ if __name__ == "__main__":
         default=1.0,
         help="control the speed of the whole utterance, larger value for slower speaking rate",
     )
+    parser.add_argument(
+        "--postnet_mode",
+        type=str,
+        choices=["full", "light", "none"],
+        default=None,
+        help="mel refinement path, 'light' or 'none' trade quality for latency, defaults to model.yaml postnet.mode",
+    )
     args = parser.parse_args()
 
     # Check source texts
@@ -11,120 +11,29 @@ import torch
 import yaml
 import numpy as np
 from torch.utils.data import DataLoader
-import pypinyin
-from pypinyin import Style
 
 from utils.model import get_model, get_vocoder
 from utils.tools import to_device, synth_samples
+from utils.profiler import profile_span
 from dataset_chinese import TextDataset
-from text.symbols_pinyin import _symbol_to_id
+from text.symbols_pinyin import symbols, _symbol_to_id
+from text.pinyin_frontend import PinyinFrontend
 
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-def chinese_to_pinyin_phonemes(text):
-    """
-    将中文文本转换为拼音音素序列
-    """
-    # 转换为拼音（不带声调）
-    pinyin_list = pypinyin.lazy_pinyin(text, style=Style.NORMAL)
-    
-    print(f"拼音列表: {pinyin_list}")
-    
-    # 拼音到音素的映射规则
-    def pinyin_to_phonemes(pinyin):
-        """将单个拼音转换为音素序列"""
-        # 声母映射
-        initials = {
-            'b': 'b', 'p': 'p', 'm': 'm', 'f': 'f',
-            'd': 'd', 't': 't', 'n': 'n', 'l': 'l',
-            'g': 'g', 'k': 'k', 'h': 'h',
-            'j': 'j', 'q': 'q', 'x': 'x',
-            'zh': 'zh', 'ch': 'ch', 'sh': 'sh', 'r': 'r',
-            'z': 'z', 'c': 'c', 's': 's',
-            'y': 'y', 'w': 'w'
-        }
-        
-        # 韵母映射
-        finals = {
-            'a': 'a', 'o': 'o', 'e': 'e', 'i': 'i', 'u': 'u', 'v': 'y',
-            'ai': 'ai', 'ei': 'ei', 'ui': 'ui', 'ao': 'ao', 'ou': 'ou',
-            'iu': 'iu', 'ie': 'ie', 'ue': 'ue', 've': 'ue',
-            'an': 'a n', 'en': 'e n', 'in': 'i n', 'un': 'u n', 'vn': 'y n',
-            'ang': 'a ng', 'eng': 'e ng', 'ing': 'i ng', 'ong': 'o ng',
-            'er': 'er', 'iao': 'iao', 'ian': 'ia n', 'iang': 'ia ng',
-            'iong': 'io ng', 'uai': 'uai', 'uan': 'ua n', 'uang': 'ua ng'
-        }
-        
-        # 分离声母和韵母
-        initial = ''
-        final = pinyin
-        
-        # 检查双字符声母
-        for init in ['zh', 'ch', 'sh']:
-            if pinyin.startswith(init):
-                initial = init
-                final = pinyin[len(init):]
-                break
-        
-        # 检查单字符声母
-        if not initial:
-            for init in ['b', 'p', 'm', 'f', 'd', 't', 'n', 'l', 'g', 'k', 'h', 'j', 'q', 'x', 'r', 'z', 'c', 's', 'y', 'w']:
-                if pinyin.startswith(init):
-                    initial = init
-                    final = pinyin[len(init):]
-                    break
-        
-        # 构建音素序列
-        phonemes = []
-        
-        # 添加声母
-        if initial and initial in initials:
-            phonemes.append(initials[initial])
-        
-        # 添加韵母
-        if final:
-            if final in finals:
-                phonemes.extend(finals[final].split())
-            else:
-                # 如果韵母不在映射中，尝试逐字符处理
-                for char in final:
-                    if char in finals:
-                        phonemes.extend(finals[char].split())
-                    else:
-                        phonemes.append(char)
-        
-        return phonemes
-    
-    # 转换所有拼音
-    all_phonemes = []
-    for py in pinyin_list:
-        phonemes = pinyin_to_phonemes(py)
-        all_phonemes.extend(phonemes)
-    
-    return all_phonemes
-
-def preprocess_chinese_text(text, preprocess_config):
+def preprocess_chinese_text(text, preprocess_config, frontend=None):
     """
     处理中文文本，转换为音素序列
+    frontend 为 PinyinFrontend 时使用其句子缓存，重复的文本不再经过 pypinyin
     """
-    if text.startswith('{') and text.endswith('}'):
-        # 已经是音素格式
-        phonemes = text[1:-1].split()
-    else:
-        # 中文文本，需要转换
-        phonemes = chinese_to_pinyin_phonemes(text)
-    
-    # 转换为数字序列
-    phoneme_ids = []
-    for phone in phonemes:
-        if phone in _symbol_to_id:
-            phoneme_ids.append(_symbol_to_id[phone])
-        else:
-            print(f"Warning: Unknown phoneme '{phone}', using padding token")
-            phoneme_ids.append(_symbol_to_id['_'])  # padding token
+    if frontend is None:
+        frontend = PinyinFrontend(cache_size=0)
+    phoneme_ids = list(frontend.text_to_ids(text))
+    if _symbol_to_id['_'] in phoneme_ids:
+        print("Warning: Unknown phonemes mapped to padding token")
     
     print("Raw Text: {}".format(text))
-    print("Phonemes: {}".format(phonemes))
+    print("Phonemes: {}".format([symbols[i] for i in phoneme_ids]))
     print("Phoneme IDs: {}".format(phoneme_ids))
     
     return np.array(phoneme_ids)
@@ -134,24 +43,26 @@ def synthesize(model, step, configs, vocoder, batchs, control_values, tag):
     pitch_control, energy_control, duration_control = control_values
 
     for batch in batchs:
-        batch = to_device(batch, device)
-        with torch.no_grad():
-            # Forward
-            output = model(
-                *(batch[2:]),
-                p_control=pitch_control,
-                e_control=energy_control,
-                d_control=duration_control
-            )
-            synth_samples(
-                batch,
-                output,
-                vocoder,
-                model_config,
-                preprocess_config,
-                train_config["path"]["result_path"],
-                tag,
-            )
+        # One span per request, next to the per-module hooks when profiling is enabled
+        with profile_span("synthesize", model_config):
+            batch = to_device(batch, device)
+            with torch.no_grad():
+                # Forward
+                output = model(
+                    *(batch[2:]),
+                    p_control=pitch_control,
+                    e_control=energy_control,
+                    d_control=duration_control
+                )
+                synth_samples(
+                    batch,
+                    output,
+                    vocoder,
+                    model_config,
+                    preprocess_config,
+                    train_config["path"]["result_path"],
+                    tag,
+                )
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -225,6 +136,19 @@ if __name__ == "__main__":
         default=1.0,
         help="语速控制 (0.5-2.0，越大语速越慢)",
     )
+    parser.add_argument(
+        "--postnet_mode",
+        type=str,
+        choices=["full", "light", "none"],
+        default=None,
+        help="PostNet模式：full完整，light蒸馏轻量版，none跳过（默认使用model.yaml中的postnet.mode）",
+    )
+    parser.add_argument(
+        "--g2p_cache",
+        type=str,
+        default=None,
+        help="文本到音素ID的磁盘缓存文件（JSON），重复的提示语直接读取缓存",
+    )
     args = parser.parse_args()
 
     # 检查参数
@@ -293,7 +217,9 @@ if __name__ == "__main__":
         valences = np.array([valence_map[valence_str]])
         
         # 处理文本
-        text_sequence = preprocess_chinese_text(args.text, preprocess_config)
+        frontend = PinyinFrontend(cache_path=args.g2p_cache)
+        text_sequence = preprocess_chinese_text(args.text, preprocess_config, frontend)
+        frontend.save()
         texts = np.array([text_sequence])
         text_lens = np.array([len(text_sequence)])
         
@@ -1,12 +1,26 @@
 """ from https://github.com/keithito/tacotron """
 import re
+from functools import lru_cache
+
+import numpy as np
+
 from text import cleaners
-from text.symbols_ipa import symbols
-from .korean_dict import char_to_id, id_to_char
+from text import symbols as en_symbols
+from text import symbols_ipa
+from text import symbols_pinyin
+from .korean_dict import char_to_id
 
 # Regular expression matching text enclosed in curly braces:
 _curly_re = re.compile(r"(.*?)\{(.+?)\}(.*)")
 
+# Mappings from symbol to numeric ID, built once per symbol set:
+SYMBOL_TABLES = {
+    "ipa": symbols_ipa._symbol_to_id,
+    "pinyin": symbols_pinyin._symbol_to_id,
+    "kr": char_to_id,
+    "en": {s: i for i, s in enumerate(en_symbols.symbols)},
+}
+
 
 def text_to_sequence(text, cleaner_names):
     """Converts a string of text to a sequence of IDs corresponding to the symbols in the text.
@@ -23,31 +37,94 @@ def text_to_sequence(text, cleaner_names):
     """
     sequence = []
 
-    # Mappings from symbol to numeric ID and vice versa:
-    _language, _symbol_to_id, _ = ("kr", char_to_id, id_to_char) if "korean_cleaners" in cleaner_names\
-         else ("en", {s: i for i, s in enumerate(symbols)}, {i: s for i, s in enumerate(symbols)})
+    # Korean text uses the Korean symbols, everything else the IPA symbols:
+    _language = "kr" if "korean_cleaners" in cleaner_names else "en"
+    _symbol_to_id = SYMBOL_TABLES["kr" if _language == "kr" else "ipa"]
+    clean = get_cleaner(tuple(cleaner_names))
 
     # Check for curly braces and treat their contents as ARPAbet:
     while len(text):
         m = _curly_re.match(text)
 
         if not m:
-            sequence += _symbols_to_sequence(_clean_text(text, cleaner_names), _symbol_to_id)
+            sequence += _symbols_to_sequence(clean(text), _symbol_to_id)
             break
-        sequence += _symbols_to_sequence(_clean_text(m.group(1), cleaner_names), _symbol_to_id)
+        sequence += _symbols_to_sequence(clean(m.group(1)), _symbol_to_id)
         sequence += _arpabet_to_sequence(m.group(2), _language, _symbol_to_id)
         text = m.group(3)
 
     return sequence
 
 
-def _clean_text(text, cleaner_names):
+@lru_cache(maxsize=None)
+def get_cleaner(cleaner_names):
+    """ The cleaners named in cleaner_names (a tuple), composed into one function """
+    pipeline = []
     for name in cleaner_names:
-        cleaner = getattr(cleaners, name)
+        cleaner = getattr(cleaners, name, None)
         if not cleaner:
             raise Exception("Unknown cleaner: %s" % name)
-        text = cleaner(text)
-    return text
+        pipeline.append(cleaner)
+
+    def clean(text):
+        for cleaner in pipeline:
+            text = cleaner(text)
+        return text
+
+    return clean
+
+
+def _clean_text(text, cleaner_names):
+    return get_cleaner(tuple(cleaner_names))(text)
+
+
+@lru_cache(maxsize=None)
+def _phoneme_table(symbol_set, prefix):
+    """ Symbol table of symbol_set keyed by phoneme, i.e. symbols starting with prefix without it """
+    table = SYMBOL_TABLES[symbol_set]
+    if not prefix:
+        return table
+    return {s[len(prefix):]: i for s, i in table.items() if s.startswith(prefix)}
+
+
+def _split_phonemes(phonemes):
+    if isinstance(phonemes, str):
+        return phonemes.strip().strip("{}").split()
+    return phonemes
+
+
+def phonemes_to_array(phonemes, symbol_set="pinyin", prefix="", unknown_id=None):
+    """Maps phonemes to an int64 array of IDs of symbol_set.
+
+    Args:
+      phonemes: list of phonemes, or a string of space-separated phonemes, optionally in curly braces
+      symbol_set: one of SYMBOL_TABLES
+      prefix: prepended to each phoneme to form its symbol, "@" for the IPA symbols
+      unknown_id: ID of phonemes missing from the symbol set, which are dropped if None
+    """
+    get = _phoneme_table(symbol_set, prefix).get
+    if unknown_id is None:
+        ids = [i for i in map(get, _split_phonemes(phonemes)) if i is not None]
+    else:
+        ids = [get(p, unknown_id) for p in _split_phonemes(phonemes)]
+    return np.array(ids, dtype=np.int64)
+
+
+def phonemes_to_arrays(texts, symbol_set="pinyin", prefix="", unknown_id=None):
+    """ phonemes_to_array of many sequences at once, mapping all their phonemes in one pass """
+    sequences = [_split_phonemes(text) for text in texts]
+    lengths = [len(sequence) for sequence in sequences]
+    table = _phoneme_table(symbol_set, prefix)
+    missing = -1 if unknown_id is None else unknown_id
+    ids = np.fromiter(
+        (table.get(p, missing) for sequence in sequences for p in sequence),
+        dtype=np.int64,
+        count=sum(lengths),
+    )
+    arrays = np.split(ids, np.cumsum(lengths)[:-1]) if sequences else []
+    if unknown_id is None:
+        arrays = [array[array >= 0] for array in arrays]
+    return arrays
 
 
 def _symbols_to_sequence(symbols, _symbol_to_id):
@@ -9,6 +9,9 @@ from text.symbols_ipa import symbols, _symbol_to_id, _id_to_symbol
 # Regular expression matching text enclosed in curly braces:
 _curly_re = re.compile(r"(.*?)\{(.+?)\}(.*)")
 
+# Phoneme (symbol without its @ prefix) to ID
+_phoneme_to_id = {s[1:]: i for s, i in _symbol_to_id.items() if s.startswith("@")}
+
 def text_to_sequence_ipa(text, cleaner_names=None):
     """
     Convert IPA phoneme text to sequence of IDs
@@ -36,20 +39,15 @@ def text_to_sequence_ipa(text, cleaner_names=None):
 
 def _phonemes_to_sequence(phonemes):
     """Convert phoneme list to ID sequence"""
-    sequence = []
-    for phoneme in phonemes:
-        # Add @ prefix for IPA phonemes
-        ipa_symbol = "@" + phoneme
-        if ipa_symbol in _symbol_to_id:
-            sequence.append(_symbol_to_id[ipa_symbol])
-        else:
+    # IPA phonemes are stored with an @ prefix
+    sequence = [_phoneme_to_id.get(phoneme) for phoneme in phonemes]
+    if None not in sequence:
+        return sequence
+    for i, phoneme in enumerate(phonemes):
+        if sequence[i] is None:
             # Unknown phoneme, use a default
             print(f"Warning: Unknown phoneme '{phoneme}', using '@spn'")
-            if "@spn" in _symbol_to_id:
-                sequence.append(_symbol_to_id["@spn"])
-            else:
-                sequence.append(1)  # UNK token
-    
+            sequence[i] = _symbol_to_id.get("@spn", 1)  # UNK token
     return sequence
 
 def sequence_to_text_ipa(sequence):
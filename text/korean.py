@@ -5,14 +5,34 @@ import re
 import os
 import ast
 import json
-from quickspacer import Spacer
-from g2pk import G2p
+from functools import lru_cache
 from jamo import hangul_to_jamo, h2j, j2h
 from jamo.jamo import _jamo_char_to_hcj
 from .korean_dict import JAMO_LEADS, JAMO_VOWELS, JAMO_TAILS, ko_dict
 
-g2p=G2p()
-spacer = Spacer(level=3)
+# Sentences whose tokens are kept by tokenize
+TOKENIZE_CACHE_SIZE = 4096
+
+# g2pk and quickspacer load their models when constructed, so they are only
+# imported and built on the first Korean request and then shared
+_g2p = None
+_spacer = None
+
+
+def get_g2p():
+    global _g2p
+    if _g2p is None:
+        from g2pk import G2p
+        _g2p = G2p()
+    return _g2p
+
+
+def get_spacer():
+    global _spacer
+    if _spacer is None:
+        from quickspacer import Spacer
+        _spacer = Spacer(level=3)
+    return _spacer
 
 
 def tokenize(text, norm=True):
@@ -23,12 +43,15 @@ def tokenize(text, norm=True):
     Example:
         '한글은 위대하다.'  --> ['ᄒ', 'ᅡ', 'ᆫ', 'ᄀ', 'ᅳ', 'ᄅ', 'ᅳ', ' ', 'ᄂ', 'ᅱ', 'ᄃ', 'ᅢ', 'ᄒ', 'ᅡ', 'ᄃ', 'ᅡ', '.']
     """
+    return list(_tokenize(text, norm))
+
+
+@lru_cache(maxsize=TOKENIZE_CACHE_SIZE)
+def _tokenize(text, norm):
     if norm:
         text = normalize(text)
-    text = g2p(text)
-    tokens = list(hangul_to_jamo(text))
-
-    return tokens
+    text = get_g2p()(text)
+    return tuple(hangul_to_jamo(text))
 
 
 def detokenize(tokens):
@@ -107,7 +130,7 @@ def normalize(text):
     text = normalize_quote(text)
     text = normalize_number(text)
     text = normalize_nonchar(text)
-    text = spacer.space([text])[0]
+    text = get_spacer().space([text])[0]
 
     return text
 
@@ -1,10 +1,9 @@
 """ from https://github.com/keithito/tacotron """
 
-import inflect
 import re
 
 
-_inflect = inflect.engine()
+_inflect = None
 _comma_number_re = re.compile(r"([0-9][0-9\,]+[0-9])")
 _decimal_number_re = re.compile(r"([0-9]+\.[0-9]+)")
 _pounds_re = re.compile(r"£([0-9\,]*[0-9]+)")
@@ -13,6 +12,16 @@ _ordinal_re = re.compile(r"[0-9]+(st|nd|rd|th)")
 _number_re = re.compile(r"[0-9]+")
 
 
+def _get_inflect():
+    # inflect is only needed for English numbers, its engine is built on first use
+    global _inflect
+    if _inflect is None:
+        import inflect
+
+        _inflect = inflect.engine()
+    return _inflect
+
+
 def _remove_commas(m):
     return m.group(1).replace(",", "")
 
@@ -43,7 +52,7 @@ def _expand_dollars(m):
 
 
 def _expand_ordinal(m):
-    return _inflect.number_to_words(m.group(0))
+    return _get_inflect().number_to_words(m.group(0))
 
 
 def _expand_number(m):
@@ -52,15 +61,15 @@ def _expand_number(m):
         if num == 2000:
             return "two thousand"
         elif num > 2000 and num < 2010:
-            return "two thousand " + _inflect.number_to_words(num % 100)
+            return "two thousand " + _get_inflect().number_to_words(num % 100)
         elif num % 100 == 0:
-            return _inflect.number_to_words(num // 100) + " hundred"
+            return _get_inflect().number_to_words(num // 100) + " hundred"
         else:
-            return _inflect.number_to_words(
+            return _get_inflect().number_to_words(
                 num, andword="", zero="oh", group=2
             ).replace(", ", " ")
     else:
-        return _inflect.number_to_words(num, andword="")
+        return _get_inflect().number_to_words(num, andword="")
 
 
 def normalize_numbers(text):
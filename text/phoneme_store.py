@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+class PhonemeStore:
+    """
+    Phoneme ID sequences of a metadata file (train.txt, val.txt), encoded once.
+    The sequences of all lines are concatenated into <name>.<encoding>.ids.npy as
+    int16, <name>.<encoding>.offsets.npy holds where each line starts (one more
+    entry than lines), and both are read back through memory maps. Item i is a
+    slice of the mapped array, nothing is parsed per access.
+    <name>.<encoding>.json records the size and mtime of the metadata file and a
+    digest of the symbol set, so that a changed file or symbol set is encoded again.
+    """
+
+    def __init__(self, ids, offsets):
+        self.ids = ids
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.ids[self.offsets[i] : self.offsets[i + 1]]
+
+    @staticmethod
+    def paths(metadata_path, encoding):
+        prefix = "{}.{}".format(os.path.splitext(metadata_path)[0], encoding)
+        return prefix + ".ids.npy", prefix + ".offsets.npy", prefix + ".json"
+
+    @staticmethod
+    def signature(metadata_path, symbols):
+        stat = os.stat(metadata_path)
+        return {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "symbols": hashlib.sha1(json.dumps(symbols, ensure_ascii=False).encode("utf-8")).hexdigest()
+            if symbols is not None
+            else None,
+        }
+
+    @classmethod
+    def build(cls, metadata_path, encode, encoding, symbols=None):
+        """ Encode the phoneme field (third column) of every line with encode(texts) -> list of arrays """
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            texts = [line.strip("\n").split("|")[2] for line in f]
+        sequences = encode(texts)
+        lengths = np.array([len(sequence) for sequence in sequences], dtype=np.int64)
+        offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        ids = (
+            np.concatenate([np.asarray(sequence, dtype=np.int64) for sequence in sequences])
+            if len(sequences) > 0
+            else np.zeros(0, dtype=np.int64)
+        )
+        if len(ids) > 0 and (ids.min() < np.iinfo(np.int16).min or ids.max() > np.iinfo(np.int16).max):
+            raise ValueError("Phoneme IDs of {} do not fit in int16".format(metadata_path))
+
+        ids_path, offsets_path, info_path = cls.paths(metadata_path, encoding)
+        # Written under temporary names and renamed, the json last, so readers never see a partial store
+        for path, array in [(ids_path, ids.astype(np.int16)), (offsets_path, offsets)]:
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(path + ".tmp", path)
+        with open(info_path + ".tmp", "w") as f:
+            json.dump(cls.signature(metadata_path, symbols), f)
+        os.replace(info_path + ".tmp", info_path)
+
+    @classmethod
+    def load(cls, metadata_path, encode, encoding, symbols=None):
+        """ The store of metadata_path, encoded first if it is missing or stale """
+        ids_path, offsets_path, info_path = cls.paths(metadata_path, encoding)
+        info = None
+        if os.path.exists(info_path):
+            with open(info_path, "r") as f:
+                info = json.load(f)
+        if info != cls.signature(metadata_path, symbols):
+            cls.build(metadata_path, encode, encoding, symbols)
+
+        offsets = np.load(offsets_path)
+        # An empty array cannot be memory-mapped
+        ids = np.load(ids_path, mmap_mode="r" if offsets[-1] > 0 else None)
+        return cls(ids, offsets)
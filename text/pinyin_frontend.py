@@ -0,0 +1,233 @@
+""" Mandarin text to phoneme IDs of text.symbols_pinyin, memoized per syllable and per sentence """
+
+import json
+import os
+from functools import lru_cache
+
+from text.pinyin_table import load_syllable_table
+from text.polyphone import PHRASE_DICT_PATH, get_tokenizer, load_phrase_trie, phrase_dict_signature
+from text.symbols_pinyin import symbols, _symbol_to_id
+
+# Sentences kept in the in-process cache of each PinyinFrontend
+SENTENCE_CACHE_SIZE = 4096
+
+_initials = {
+    "b": "b", "p": "p", "m": "m", "f": "f",
+    "d": "d", "t": "t", "n": "n", "l": "l",
+    "g": "g", "k": "k", "h": "h",
+    "j": "j", "q": "q", "x": "x",
+    "zh": "zh", "ch": "ch", "sh": "sh", "r": "r",
+    "z": "z", "c": "c", "s": "s",
+    "y": "y", "w": "w",
+}
+
+_finals = {
+    "a": "a", "o": "o", "e": "e", "i": "i", "u": "u", "v": "y",
+    "ai": "ai", "ei": "ei", "ui": "ui", "ao": "ao", "ou": "ou",
+    "iu": "iu", "ie": "ie", "ue": "ue", "ve": "ue",
+    "an": "a n", "en": "e n", "in": "i n", "un": "u n", "vn": "y n",
+    "ang": "a ng", "eng": "e ng", "ing": "i ng", "ong": "o ng",
+    "er": "er", "iao": "iao", "ian": "ia n", "iang": "ia ng",
+    "iong": "io ng", "uai": "uai", "uan": "ua n", "uang": "ua ng",
+}
+
+# Two-letter initials are tried before the one-letter ones
+_initial_order = ["zh", "ch", "sh", "b", "p", "m", "f", "d", "t", "n", "l", "g", "k", "h",
+                  "j", "q", "x", "r", "z", "c", "s", "y", "w"]
+
+_lazy_pinyin = None
+
+# Syllable -> phoneme IDs shipped with the package (build_pinyin_table.py),
+# None if it is missing or stale, in which case syllables are decomposed on first use
+SYLLABLE_TABLE = load_syllable_table()
+
+
+def get_lazy_pinyin():
+    """ pypinyin.lazy_pinyin, imported on first use """
+    global _lazy_pinyin
+    if _lazy_pinyin is None:
+        from pypinyin import lazy_pinyin
+        _lazy_pinyin = lazy_pinyin
+    return _lazy_pinyin
+
+
+def pinyin_to_phonemes(pinyin):
+    """Splits a toneless pinyin syllable into the phonemes of text.symbols_pinyin.
+
+    Finals missing from the table are split character by character, so that
+    non-pinyin chunks returned by pypinyin (punctuation, latin letters) come
+    out as single characters.
+    """
+    initial = ""
+    final = pinyin
+    for init in _initial_order:
+        if pinyin.startswith(init):
+            initial = init
+            final = pinyin[len(init):]
+            break
+
+    phonemes = []
+    if initial:
+        phonemes.append(_initials[initial])
+    if final:
+        if final in _finals:
+            phonemes.extend(_finals[final].split())
+        else:
+            for char in final:
+                if char in _finals:
+                    phonemes.extend(_finals[char].split())
+                else:
+                    phonemes.append(char)
+    return phonemes
+
+
+class PinyinFrontend:
+    """Converts Mandarin text into phoneme ID sequences for text.symbols_pinyin.
+
+    Syllables are looked up in syllable_table (the shipped SYLLABLE_TABLE by default),
+    others are decomposed once and added to the table of the instance. Only its
+    toneless entries apply to pypinyin output: a chunk of raw text such as "a1" must
+    still be split character by character. Whole sentences
+    are kept in an LRU of cache_size entries, and with cache_path also persisted to a
+    JSON file by save(), so that repeated prompts skip pypinyin entirely.
+
+    Polyphones are read from the phrase dictionaries in phrase_dicts: the text is
+    segmented with jieba (segment=True) and in each word the longest phrase of the
+    dictionary wins, the remaining text is read by pypinyin. Without phrase_dicts
+    every character is left to pypinyin. Phonemes missing from the symbol set map to the padding ID.
+    Text in curly braces, e.g. "{n i h ao}", is taken as space-separated phonemes.
+    """
+
+    def __init__(self, cache_size=SENTENCE_CACHE_SIZE, cache_path=None, syllable_table=SYLLABLE_TABLE,
+                 phrase_dicts=(PHRASE_DICT_PATH,), segment=True):
+        self.cache_path = cache_path
+        self.segment = segment
+        self._phrase_dicts = tuple(phrase_dicts or ())
+        self._trie = load_phrase_trie(self._phrase_dicts) if self._phrase_dicts else None
+        self._pad_id = _symbol_to_id["_"]
+        self._syllable_table = syllable_table or dict()
+        self._toneless_table = {
+            syllable: ids for syllable, ids in self._syllable_table.items() if not syllable[-1].isdigit()
+        }
+        self._syllable_ids = dict(self._toneless_table)
+        self._disk_cache = self._load_disk_cache(cache_path)
+        self._dirty = False
+        self._cached_ids = lru_cache(maxsize=cache_size)(self._text_to_ids)
+
+    def __call__(self, text):
+        return self.text_to_ids(text)
+
+    def text_to_ids(self, text):
+        """ Phoneme IDs of text, as a tuple """
+        return self._cached_ids(text)
+
+    def phonemes(self, text):
+        """ Phoneme symbols of text, for display """
+        return [symbols[i] for i in self.text_to_ids(text)]
+
+    def syllable_to_ids(self, syllable):
+        ids = self._syllable_ids.get(syllable)
+        if ids is None:
+            ids = self._phonemes_to_ids(pinyin_to_phonemes(syllable))
+            self._syllable_ids[syllable] = ids
+        return ids
+
+    def pinyin_to_ids(self, syllables):
+        """ Phoneme IDs of a list of syllables, toneless or with tone numbers (Style.TONE3) """
+        ids = list()
+        for syllable in syllables:
+            toned = self._syllable_table.get(syllable)
+            ids.extend(toned if toned is not None else self.syllable_to_ids(syllable.rstrip("12345")))
+        return tuple(ids)
+
+    def cache_info(self):
+        return self._cached_ids.cache_info()
+
+    def cache_clear(self):
+        """ Empties the in-process caches, the on-disk cache is kept """
+        self._cached_ids.cache_clear()
+        self._syllable_ids = dict(self._toneless_table)
+
+    def _phonemes_to_ids(self, phonemes):
+        return tuple(_symbol_to_id.get(phone, self._pad_id) for phone in phonemes)
+
+    def _text_to_ids(self, text):
+        if text.startswith("{") and text.endswith("}"):
+            return self._phonemes_to_ids(text[1:-1].split())
+
+        ids = self._disk_cache.get(text)
+        if ids is not None:
+            return ids
+
+        ids = list()
+        for phrase, reading in self._split_phrases(text):
+            if reading is not None:
+                ids.extend(self.pinyin_to_ids(reading))
+                continue
+            for syllable in get_lazy_pinyin()(phrase):
+                ids.extend(self.syllable_to_ids(syllable))
+        ids = tuple(ids)
+        if self.cache_path is not None:
+            self._disk_cache[text] = ids
+            self._dirty = True
+        return ids
+
+    def _split_phrases(self, text):
+        """ text as (piece, reading) pairs: dictionary phrases with their reading, the text in between with None """
+        trie = self._trie
+        if trie is None or not any(char in trie.root for char in text):
+            return [(text, None)]
+        words = get_tokenizer(trie).lcut(text) if self.segment else [text]
+
+        pieces = []
+        run_start = 0  # start of the text not covered by a phrase
+        offset = 0
+        for word in words:
+            start = 0
+            while start < len(word):
+                match = trie.longest_match(word, start)
+                if match is None:
+                    start += 1
+                    continue
+                if run_start < offset + start:
+                    pieces.append((text[run_start:offset + start], None))
+                end, reading = match
+                pieces.append((word[start:end], reading))
+                start = end
+                run_start = offset + end
+            offset += len(word)
+        if run_start < len(text):
+            pieces.append((text[run_start:], None))
+        return pieces
+
+    def _cache_signature(self):
+        return {
+            "symbols": symbols,
+            "phrases": phrase_dict_signature(self._phrase_dicts) if self._phrase_dicts else None,
+            "segment": self.segment,
+        }
+
+    def _load_disk_cache(self, cache_path):
+        if cache_path is None or not os.path.isfile(cache_path):
+            return dict()
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        # IDs are only valid for the symbol set and phrase dictionaries they were computed with
+        if any(cache.get(key) != value for key, value in self._cache_signature().items()):
+            return dict()
+        return {text: tuple(ids) for text, ids in cache["sentences"].items()}
+
+    def save(self):
+        """ Writes the sentences converted so far to cache_path """
+        if self.cache_path is None or not self._dirty:
+            return
+        cache_dir = os.path.dirname(self.cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            cache = self._cache_signature()
+            cache["sentences"] = {text: list(ids) for text, ids in self._disk_cache.items()}
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+        self._dirty = False
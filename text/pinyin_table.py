@@ -0,0 +1,138 @@
+""" Precompiled pinyin syllable -> phoneme ID table for text.symbols_pinyin """
+
+import json
+import os
+
+from text.pinyin import initials, finals
+from text.symbols_pinyin import symbols, _symbol_to_id
+
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pinyin_syllables.json")
+
+TONES = ["1", "2", "3", "4", "5"]
+
+_retroflex = {"zh", "ch", "sh", "r"}
+_dental = {"z", "c", "s"}
+_palatal = {"j", "q", "x"}
+_labial = {"b", "p", "m", "f"}
+_velar = {"g", "k", "h"}
+
+# Syllables pypinyin returns that no initial/final pair of text/pinyin.py spells:
+# erhua "r", interjections and the zero-initial forms of ueng and io
+_extra_syllables = ["r", "m", "n", "ng", "hm", "hng", "weng", "yo"]
+
+
+def _surface_final(initial, final):
+    """ Spelling of a toneless final after a consonant initial, None if they do not combine """
+    if final == "ii":
+        return "i" if initial in _dental else None
+    if final == "iii":
+        return "i" if initial in _retroflex else None
+    if final.startswith("v"):
+        if initial in _palatal:
+            return "u" + final[1:]
+        if initial in ("n", "l") and final in ("v", "ve"):
+            return final
+        return None
+    if initial in _palatal:
+        return {"iou": "iu"}.get(final, final) if final.startswith("i") else None
+    if final.startswith("i") and initial in _retroflex | _dental | _velar | {"f"}:
+        return None
+    if final == "er" or (initial in _labial and (final == "ong" or final[:2] in ("ua", "ue", "uo"))):
+        return None
+    return {"iou": "iu", "uei": "ui", "uen": "un"}.get(final, final)
+
+
+def _zero_initial_syllable(final):
+    """ Spelling of a final without initial, with y/w written in place of i/u/v """
+    if final in ("ii", "iii", "ong"):
+        return None
+    if final in ("i", "in", "ing"):
+        return "y" + final
+    if final.startswith("i"):
+        return "y" + final[1:]
+    if final == "u":
+        return "wu"
+    if final.startswith("u"):
+        return "w" + final[1:]
+    if final.startswith("v"):
+        return "yu" + final[1:]
+    return final
+
+
+def enumerate_syllables():
+    """ Every toneless pinyin spelling formed by the initials and finals of text/pinyin.py """
+    toneless_finals = sorted({final.rstrip("12345") for final in finals})
+    syllables = set(_extra_syllables)
+    for final in toneless_finals:
+        syllable = _zero_initial_syllable(final)
+        if syllable is not None:
+            syllables.add(syllable)
+        for initial in initials:
+            # y and w only spell the zero initial
+            if initial in ("y", "w"):
+                continue
+            surface = _surface_final(initial, final)
+            if surface is not None:
+                syllables.add(initial + surface)
+    # pypinyin writes both lve and lue
+    syllables.update({"lue", "nue"})
+    return sorted(syllables)
+
+
+def build_syllable_table(to_phonemes):
+    """Maps every syllable, toneless and with tones 1-5, to the IDs of to_phonemes(syllable).
+
+    Tones are not part of text.symbols_pinyin, a toned syllable has the IDs of its
+    toneless form. Phonemes missing from the symbol set map to the padding ID.
+    """
+    pad_id = _symbol_to_id["_"]
+    table = dict()
+    for syllable in enumerate_syllables():
+        ids = [_symbol_to_id.get(phone, pad_id) for phone in to_phonemes(syllable)]
+        table[syllable] = ids
+        for tone in TONES:
+            table[syllable + tone] = ids
+    return table
+
+
+def save_syllable_table(table, path=TABLE_PATH):
+    # One syllable per line, so that rebuilds diff readably
+    lines = ['{}: {}'.format(json.dumps(syllable), json.dumps(list(ids))) for syllable, ids in table.items()]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{{"symbols": {},\n"syllables": {{\n'.format(json.dumps(symbols)))
+        f.write(",\n".join(lines))
+        f.write("\n}}\n")
+
+
+def load_syllable_table(path=TABLE_PATH):
+    """ The shipped table as {syllable: tuple of IDs}, None if missing or built for other symbols """
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("symbols") != symbols:
+        return None
+    return {syllable: tuple(ids) for syllable, ids in data["syllables"].items()}
+
+
+def validate_syllable_table(table, to_phonemes, lexicon_syllables=()):
+    """Differences between table and the rules in to_phonemes, as a list of messages.
+
+    Toneless entries must equal the rule output, toned entries their toneless form,
+    and every syllable of lexicon_syllables must be in the table.
+    """
+    errors = list()
+    expected = build_syllable_table(to_phonemes)
+    for syllable in sorted(set(expected) | set(table)):
+        if syllable not in table:
+            errors.append("missing syllable {}".format(syllable))
+        elif syllable not in expected:
+            errors.append("unexpected syllable {}".format(syllable))
+        elif list(table[syllable]) != expected[syllable]:
+            errors.append(
+                "{}: table {} != rules {}".format(syllable, list(table[syllable]), expected[syllable])
+            )
+    for syllable in sorted(set(lexicon_syllables)):
+        if syllable not in table:
+            errors.append("lexicon syllable {} not covered".format(syllable))
+    return errors
@@ -0,0 +1,133 @@
+""" Phrase-level pinyin dictionary for polyphone disambiguation, compiled into a trie """
+
+import hashlib
+import os
+from functools import lru_cache
+
+_lexicon_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lexicon")
+
+# Syllable inventory (MFA pinyin dictionary) and phrase readings ("银行 yin2 hang2" per line)
+LEXICON_PATH = os.path.join(_lexicon_dir, "mandarin_pinyin.dict")
+PHRASE_DICT_PATH = os.path.join(_lexicon_dir, "mandarin_phrases.dict")
+
+_jieba = None
+
+
+def get_jieba():
+    """ jieba, imported on first use """
+    global _jieba
+    if _jieba is None:
+        import jieba
+        _jieba = jieba
+    return _jieba
+
+
+def load_lexicon_syllables(path=LEXICON_PATH):
+    """ Tone-numbered syllables of an MFA pinyin dictionary such as lexicon/mandarin_pinyin.dict """
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.split()[0] for line in f if line.strip()}
+
+
+class PhraseTrie:
+    """Character trie of phrase readings with longest-match lookup.
+
+    Each node is a dict from character to child node, the reading of a phrase
+    (a tuple of tone-numbered syllables, one per character) is stored under
+    the None key of the node its last character leads to.
+    """
+
+    def __init__(self):
+        self.root = dict()
+        self.size = 0
+
+    def add(self, phrase, syllables):
+        if len(phrase) != len(syllables):
+            raise ValueError("{} has {} syllables for {} characters".format(phrase, len(syllables), len(phrase)))
+        node = self.root
+        for char in phrase:
+            node = node.setdefault(char, dict())
+        if None not in node:
+            self.size += 1
+        node[None] = tuple(syllables)
+
+    def longest_match(self, text, start=0):
+        """ (end, reading) of the longest phrase at text[start:], None if no phrase starts there """
+        node = self.root
+        match = None
+        for end in range(start, len(text)):
+            node = node.get(text[end])
+            if node is None:
+                break
+            if None in node:
+                match = (end + 1, node[None])
+        return match
+
+    def items(self):
+        """ (phrase, reading) of every phrase in the trie """
+        stack = [("", self.root)]
+        while stack:
+            prefix, node = stack.pop()
+            for char, child in node.items():
+                if char is None:
+                    yield prefix, child
+                else:
+                    stack.append((prefix + char, child))
+
+    def __len__(self):
+        return self.size
+
+
+def read_phrase_dict(path, valid_syllables=None):
+    """Phrases and readings of a dictionary file, one "phrase syllable ..." entry per line.
+
+    Blank lines and lines starting with # are skipped. With valid_syllables, an
+    entry using a syllable outside of it raises a ValueError naming the line.
+    """
+    entries = list()
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            phrase, syllables = fields[0], fields[1:]
+            if valid_syllables is not None:
+                unknown = [s for s in syllables if s not in valid_syllables]
+                if unknown:
+                    raise ValueError(
+                        "{}:{}: unknown syllables {} for {}".format(path, line_number, unknown, phrase)
+                    )
+            entries.append((phrase, syllables))
+    return entries
+
+
+@lru_cache(maxsize=None)
+def load_phrase_trie(paths=(PHRASE_DICT_PATH,), lexicon_path=LEXICON_PATH):
+    """ Trie of the phrase dictionaries in paths (later files win), compiled once per process """
+    valid_syllables = load_lexicon_syllables(lexicon_path) if lexicon_path else None
+    trie = PhraseTrie()
+    for path in paths:
+        for phrase, syllables in read_phrase_dict(path, valid_syllables):
+            trie.add(phrase, syllables)
+    return trie
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(trie):
+    """A jieba tokenizer that keeps every phrase of trie as one word.
+
+    It is separate from the default jieba dictionary, which the text normalizer
+    uses for part-of-speech tags.
+    """
+    tokenizer = get_jieba().Tokenizer()
+    for phrase, _ in trie.items():
+        tokenizer.add_word(phrase)
+    return tokenizer
+
+
+def phrase_dict_signature(paths=(PHRASE_DICT_PATH,)):
+    """ Digest of the phrase dictionaries, so that cached conversions follow dictionary edits """
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
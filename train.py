@@ -8,9 +8,9 @@ from torch.utils.data import DataLoader
 from torch.utils.tensorboard import SummaryWriter
 from tqdm import tqdm
 
-from utils.model import get_model, get_vocoder, get_param_num
+from utils.model import get_model, get_vocoder, get_param_num, get_teacher_model
 from utils.tools import to_device, log, synth_one_sample
-from model import FastSpeech2Loss
+from model import FastSpeech2Loss, FastSpeech2DistillationLoss
 from dataset_chinese import Dataset
 
 from evaluate import evaluate
@@ -25,7 +25,13 @@ def main(args, configs):
 
     # Get dataset
     dataset = Dataset(
-        "train.txt", preprocess_config, model_config, train_config, sort=True, drop_last=True
+        "train.txt",
+        preprocess_config,
+        model_config,
+        train_config,
+        sort=True,
+        drop_last=True,
+        pin_memory=device.type == "cuda",
     )
     batch_size = train_config["optimizer"]["batch_size"]
     group_size = 4  # Set this larger than 1 to enable sorting in Dataset
@@ -44,6 +50,15 @@ def main(args, configs):
     Loss = FastSpeech2Loss(preprocess_config, model_config).to(device)
     print("Number of FastSpeech2 Parameters:", num_param)
 
+    # Load frozen teacher for knowledge distillation
+    teacher = None
+    if "distillation" in train_config:
+        teacher = get_teacher_model(configs, device)
+        Loss = FastSpeech2DistillationLoss(
+            preprocess_config, model_config, train_config
+        ).to(device)
+        print("Number of Teacher FastSpeech2 Parameters:", get_param_num(teacher))
+
     # Load vocoder
     vocoder = get_vocoder(model_config, device)
 
@@ -82,7 +97,12 @@ def main(args, configs):
                 output = model(*(batch[2:]))
 
                 # Cal Loss
-                losses = Loss(batch, output)
+                if teacher is not None:
+                    with torch.no_grad():
+                        teacher_output = teacher(*(batch[2:]))
+                    losses = Loss(batch, output, teacher_output)
+                else:
+                    losses = Loss(batch, output)
                 total_loss = losses[0]
 
                 # Backward
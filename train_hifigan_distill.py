@@ -0,0 +1,179 @@
+import argparse
+import os
+import random
+
+import torch
+import yaml
+import torch.nn.functional as F
+from torch.utils.data import DataLoader
+from tqdm import tqdm
+
+from utils.model import get_model, get_hifigan, get_param_num
+from utils.tools import to_device
+from dataset_chinese import Dataset
+
+device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+# (n_fft, hop_length, win_length) of the multi-resolution STFT loss
+STFT_RESOLUTIONS = [(1024, 120, 600), (2048, 240, 1200), (512, 50, 240)]
+
+
+def stft_magnitude(wav, n_fft, hop_length, win_length):
+    spec = torch.stft(
+        wav,
+        n_fft,
+        hop_length,
+        win_length,
+        window=torch.hann_window(win_length, device=wav.device),
+        return_complex=True,
+    )
+    return torch.clamp(spec.abs(), min=1e-7).transpose(1, 2)
+
+
+def multi_resolution_stft_loss(wav_prediction, wav_target):
+    loss = 0.0
+    for n_fft, hop_length, win_length in STFT_RESOLUTIONS:
+        mag_prediction = stft_magnitude(wav_prediction, n_fft, hop_length, win_length)
+        mag_target = stft_magnitude(wav_target, n_fft, hop_length, win_length)
+        spectral_convergence = torch.norm(mag_target - mag_prediction, p="fro") / torch.norm(
+            mag_target, p="fro"
+        )
+        log_magnitude = F.l1_loss(torch.log(mag_prediction), torch.log(mag_target))
+        loss = loss + spectral_convergence + log_magnitude
+    return loss / len(STFT_RESOLUTIONS)
+
+
+def main(args, configs):
+    print("Prepare HiFi-GAN distillation ...")
+
+    preprocess_config, model_config, train_config = configs
+    hop_length = preprocess_config["preprocessing"]["stft"]["hop_length"]
+    segment_frames = args.segment_size // hop_length
+
+    # Get dataset
+    dataset = Dataset(
+        "train.txt", preprocess_config, model_config, train_config, sort=True, drop_last=True
+    )
+    batch_size = train_config["optimizer"]["batch_size"]
+    group_size = 4  # Set this larger than 1 to enable sorting in Dataset
+    assert batch_size * group_size < len(dataset)
+    loader = DataLoader(
+        dataset,
+        batch_size=batch_size * group_size,
+        shuffle=True,
+        collate_fn=dataset.collate_fn,
+    )
+
+    # FastSpeech2 provides the input mels, the universal generator the target waveforms
+    model = get_model(args, configs, device, train=False)
+    teacher = get_hifigan(args.teacher_config, args.teacher_ckpt, device)
+    student = get_hifigan(args.student_config, args.student_ckpt, device, train=True)
+    print("Number of Teacher HiFi-GAN Parameters:", get_param_num(teacher))
+    print("Number of Student HiFi-GAN Parameters:", get_param_num(student))
+
+    optimizer = torch.optim.AdamW(
+        student.parameters(), args.learning_rate, betas=[0.8, 0.99]
+    )
+    os.makedirs(os.path.dirname(args.output_ckpt) or ".", exist_ok=True)
+
+    step = 1
+    outer_bar = tqdm(total=args.total_step, desc="Distilling", position=0)
+
+    while True:
+        for batchs in loader:
+            for batch in batchs:
+                batch = to_device(batch, device)
+
+                with torch.no_grad():
+                    output = model(*(batch[2:]))
+                    mels = output[1].transpose(1, 2)
+
+                    # Random segment shared by the whole batch
+                    min_len = output[9].min().item()
+                    if min_len > segment_frames:
+                        start = random.randint(0, min_len - segment_frames)
+                        mels = mels[:, :, start : start + segment_frames]
+                    else:
+                        mels = mels[:, :, :min_len]
+
+                    wav_target = teacher(mels).squeeze(1)
+
+                wav_prediction = student(mels).squeeze(1)
+                loss = multi_resolution_stft_loss(wav_prediction, wav_target)
+                loss = loss + args.lambda_wav * F.l1_loss(wav_prediction, wav_target)
+
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+
+                if step % args.log_step == 0:
+                    outer_bar.write(
+                        "Step {}/{}, Distillation Loss: {:.4f}".format(
+                            step, args.total_step, loss.item()
+                        )
+                    )
+
+                if step % args.save_step == 0 or step == args.total_step:
+                    torch.save({"generator": student.state_dict()}, args.output_ckpt)
+
+                if step == args.total_step:
+                    return
+                step += 1
+                outer_bar.update(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--restore_step", type=int, required=True)
+    parser.add_argument(
+        "--student_config",
+        type=str,
+        default="hifigan/config_v2.json",
+        help="generator config to distill into, e.g. hifigan/config_v2.json, config_v3.json or config_mb.json",
+    )
+    parser.add_argument(
+        "--student_ckpt",
+        type=str,
+        default=None,
+        help="optional generator checkpoint to fine-tune from",
+    )
+    parser.add_argument("--teacher_config", type=str, default="hifigan/config.json")
+    parser.add_argument(
+        "--teacher_ckpt", type=str, default="hifigan/generator_universal.pth.tar"
+    )
+    parser.add_argument(
+        "--output_ckpt",
+        type=str,
+        required=True,
+        help="path of the distilled generator, set it as vocoder.ckpt in model.yaml",
+    )
+    parser.add_argument("--total_step", type=int, default=200000)
+    parser.add_argument("--learning_rate", type=float, default=0.0002)
+    parser.add_argument("--lambda_wav", type=float, default=1.0)
+    parser.add_argument("--segment_size", type=int, default=8192)
+    parser.add_argument("--log_step", type=int, default=100)
+    parser.add_argument("--save_step", type=int, default=5000)
+    parser.add_argument(
+        "-p",
+        "--preprocess_config",
+        type=str,
+        required=True,
+        help="path to preprocess.yaml",
+    )
+    parser.add_argument(
+        "-m", "--model_config", type=str, required=True, help="path to model.yaml"
+    )
+    parser.add_argument(
+        "-t", "--train_config", type=str, required=True, help="path to train.yaml"
+    )
+    args = parser.parse_args()
+
+    # Read Config
+    preprocess_config = yaml.load(
+        open(args.preprocess_config, "r"), Loader=yaml.FullLoader
+    )
+    model_config = yaml.load(open(args.model_config, "r"), Loader=yaml.FullLoader)
+    train_config = yaml.load(open(args.train_config, "r"), Loader=yaml.FullLoader)
+    configs = (preprocess_config, model_config, train_config)
+
+    main(args, configs)
@@ -0,0 +1,130 @@
+import argparse
+import os
+
+import torch
+import yaml
+import torch.nn as nn
+from torch.utils.data import DataLoader
+from tqdm import tqdm
+
+from utils.model import get_model, get_light_postnet, get_param_num
+from utils.tools import to_device
+from dataset_chinese import Dataset
+
+device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+def main(args, configs):
+    print("Prepare light PostNet distillation ...")
+
+    preprocess_config, model_config, train_config = configs
+
+    # Get dataset
+    dataset = Dataset(
+        "train.txt", preprocess_config, model_config, train_config, sort=True, drop_last=True
+    )
+    batch_size = train_config["optimizer"]["batch_size"]
+    group_size = 4  # Set this larger than 1 to enable sorting in Dataset
+    assert batch_size * group_size < len(dataset)
+    loader = DataLoader(
+        dataset,
+        batch_size=batch_size * group_size,
+        shuffle=True,
+        collate_fn=dataset.collate_fn,
+    )
+
+    # Frozen teacher: the trained FastSpeech2 with its full PostNet
+    args.postnet_mode = "full"
+    model = get_model(args, configs, device, train=False)
+    for param in model.parameters():
+        param.requires_grad = False
+
+    # Student: a narrower, shallower PostNet
+    light_postnet = get_light_postnet(configs, device)
+    light_postnet.train()
+    print("Number of full PostNet Parameters:", get_param_num(model.postnet))
+    print("Number of light PostNet Parameters:", get_param_num(light_postnet))
+
+    optimizer = torch.optim.Adam(light_postnet.parameters(), lr=args.learning_rate)
+    mae_loss = nn.L1Loss()
+
+    ckpt_path = os.path.join(
+        train_config["path"]["ckpt_path"], model_config["postnet"]["light"]["ckpt"]
+    )
+    os.makedirs(os.path.dirname(ckpt_path), exist_ok=True)
+
+    step = 1
+    outer_bar = tqdm(total=args.total_step, desc="Distilling", position=0)
+
+    while True:
+        for batchs in loader:
+            for batch in batchs:
+                batch = to_device(batch, device)
+
+                # Teacher forward
+                with torch.no_grad():
+                    output = model(*(batch[2:]))
+                mel_predictions = output[0]
+                postnet_mel_predictions = output[1]
+                mel_masks = ~output[7]
+
+                # Student forward, matched against the full PostNet output
+                light_mel_predictions = light_postnet(mel_predictions) + mel_predictions
+                loss = mae_loss(
+                    light_mel_predictions.masked_select(mel_masks.unsqueeze(-1)),
+                    postnet_mel_predictions.masked_select(mel_masks.unsqueeze(-1)),
+                )
+
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+
+                if step % args.log_step == 0:
+                    outer_bar.write(
+                        "Step {}/{}, Distillation L1: {:.4f}".format(
+                            step, args.total_step, loss.item()
+                        )
+                    )
+
+                if step % args.save_step == 0 or step == args.total_step:
+                    torch.save(
+                        {"light_postnet": light_postnet.state_dict()}, ckpt_path
+                    )
+
+                if step == args.total_step:
+                    return
+                step += 1
+                outer_bar.update(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--restore_step", type=int, required=True)
+    parser.add_argument("--total_step", type=int, default=20000)
+    parser.add_argument("--learning_rate", type=float, default=0.001)
+    parser.add_argument("--log_step", type=int, default=100)
+    parser.add_argument("--save_step", type=int, default=2000)
+    parser.add_argument(
+        "-p",
+        "--preprocess_config",
+        type=str,
+        required=True,
+        help="path to preprocess.yaml",
+    )
+    parser.add_argument(
+        "-m", "--model_config", type=str, required=True, help="path to model.yaml"
+    )
+    parser.add_argument(
+        "-t", "--train_config", type=str, required=True, help="path to train.yaml"
+    )
+    args = parser.parse_args()
+
+    # Read Config
+    preprocess_config = yaml.load(
+        open(args.preprocess_config, "r"), Loader=yaml.FullLoader
+    )
+    model_config = yaml.load(open(args.model_config, "r"), Loader=yaml.FullLoader)
+    train_config = yaml.load(open(args.train_config, "r"), Loader=yaml.FullLoader)
+    configs = (preprocess_config, model_config, train_config)
+
+    main(args, configs)
@@ -1,11 +1,14 @@
 import os
+import sys
 import json
 
 import torch
+import yaml
 import numpy as np
 
-import hifigan
 from model import FastSpeech2, ScheduledOptim
+from transformer import PostNet
+from utils.profiler import get_profiler
 
 
 def get_model(args, configs, device, train=False):
@@ -29,21 +32,111 @@ def get_model(args, configs, device, train=False):
         model.train()
         return model, scheduled_optim
 
+    postnet_mode = getattr(args, "postnet_mode", None)
+    if postnet_mode is None:
+        postnet_mode = model_config.get("postnet", {}).get("mode", "full")
+    if postnet_mode == "light":
+        model.set_postnet_mode("light", get_light_postnet(configs, device, restore=True))
+    else:
+        model.set_postnet_mode(postnet_mode)
+
+    profiler = get_profiler(model_config)
+    if profiler is not None:
+        profiler.attach(model, "fastspeech2")
+
     model.eval()
     model.requires_grad_ = False
     return model
 
 
+def get_teacher_model(configs, device):
+    (preprocess_config, model_config, train_config) = configs
+    distill_config = train_config["distillation"]
+    teacher_model_config = yaml.load(
+        open(distill_config["teacher_model_config"], "r"), Loader=yaml.FullLoader
+    )
+
+    teacher = FastSpeech2(preprocess_config, teacher_model_config).to(device)
+    ckpt = torch.load(
+        distill_config["teacher_ckpt_path"], map_location=device, weights_only=False
+    )
+    teacher.load_state_dict(ckpt["model"])
+    teacher.eval()
+    for param in teacher.parameters():
+        param.requires_grad = False
+
+    return teacher
+
+
+def get_light_postnet(configs, device, restore=False):
+    (preprocess_config, model_config, train_config) = configs
+    light_config = model_config["postnet"]["light"]
+
+    light_postnet = PostNet(
+        n_mel_channels=preprocess_config["preprocessing"]["mel"]["n_mel_channels"],
+        postnet_embedding_dim=light_config["embedding_dim"],
+        postnet_kernel_size=light_config["kernel_size"],
+        postnet_n_convolutions=light_config["n_convolutions"],
+    ).to(device)
+    if restore:
+        ckpt_path = os.path.join(
+            train_config["path"]["ckpt_path"], light_config["ckpt"]
+        )
+        ckpt = torch.load(ckpt_path, map_location=device, weights_only=False)
+        light_postnet.load_state_dict(ckpt["light_postnet"])
+        light_postnet.eval()
+
+    return light_postnet
+
+
 def get_param_num(model):
     num_param = sum(param.numel() for param in model.parameters())
     return num_param
 
 
+def get_hifigan(config_path, ckpt_path, device, train=False):
+    import hifigan
+
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    config = hifigan.AttrDict(config)
+    vocoder = hifigan.Generator(config)
+    if ckpt_path is not None:
+        ckpt = torch.load(ckpt_path, map_location=device, weights_only=False)
+        vocoder.load_state_dict(ckpt["generator"])
+
+    if train:
+        vocoder.train()
+    else:
+        vocoder.eval()
+        vocoder.remove_weight_norm()
+    vocoder.to(device)
+
+    return vocoder
+
+
+def get_griffin_lim(device, griffin_iters=None):
+    from audio.tools import GriffinLimVocoder
+
+    return GriffinLimVocoder(device, griffin_iters)
+
+
+def is_griffin_lim(vocoder):
+    # Without audio.tools imported, no Griffin-Lim vocoder can exist
+    audio_tools = sys.modules.get("audio.tools")
+    return audio_tools is not None and isinstance(vocoder, audio_tools.GriffinLimVocoder)
+
+
 def get_vocoder(config, device):
+    # Vocoder backends are imported only when selected, so that importing this
+    # module does not load hifigan or the Griffin-Lim STFT (librosa)
     name = config["vocoder"]["model"]
     speaker = config["vocoder"]["speaker"]
+    griffin_iters = config["vocoder"].get("griffin_lim_iters")
 
-    if name == "MelGAN":
+    if name == "Griffin-Lim":
+        return get_griffin_lim(device, griffin_iters)
+    elif name == "MelGAN":
         if speaker == "LJSpeech":
             vocoder = torch.hub.load(
                 "descriptinc/melgan-neurips", "load_melgan", "linda_johnson"
@@ -55,18 +148,26 @@ def get_vocoder(config, device):
         vocoder.mel2wav.eval()
         vocoder.mel2wav.to(device)
     elif name == "HiFi-GAN":
-        with open("hifigan/config.json", "r") as f:
-            config = json.load(f)
-        config = hifigan.AttrDict(config)
-        vocoder = hifigan.Generator(config)
-        if speaker == "LJSpeech":
-            ckpt = torch.load("hifigan/generator_LJSpeech.pth.tar", weights_only=False)
+        # Lighter generators (config_v2/v3/mb.json) come with their own checkpoint
+        config_path = config["vocoder"].get("config", "hifigan/config.json")
+        if "ckpt" in config["vocoder"]:
+            ckpt_path = config["vocoder"]["ckpt"]
+        elif speaker == "LJSpeech":
+            ckpt_path = "hifigan/generator_LJSpeech.pth.tar"
         elif speaker == "universal":
-            ckpt = torch.load("hifigan/generator_universal.pth.tar", weights_only=False)
-        vocoder.load_state_dict(ckpt["generator"])
-        vocoder.eval()
-        vocoder.remove_weight_norm()
-        vocoder.to(device)
+            ckpt_path = "hifigan/generator_universal.pth.tar"
+        if not os.path.exists(ckpt_path):
+            print(
+                "HiFi-GAN checkpoint {} not found, falling back to Griffin-Lim".format(
+                    ckpt_path
+                )
+            )
+            return get_griffin_lim(device, griffin_iters)
+        vocoder = get_hifigan(config_path, ckpt_path, device)
+
+        profiler = get_profiler(config)
+        if profiler is not None:
+            profiler.attach(vocoder, "vocoder")
 
     return vocoder
 
@@ -74,7 +175,9 @@ def get_vocoder(config, device):
 def vocoder_infer(mels, vocoder, model_config, preprocess_config, lengths=None):
     name = model_config["vocoder"]["model"]
     with torch.no_grad():
-        if name == "MelGAN":
+        if is_griffin_lim(vocoder):
+            wavs = vocoder(mels, preprocess_config)
+        elif name == "MelGAN":
             wavs = vocoder.inverse(mels / np.log(10))
         elif name == "HiFi-GAN":
             wavs = vocoder(mels).squeeze(1)
@@ -0,0 +1,237 @@
+import atexit
+import json
+import os
+import resource
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+
+import torch
+
+
+# Submodules timed by default, matched on class name
+PROFILED_MODULES = [
+    "Encoder",
+    "Decoder",
+    "FFTBlock",
+    "VarianceAdaptor",
+    "VariancePredictor",
+    "LengthRegulator",
+    "PostNet",
+    "ConvTranspose1d",
+    "ResBlock",
+    "ResBlock2",
+    "PQMF",
+]
+
+# Chrome-trace events kept in memory, the oldest are dropped first; stats cover every event
+MAX_EVENTS = 100000
+
+_profiler = None
+
+
+def profiling_enabled(model_config=None):
+    if os.environ.get("FASTSPEECH2_PROFILE", "0") not in ["", "0", "false", "False"]:
+        return True
+    if model_config is not None:
+        return model_config.get("profile", {}).get("enabled", False)
+    return False
+
+
+def get_profiler(model_config=None):
+    """
+    Process-wide ModuleProfiler, or None when profiling is disabled.
+    Enabled by FASTSPEECH2_PROFILE=1 or model.yaml profile.enabled, results are
+    written to FASTSPEECH2_PROFILE_DIR (or profile.path) at exit. The trace keeps the
+    last profile.max_events events, so that long-running inference stays bounded.
+    """
+    global _profiler
+    if _profiler is None and profiling_enabled(model_config):
+        profile_config = (model_config or {}).get("profile", {})
+        output_dir = os.environ.get(
+            "FASTSPEECH2_PROFILE_DIR", profile_config.get("path", "./output/profile")
+        )
+        _profiler = ModuleProfiler(max_events=profile_config.get("max_events", MAX_EVENTS))
+        atexit.register(_profiler.export, output_dir)
+    return _profiler
+
+
+def profile_span(name, model_config=None):
+    """ Context manager timing one span (e.g. a synthesis request), a no-op when profiling is disabled """
+    profiler = get_profiler(model_config)
+    if profiler is None:
+        return nullcontext()
+    return profiler.record(name)
+
+
+def _process_rss():
+    """ Resident set size of this process in bytes, the peak RSS where /proc is unavailable """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is reported in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _module_device(module, inputs):
+    """ Device of the module's parameters, or of its first input for parameter-free modules """
+    parameter = next(module.parameters(), None)
+    if parameter is not None:
+        return parameter.device
+    for x in inputs:
+        if isinstance(x, torch.Tensor):
+            return x.device
+    return torch.device("cpu")
+
+
+def _memory_in_use(device):
+    """ (source, bytes): CUDA allocator memory of device, process RSS on CPU """
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+        return "cuda_allocated", torch.cuda.memory_allocated(device)
+    return "cpu_rss", _process_rss()
+
+
+def _tensor_bytes(output):
+    if isinstance(output, torch.Tensor):
+        return output.numel() * output.element_size()
+    if isinstance(output, (list, tuple)):
+        return sum(_tensor_bytes(o) for o in output)
+    return 0
+
+
+class ModuleProfiler:
+    """Per-submodule wall time and memory recorded with forward pre/post hooks.
+
+    Each event records output_tensor_bytes, the size of the tensors a module returns,
+    and allocated_delta_bytes, the change of memory in use across its forward: the
+    CUDA allocator of the module's device, or the process RSS when it runs on CPU
+    (memory_source says which).
+    """
+
+    def __init__(self, module_names=PROFILED_MODULES, max_events=MAX_EVENTS):
+        self.module_names = set(module_names)
+        self.handles = []
+        self.events = deque(maxlen=max_events)
+        self.stats = OrderedDict()
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+        self._starts = threading.local()
+
+    def attach(self, model, prefix):
+        for name, module in model.named_modules():
+            if type(module).__name__ not in self.module_names:
+                continue
+            full_name = "{}.{}".format(prefix, name) if name else prefix
+            self.handles.append(
+                module.register_forward_pre_hook(self._pre_hook(full_name))
+            )
+            self.handles.append(module.register_forward_hook(self._post_hook(full_name)))
+
+    def detach(self):
+        for handle in self.handles:
+            handle.remove()
+        self.handles = []
+
+    def reset(self):
+        with self.lock:
+            self.events.clear()
+            self.stats = OrderedDict()
+
+    def _stack(self):
+        if not hasattr(self._starts, "stack"):
+            self._starts.stack = []
+        return self._starts.stack
+
+    def _pre_hook(self, name):
+        def hook(module, inputs):
+            device = _module_device(module, inputs)
+            _, in_use = _memory_in_use(device)
+            self._stack().append((name, device, in_use, time.perf_counter()))
+
+        return hook
+
+    def _post_hook(self, name):
+        def hook(module, inputs, output):
+            _, device, start_in_use, start = self._stack().pop()
+            source, in_use = _memory_in_use(device)
+            end = time.perf_counter()
+            self._record(
+                name,
+                start,
+                end,
+                {
+                    "output_tensor_bytes": _tensor_bytes(output),
+                    "allocated_delta_bytes": in_use - start_in_use,
+                    "memory_source": source,
+                },
+            )
+
+        return hook
+
+    @contextmanager
+    def record(self, name):
+        """ Time an arbitrary span, e.g. one synthesis request """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, start, time.perf_counter(), {})
+
+    def _record(self, name, start, end, args):
+        duration = end - start
+        with self.lock:
+            self.events.append(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": (start - self.origin) * 1e6,
+                    "dur": duration * 1e6,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": args,
+                }
+            )
+            stat = self.stats.setdefault(
+                name,
+                {
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "max_output_tensor_bytes": 0,
+                    "max_allocated_delta_bytes": 0,
+                },
+            )
+            stat["count"] += 1
+            stat["total_ms"] += duration * 1000
+            stat["max_ms"] = max(stat["max_ms"], duration * 1000)
+            stat["max_output_tensor_bytes"] = max(
+                stat["max_output_tensor_bytes"], args.get("output_tensor_bytes", 0)
+            )
+            stat["max_allocated_delta_bytes"] = max(
+                stat["max_allocated_delta_bytes"], args.get("allocated_delta_bytes", 0)
+            )
+            if "memory_source" in args:
+                stat["memory_source"] = args["memory_source"]
+
+    def summary(self):
+        with self.lock:
+            summary = OrderedDict()
+            for name, stat in self.stats.items():
+                summary[name] = dict(stat)
+                summary[name]["mean_ms"] = stat["total_ms"] / stat["count"]
+            return summary
+
+    def export(self, output_dir):
+        if not self.events:
+            return
+        os.makedirs(output_dir, exist_ok=True)
+        tag = "{}_{}".format(time.strftime("%Y%m%d-%H%M%S"), os.getpid())
+        with open(os.path.join(output_dir, "stats_{}.json".format(tag)), "w") as f:
+            json.dump(self.summary(), f, indent=4)
+        with self.lock:
+            trace = {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+        with open(os.path.join(output_dir, "trace_{}.json".format(tag)), "w") as f:
+            json.dump(trace, f)
@@ -4,15 +4,35 @@ import json
 import torch
 import torch.nn.functional as F
 import numpy as np
-import matplotlib
 from scipy.io import wavfile
-from matplotlib import pyplot as plt
 
 
-matplotlib.use("Agg")
+device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+_plt = None
+
+
+def get_pyplot():
+    """ matplotlib.pyplot with the Agg backend, imported on first plot """
+    global _plt
+    if _plt is None:
+        import matplotlib
+
+        matplotlib.use("Agg")
+        from matplotlib import pyplot
+
+        _plt = pyplot
+    return _plt
+
+
+def _to_tensor(x, device, dtype=None):
+    # Tensors from collate_1D/collate_2D are moved as they are and numpy arrays are
+    # wrapped without a copy; casts happen after the transfer, on the device
+    x = torch.as_tensor(x).to(device, non_blocking=True)
+    if dtype is not None and x.dtype != dtype:
+        x = x.to(dtype)
+    return x
 
 
 def to_device(data, device):
@@ -32,14 +52,15 @@ def to_device(data, device):
             durations,
         ) = data
 
-        speakers = torch.from_numpy(speakers).long().to(device)
-        texts = torch.from_numpy(texts).long().to(device)
-        src_lens = torch.from_numpy(src_lens).to(device)
-        mels = torch.from_numpy(mels).float().to(device)
-        mel_lens = torch.from_numpy(mel_lens).to(device)
-        pitches = torch.from_numpy(pitches).float().to(device)
-        energies = torch.from_numpy(energies).to(device)
-        durations = torch.from_numpy(durations).long().to(device)
+        speakers = _to_tensor(speakers, device, torch.long)
+        texts = _to_tensor(texts, device, torch.long)
+        src_lens = _to_tensor(src_lens, device)
+        # float16 features move at half the bandwidth and are upcast on the device
+        mels = _to_tensor(mels, device, torch.float)
+        mel_lens = _to_tensor(mel_lens, device)
+        pitches = _to_tensor(pitches, device, torch.float)
+        energies = _to_tensor(energies, device, torch.float)
+        durations = _to_tensor(durations, device, torch.long)
 
         return (
             ids,
@@ -75,17 +96,18 @@ def to_device(data, device):
             durations,
         ) = data
 
-        speakers = torch.from_numpy(speakers).long().to(device)
-        emotions = torch.from_numpy(emotions).long().to(device)
-        arousals = torch.from_numpy(arousals).long().to(device)
-        valences = torch.from_numpy(valences).long().to(device)
-        texts = torch.from_numpy(texts).long().to(device)
-        src_lens = torch.from_numpy(src_lens).to(device)
-        mels = torch.from_numpy(mels).float().to(device)
-        mel_lens = torch.from_numpy(mel_lens).to(device)
-        pitches = torch.from_numpy(pitches).float().to(device)
-        energies = torch.from_numpy(energies).to(device)
-        durations = torch.from_numpy(durations).long().to(device)
+        speakers = _to_tensor(speakers, device, torch.long)
+        emotions = _to_tensor(emotions, device, torch.long)
+        arousals = _to_tensor(arousals, device, torch.long)
+        valences = _to_tensor(valences, device, torch.long)
+        texts = _to_tensor(texts, device, torch.long)
+        src_lens = _to_tensor(src_lens, device)
+        # float16 features move at half the bandwidth and are upcast on the device
+        mels = _to_tensor(mels, device, torch.float)
+        mel_lens = _to_tensor(mel_lens, device)
+        pitches = _to_tensor(pitches, device, torch.float)
+        energies = _to_tensor(energies, device, torch.float)
+        durations = _to_tensor(durations, device, torch.long)
 
         return (
             ids,
@@ -108,25 +130,37 @@ def to_device(data, device):
     if len(data) == 6:
         (ids, raw_texts, speakers, texts, src_lens, max_src_len) = data
 
-        speakers = torch.from_numpy(speakers).long().to(device)
-        texts = torch.from_numpy(texts).long().to(device)
-        src_lens = torch.from_numpy(src_lens).to(device)
+        speakers = _to_tensor(speakers, device, torch.long)
+        texts = _to_tensor(texts, device, torch.long)
+        src_lens = _to_tensor(src_lens, device)
 
         return (ids, raw_texts, speakers, texts, src_lens, max_src_len)
 
     if len(data) == 9:
         (ids, raw_texts, speakers, emotions, arousals, valences, texts, src_lens, max_src_len) = data
 
-        speakers = torch.from_numpy(speakers).long().to(device)
-        emotions = torch.from_numpy(emotions).long().to(device)
-        arousals = torch.from_numpy(arousals).long().to(device)
-        valences = torch.from_numpy(valences).long().to(device)
-        texts = torch.from_numpy(texts).long().to(device)
-        src_lens = torch.from_numpy(src_lens).to(device)
+        speakers = _to_tensor(speakers, device, torch.long)
+        emotions = _to_tensor(emotions, device, torch.long)
+        arousals = _to_tensor(arousals, device, torch.long)
+        valences = _to_tensor(valences, device, torch.long)
+        texts = _to_tensor(texts, device, torch.long)
+        src_lens = _to_tensor(src_lens, device)
 
         return (ids, raw_texts, speakers, emotions, arousals, valences, texts, src_lens, max_src_len) 
 
 
+def load_feature_stats(preprocessed_path):
+    """
+    (mean, std) of pitch and energy when the preprocessor stored raw features,
+    None for older preprocessed data that was normalized on disk.
+    """
+    with open(os.path.join(preprocessed_path, "stats.json")) as f:
+        stats = json.load(f)
+    if not stats.get("normalize_on_load", False):
+        return None
+    return {"pitch": stats["pitch"][2:], "energy": stats["energy"][2:]}
+
+
 def log(
     logger, step=None, losses=None, fig=None, audio=None, sampling_rate=22050, tag=""
 ):
@@ -255,6 +289,7 @@ def synth_samples(targets, predictions, vocoder, model_config, preprocess_config
             stats,
             ["Synthetized Spectrogram"],
         )
+        plt = get_pyplot()
         plt.savefig(os.path.join(path, "{}{}.png".format(basename, f"_{tag}" if tag is not None else "")))
         plt.close()
 
@@ -272,7 +307,7 @@ def synth_samples(targets, predictions, vocoder, model_config, preprocess_config
 
 
 def plot_mel(data, stats, titles):
-    fig, axes = plt.subplots(len(data), 1, squeeze=False)
+    fig, axes = get_pyplot().subplots(len(data), 1, squeeze=False)
     if titles is None:
         titles = [None for i in range(len(data))]
     pitch_min, pitch_max, pitch_mean, pitch_std, energy_min, energy_max = stats
@@ -336,6 +371,44 @@ def pad_1D(inputs, PAD=0):
     return padded
 
 
+def _collate(inputs, shape, dtype, PAD, pin_memory):
+    dtype = np.dtype(dtype or np.asarray(inputs[0]).dtype)
+    in_worker = torch.utils.data.get_worker_info() is not None
+    output = torch.full(
+        (len(inputs),) + shape,
+        PAD,
+        dtype=torch.from_numpy(np.empty(0, dtype=dtype)).dtype,
+        # Pinning in a forked worker would initialize CUDA there
+        pin_memory=pin_memory and not in_worker and torch.cuda.is_available(),
+    )
+    if in_worker:
+        # Sent back from a DataLoader worker through shared memory without another copy
+        output.share_memory_()
+    buffer = output.numpy()
+    for i, x in enumerate(inputs):
+        buffer[i, : len(x)] = x
+
+    return output
+
+
+def collate_1D(inputs, dtype=None, PAD=0, pin_memory=False):
+    """
+    Same as pad_1D, but the padded batch is one preallocated tensor into which every
+    item is copied once. dtype defaults to the dtype of the first item.
+    pin_memory only applies when collating in the main process: inside a DataLoader
+    worker the batch goes to shared memory instead and is pinned by
+    DataLoader(pin_memory=True) in the main process.
+    """
+    max_len = max(len(x) for x in inputs)
+    return _collate(inputs, (max_len,), dtype, PAD, pin_memory)
+
+
+def collate_2D(inputs, dtype=None, PAD=0, pin_memory=False):
+    """ Same as pad_2D for (T, C) items, padded along T into one preallocated tensor """
+    max_len = max(np.shape(x)[0] for x in inputs)
+    return _collate(inputs, (max_len, np.shape(inputs[0])[1]), dtype, PAD, pin_memory)
+
+
 def pad_2D(inputs, maxlen=None):
     def pad(x, max_len):
         PAD = 0
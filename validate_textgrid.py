@@ -12,6 +12,11 @@ from collections import Counter, defaultdict
 import matplotlib.pyplot as plt
 from tqdm import tqdm
 
+from audio.cache import AudioCache, load_wav
+
+# 解码后的音频缓存 (--audio_cache)，为None时直接用librosa读取
+audio_cache = None
+
 def validate_single_textgrid(tg_path, wav_path, text_content=None):
     """验证单个TextGrid文件"""
     
@@ -19,7 +24,10 @@ def validate_single_textgrid(tg_path, wav_path, text_content=None):
     
     # 1. 读取音频时长
     try:
-        audio_duration = librosa.get_duration(filename=wav_path)
+        if audio_cache is not None:
+            audio_duration = audio_cache.duration(wav_path)
+        else:
+            audio_duration = librosa.get_duration(filename=wav_path)
         print(f"音频时长: {audio_duration:.3f}秒")
     except Exception as e:
         print(f"无法读取音频: {e}")
@@ -268,8 +276,8 @@ def generate_quality_report(results, phoneme_counter):
     
     print(f"\n📄 质量报告已保存到: textgrid_quality_report.json")
 
-def visualize_sample_textgrid(speaker="0001", file_index=0):
-    """可视化单个TextGrid文件"""
+def visualize_sample_textgrid(speaker="0001", file_index=0, sampling_rate=22050):
+    """可视化单个TextGrid文件，sampling_rate 为读取音频的采样率（使用缓存时以缓存的采样率为准）"""
     
     textgrid_dir = "preprocessed_data/ESD-Chinese/TextGrid"
     raw_data_dir = "raw_data/ESD-Chinese"
@@ -290,7 +298,8 @@ def visualize_sample_textgrid(speaker="0001", file_index=0):
     print(f"可视化文件: {speaker}_{basename}")
     
     # 读取音频
-    y, sr = librosa.load(wav_path)
+    sr = audio_cache.sampling_rate if audio_cache is not None else sampling_rate
+    y = load_wav(wav_path, sr, audio_cache)
     
     # 读取TextGrid
     tg = textgrid.TextGrid.fromFile(tg_path)
@@ -356,12 +365,18 @@ if __name__ == "__main__":
                        default="batch", help="验证模式")
     parser.add_argument("--speaker", default="0001", help="说话人ID")
     parser.add_argument("--file_index", type=int, default=0, help="文件索引")
+    parser.add_argument("--audio_cache", default=None,
+                       help="解码音频缓存目录，与preprocess.yaml的path.audio_cache_path相同")
+    parser.add_argument("--sampling_rate", type=int, default=22050, help="读取音频的采样率（同时用于缓存）")
     args = parser.parse_args()
     
+    if args.audio_cache is not None:
+        audio_cache = AudioCache(args.audio_cache, args.sampling_rate)
+    
     if args.mode == "batch":
         batch_validate_textgrids()
     elif args.mode == "visualize":
-        visualize_sample_textgrid(args.speaker, args.file_index)
+        visualize_sample_textgrid(args.speaker, args.file_index, args.sampling_rate)
     else:
         # Single mode - 这里可以添加单文件验证逻辑
         print("单文件验证模式") 
\ No newline at end of file